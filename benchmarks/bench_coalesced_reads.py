@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import argparse
+
+# Make the application modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wav_segments import CoalescedReader, read_frames, read_wav_header, segment_frame_range
+
+
+def detection_ranges(info, spacing, offset, length, burst, burst_gap):
+    """Frame ranges of bursts of detections spacing seconds apart, like EI-results rows during a call"""
+    ranges = []
+    burst_start = -offset
+    while burst_start + (burst - 1) * spacing + offset + length <= info.duration:
+        for index in range(burst):
+            begin_time = burst_start + index * spacing + offset
+            ranges.append(segment_frame_range(info, begin_time, begin_time + length))
+        burst_start += (burst - 1) * spacing + burst_gap
+    return ranges
+
+
+def drop_cache(path):
+    """Ask the OS to forget the cached pages of the file, so every read comes from the drive (Linux only)"""
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes read and time of separate and coalesced segment reads")
+    parser.add_argument("wav", help="PCM WAV recording to read the segments from")
+    parser.add_argument("--spacing", type=float, nargs="+", default=[1, 2, 4, 6],
+                        help="Seconds between the detections of a burst")
+    parser.add_argument("--offset", type=float, default=-2)
+    parser.add_argument("--length", type=float, default=5)
+    parser.add_argument("--burst", type=int, default=8, help="Detections per burst")
+    parser.add_argument("--burst-gap", type=float, default=120, help="Seconds between bursts")
+    args = parser.parse_args()
+
+    info = read_wav_header(args.wav)
+    print(f"{'spacing (s)':>12} {'segments':>9} {'separate (MB)':>14} {'coalesced (MB)':>15} {'saved':>7} "
+          f"{'separate (s)':>13} {'coalesced (s)':>14}")
+    for spacing in args.spacing:
+        ranges = detection_ranges(info, spacing, args.offset, args.length, args.burst, args.burst_gap)
+        with open(args.wav, 'rb') as src:
+            drop_cache(args.wav)
+            start_time = time.perf_counter()
+            separate_bytes = sum(len(read_frames(src, info, start, end)) for start, end in ranges)
+            separate_time = time.perf_counter() - start_time
+
+            drop_cache(args.wav)
+            reader = CoalescedReader(src, info, ranges)
+            start_time = time.perf_counter()
+            for start, end in ranges:
+                reader.read(start, end)
+            coalesced_time = time.perf_counter() - start_time
+
+        saved = reader.bytes_saved / float(separate_bytes) if separate_bytes else 0
+        print(f"{spacing:>12g} {len(ranges):>9} {separate_bytes / 1e6:>14.2f} {reader.bytes_read / 1e6:>15.2f} "
+              f"{saved:>6.0%} {separate_time:>13.3f} {coalesced_time:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import argparse
+import tempfile
+
+# Make the application modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eloc_engine import ElocEngine, EXTRACTION_BACKENDS, BACKEND_AUTO, load_audio_segment_class
+from setup_ffmpeg import find_ffmpeg
+from wav_segments import read_wav_header
+
+
+def plan_segments(duration, count, length):
+    """count segments spread evenly over the recording, in the format of plan_wav_segments"""
+    step = max(length, (duration - length) / count)
+    return [{'segment_id': index + 1, 'begin_time': index * step, 'end_time': index * step + length}
+            for index in range(count) if index * step + length <= duration]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the snippet extraction backends on one recording")
+    parser.add_argument("wav", help="PCM WAV recording to cut the snippets from")
+    parser.add_argument("--segments", type=int, default=200)
+    parser.add_argument("--length", type=float, default=5)
+    parser.add_argument("--codec", choices=("wav", "flac"), default="wav")
+    args = parser.parse_args()
+
+    segments = plan_segments(read_wav_header(args.wav).duration, args.segments, args.length)
+    available = {'ffmpeg': find_ffmpeg() is not None, 'pydub': load_audio_segment_class() is not None}
+
+    print(f"{len(segments)} {args.codec} snippets of {args.length:g}s from {os.path.basename(args.wav)}")
+    print(f"{'backend':>8} {'seconds':>9} {'read (MB)':>10} {'written (MB)':>13}")
+    for backend in EXTRACTION_BACKENDS:
+        if not available.get(backend, True):
+            print(f"{backend:>8} not available")
+            continue
+        engine = ElocEngine(status_callback=lambda message: None, snippet_codec=args.codec, extraction_backend=backend)
+        with tempfile.TemporaryDirectory(prefix="eloc_backend_") as work_dir:
+            try:
+                _, stats = engine.run_timed('process_wav_file', (args.wav, segments, work_dir, 1, 1))
+            except Exception as e:
+                print(f"{backend:>8} failed: {str(e)}")
+                continue
+        label = f"{backend}*" if backend == BACKEND_AUTO else backend
+        print(f"{label:>8} {stats['seconds']:>9.3f} {stats.get('bytes_read', 0) / 1e6:>10.1f} "
+              f"{stats.get('bytes_written', 0) / 1e6:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
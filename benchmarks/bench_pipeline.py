@@ -0,0 +1,221 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+# Make the application modules importable when run from the benchmarks folder
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from eloc_engine import ElocEngine, create_output_dirs, make_folder_job
+from synthetic_deployment import make_dataset
+
+# Dataset sizes: deployment folders, hours per folder, sample rate, detections per hour and sparse WAVs.
+# The month-scale dataset is sparse (silent holes) so it does not need ~80 GB of disk space.
+SIZES = {
+    'small': {'folders': 1, 'hours': 2, 'sample_rate': 8000, 'detections_per_hour': 60, 'sparse': False},
+    'medium': {'folders': 3, 'hours': 4, 'sample_rate': 16000, 'detections_per_hour': 120, 'sparse': False},
+    'month': {'folders': 1, 'hours': 720, 'sample_rate': 16000, 'detections_per_hour': 120, 'sparse': True},
+}
+
+# The legacy extract_audio_segments.py loads every recording into memory, only run it up to this many hours
+LEGACY_MAX_HOURS = 24
+
+
+def clear_outputs(folder_path):
+    """Remove the output of earlier runs so every measurement starts from scratch"""
+    shutil.rmtree(os.path.join(folder_path, "output"), ignore_errors=True)
+
+
+def time_stages(engine, folder_path, time_offset, segment_length):
+    """Run the stages of process_folder one by one and return their wall times and counts"""
+    clear_outputs(folder_path)
+    selection_tables_dir, audio_segments_dir = create_output_dirs(folder_path)
+    job = make_folder_job(folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length)
+    stages = {}
+
+    start_time = time.perf_counter()
+    engine.scan_folder(folder_path, refresh=True)
+    stages['scan'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    folder = engine.prepare_folder(job)
+    stages['index'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    detection_tables = []
+    for csv_file in folder['csv_files']:
+        data, sound_column = engine.read_detection_csv(csv_file)
+        detection_tables.append((csv_file, data, sound_column))
+    stages['csv_parse'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    detections_by_wav, csv_errors = engine.assign_folder_detections(folder, detection_tables)
+    stages['assign'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    extraction_plan, new_manifest = engine.write_folder_tables(folder, detections_by_wav, csv_errors)
+    stages['table_write'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    extracted = engine.extract_audio_segments(folder_path, selection_tables_dir, audio_segments_dir, extraction_plan)
+    stages['extract'] = time.perf_counter() - start_time
+
+    engine.finish_folder(folder, new_manifest, extracted)
+    counts = {
+        'detections': int(sum(len(table[1]) for table in detection_tables)),
+        'wav_files': len(folder['wav_paths']),
+        'segments': sum(len(files) for files in extracted.values()),
+    }
+    return stages, counts
+
+
+def time_full_run(engine, folder_paths, time_offset, segment_length, workers):
+    """Process all folders end to end on the shared scheduler"""
+    jobs = []
+    for folder_path in folder_paths:
+        clear_outputs(folder_path)
+        selection_tables_dir, audio_segments_dir = create_output_dirs(folder_path)
+        jobs.append(make_folder_job(folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length))
+    start_time = time.perf_counter()
+    engine.run_folder_jobs(jobs, workers)
+    return time.perf_counter() - start_time
+
+
+def time_legacy_script(folder_path):
+    """Time extract_audio_segments.py on the selection tables written by the engine.
+
+    The script only looks next to itself, so it is copied into the deployment folder
+    together with the tables, renamed to the hourly names it expects.
+    """
+    tables_dir = os.path.join(folder_path, "Raven_Selection_Tables")
+    os.makedirs(tables_dir, exist_ok=True)
+    engine_tables = os.path.join(folder_path, "output", "Raven_Selection_Tables")
+    for name in os.listdir(engine_tables):
+        # <prefix>_<epoch>_<YYYY-MM-DD>_<HH-MM-SS>_SelectionTable.txt -> <YYYY-Mon-DD>_<HH-MM-SS>_SelectionTable.txt
+        parts = name.split('_')
+        day = datetime.strptime(parts[-3], '%Y-%m-%d').strftime('%Y-%b-%d')
+        shutil.copy(os.path.join(engine_tables, name), os.path.join(tables_dir, f"{day}_{parts[-2]}_SelectionTable.txt"))
+
+    script = os.path.join(folder_path, "extract_audio_segments.py")
+    shutil.copy(os.path.join(REPO_DIR, "extract_audio_segments.py"), script)
+    try:
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, script], cwd=folder_path, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start_time
+    finally:
+        os.remove(script)
+        shutil.rmtree(tables_dir, ignore_errors=True)
+        shutil.rmtree(os.path.join(folder_path, "Audio_Segments"), ignore_errors=True)
+
+
+def run_size(name, params, data_dir, args):
+    engine = ElocEngine(status_callback=lambda message: None)
+    size_dir = os.path.join(data_dir, name)
+    if not os.path.isdir(size_dir):
+        print(f"Generating {name} dataset in {size_dir}...")
+        make_dataset(size_dir, params['folders'], params['hours'], params['sample_rate'],
+                     params['detections_per_hour'], params['sparse'])
+    folder_paths = sorted(os.path.join(size_dir, folder) for folder in os.listdir(size_dir))
+
+    stages = {}
+    counts = {'detections': 0, 'wav_files': 0, 'segments': 0}
+    for repeat in range(args.repeat):
+        run_stages = {}
+        for folder_path in folder_paths:
+            folder_stages, folder_counts = time_stages(engine, folder_path, args.offset, args.length)
+            for stage, seconds in folder_stages.items():
+                run_stages[stage] = run_stages.get(stage, 0.0) + seconds
+            if repeat == 0:
+                for key in counts:
+                    counts[key] += folder_counts[key]
+        # Keep the fastest of the repeats for every stage
+        for stage, seconds in run_stages.items():
+            stages[stage] = min(stages.get(stage, seconds), seconds)
+
+    if not args.skip_legacy and params['hours'] <= LEGACY_MAX_HOURS:
+        stages['legacy_script'] = sum(time_legacy_script(folder_path) for folder_path in folder_paths)
+
+    stages['full_run'] = min(time_full_run(engine, folder_paths, args.offset, args.length, args.workers)
+                             for _ in range(args.repeat))
+
+    audio_bytes = sum(os.path.getsize(os.path.join(folder_path, entry))
+                      for folder_path in folder_paths for entry in os.listdir(folder_path) if entry.endswith('.wav'))
+    return {
+        'params': params,
+        'counts': counts,
+        'audio_bytes': audio_bytes,
+        'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()},
+        'throughput': {
+            'detections_per_s': round(counts['detections'] / stages['csv_parse'], 1) if stages['csv_parse'] else None,
+            'segments_per_s': round(counts['segments'] / stages['extract'], 1) if stages['extract'] else None,
+        },
+    }
+
+
+def compare(results, baseline_path):
+    """Print the change of every stage time relative to a baseline file"""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline.get('created', '?')}):")
+    for name, result in results['sizes'].items():
+        base = baseline.get('sizes', {}).get(name)
+        if not base:
+            continue
+        for stage, seconds in result['stages'].items():
+            before = base['stages'].get(stage)
+            if before:
+                print(f"  {name:>7} {stage:>14}: {before:>9.3f}s -> {seconds:>9.3f}s ({before / seconds if seconds else 0:>6.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic ELOC deployments")
+    parser.add_argument("--sizes", nargs="+", default=['small', 'medium'], choices=list(SIZES))
+    parser.add_argument("--data-dir", default=None,
+                        help="Keep the generated datasets here and reuse them (default: a temporary folder)")
+    parser.add_argument("--output", default="bench_pipeline.json", help="JSON file for the results")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare with")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--offset", type=float, default=-2)
+    parser.add_argument("--length", type=float, default=5)
+    parser.add_argument("--skip-legacy", action="store_true", help="Do not time extract_audio_segments.py")
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="eloc_bench_")
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'sizes': {},
+    }
+    try:
+        for name in args.sizes:
+            result = run_size(name, SIZES[name], data_dir, args)
+            results['sizes'][name] = result
+            print(f"{name}: {result['counts']['wav_files']} WAV files, {result['counts']['detections']} detections, "
+                  f"{result['counts']['segments']} segments")
+            for stage, seconds in result['stages'].items():
+                print(f"  {stage:>14}: {seconds:>9.3f}s")
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
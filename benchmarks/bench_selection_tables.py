@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Make the application modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from selection_tables import raven_columns, write_selection_table
+
+
+def make_detections(rows, hours):
+    """Build the compact detection table of one WAV file, as returned by read_detection_csv"""
+    rng = np.random.default_rng(0)
+    scores = rng.uniform(0.6, 1.0, rows).astype(np.float32)
+    return pd.DataFrame({
+        'Detection_Seconds': np.sort(rng.integers(0, hours * 3600, rows)).astype(np.int64),
+        'background': (1.0 - scores).astype(np.float32),
+        'trumpet': scores,
+    })
+
+
+def legacy_write(path, detections, time_offset, segment_length):
+    """The per-row table builder used by write_folder_tables before vectorization"""
+    content = "Selection\tView\tChannel\tBegin Time (s)\tEnd Time (s)\tLow Freq (Hz)\tHigh Freq (Hz)\n"
+    for selection_id, (_, row) in enumerate(detections.iterrows(), 1):
+        event_start_seconds = row['Detection_Seconds'] + time_offset
+        event_end_seconds = event_start_seconds + segment_length
+        content += (
+            f"{selection_id}\tSpectrogram 1\t1\t{event_start_seconds:.2f}\t{event_end_seconds:.2f}\t"
+            f"{row['background'] * 1000:.2f}\t{row['trumpet'] * 5000:.2f}\n"
+        )
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def vectorized_write(path, detections, time_offset, segment_length):
+    begin_times = detections['Detection_Seconds'].to_numpy(dtype=np.float64) + time_offset
+    write_selection_table(path, raven_columns(begin_times, begin_times + segment_length,
+                                              detections['background'].to_numpy(dtype=np.float64) * 1000,
+                                              detections['trumpet'].to_numpy(dtype=np.float64) * 5000))
+
+
+def best_of(func, repeat):
+    """Run func several times and return the fastest wall time"""
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy and the streaming selection table writer")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--hours", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-max-rows", type=int, default=50000,
+                        help="Skip the legacy writer above this many rows, it grows quadratically")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="eloc_tables_") as work_dir:
+        legacy_path = os.path.join(work_dir, "legacy.txt")
+        vector_path = os.path.join(work_dir, "vectorized.txt")
+
+        print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+        for rows in args.rows:
+            detections = make_detections(rows, args.hours)
+            vector_time = best_of(lambda: vectorized_write(vector_path, detections, -2, 5), args.repeat)
+            if rows > args.legacy_max_rows:
+                print(f"{rows:>10} {'-':>12} {vector_time:>15.4f} {'-':>9}")
+                continue
+
+            legacy_time = best_of(lambda: legacy_write(legacy_path, detections, -2, 5), args.repeat)
+            with open(legacy_path, 'r') as legacy, open(vector_path, 'r') as vector:
+                if legacy.read() != vector.read():
+                    print(f"Tables differ for {rows} rows!")
+                    sys.exit(1)
+            print(f"{rows:>10} {legacy_time:>12.3f} {vector_time:>15.4f} {legacy_time / vector_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import concurrent.futures
+
+import numpy as np
+
+# Make the application modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from setup_ffmpeg import find_ffmpeg
+from snippet_codec import SNIPPET_CODEC_FLAC, SNIPPET_CODEC_WAV, SnippetEncoder, encode_samples, make_fmt_chunk
+from wav_segments import WAVE_FORMAT_PCM, read_frames, read_wav_header, segment_frame_range
+
+# Codec, downmix and decimation of every setting that is compared
+SETTINGS = [
+    ("wav", SNIPPET_CODEC_WAV, False, 1),
+    ("wav mono 1/4", SNIPPET_CODEC_WAV, True, 4),
+    ("flac", SNIPPET_CODEC_FLAC, False, 1),
+    ("flac mono", SNIPPET_CODEC_FLAC, True, 1),
+    ("flac mono 1/4", SNIPPET_CODEC_FLAC, True, 4),
+]
+
+
+def make_snippets(count, seconds, sample_rate, channels):
+    """Noise with a low rumble, roughly what a field recording of a detection looks like"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    snippets = []
+    for _ in range(count):
+        rumble = 3000 * np.sin(2 * np.pi * rng.uniform(15, 40) * t)
+        samples = np.column_stack([rumble + rng.normal(0, 300, len(t)) for _ in range(channels)])
+        snippets.append(encode_samples(samples, WAVE_FORMAT_PCM, 2))
+    return make_fmt_chunk(WAVE_FORMAT_PCM, channels, sample_rate, 2), snippets
+
+
+def load_snippets(wav_path, count, seconds):
+    """count snippets spread evenly over a recording"""
+    info = read_wav_header(wav_path)
+    step = max(seconds, info.duration / count)
+    snippets = []
+    with open(wav_path, 'rb') as src:
+        for index in range(count):
+            start_frame, end_frame = segment_frame_range(info, index * step, index * step + seconds)
+            if end_frame > start_frame:
+                snippets.append(read_frames(src, info, start_frame, end_frame))
+    return info.fmt_chunk, snippets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compression ratio and throughput of the snippet encodings")
+    parser.add_argument("--wav", default=None, help="Cut the snippets from this recording instead of synthetic audio")
+    parser.add_argument("--snippets", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--channels", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if args.wav:
+        fmt_chunk, snippets = load_snippets(args.wav, args.snippets, args.seconds)
+    else:
+        fmt_chunk, snippets = make_snippets(args.snippets, args.seconds, args.sample_rate, args.channels)
+    pcm_bytes = sum(len(data) for data in snippets)
+    ffmpeg_path = find_ffmpeg()
+
+    print(f"{len(snippets)} snippets, {pcm_bytes / 1e6:.1f} MB of audio, {args.workers} workers")
+    print(f"{'setting':>14} {'written (MB)':>13} {'ratio':>7} {'wall (s)':>9} {'MB/s':>8}")
+    with tempfile.TemporaryDirectory(prefix="eloc_codec_") as work_dir:
+        for name, codec, downmix, decimation in SETTINGS:
+            encoder = SnippetEncoder(fmt_chunk, codec, downmix, decimation, ffmpeg_path)
+            if encoder.codec != codec:
+                print(f"{name:>14} skipped: {encoder.notice}")
+                continue
+            start_time = time.perf_counter()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as pool:
+                results = list(pool.map(lambda item: encoder.write(item[1], os.path.join(
+                    work_dir, f"snippet_{item[0]:04d}{encoder.extension}")), enumerate(snippets)))
+            elapsed = time.perf_counter() - start_time
+            written = sum(size for size, _ in results)
+            print(f"{name:>14} {written / 1e6:>13.2f} {pcm_bytes / written:>6.1f}x {elapsed:>9.2f} "
+                  f"{pcm_bytes / 1e6 / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
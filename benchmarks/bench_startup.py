@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that are only imported once processing starts (PIL once the window is shown), they must
+# not show up at startup
+LAZY_MODULES = ('pandas', 'numpy', 'pydub', 'PIL')
+
+# Time from starting Python to the GUI module being imported, and to the window being drawn
+DEFAULT_IMPORT_BUDGET_MS = 150
+DEFAULT_WINDOW_BUDGET_MS = 600
+
+# Run in a fresh interpreter: create the main window, let Tk draw it once and report the time
+WINDOW_SCRIPT = """
+import time
+start_time = time.perf_counter()
+import json, sys
+sys.path.insert(0, {repo_dir!r})
+import eloc_audio_processor
+imported = time.perf_counter()
+app = eloc_audio_processor.ElocAudioProcessor()
+app.update()
+shown = time.perf_counter()
+app.on_close()
+print(json.dumps({{'import_ms': (imported - start_time) * 1000, 'window_ms': (shown - start_time) * 1000,
+                   'modules': sorted(sys.modules)}}))
+"""
+
+
+def parse_importtime(stderr):
+    """Cumulative import time in milliseconds of every module from python -X importtime output"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000.0
+    return times
+
+
+def time_import(module, repeat):
+    """Fastest cold import of module in a fresh interpreter, with the slowest modules it pulled in"""
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True)
+        times = parse_importtime(result.stderr)
+        if best is None or times[module] < best[module]:
+            best = times
+    return best
+
+
+def time_window(repeat):
+    """Time until the main window is drawn, None if there is no display"""
+    best = None
+    script = WINDOW_SCRIPT.format(repo_dir=REPO_DIR)
+    # The window writes its progress log to the current directory
+    with tempfile.TemporaryDirectory(prefix="eloc_startup_") as work_dir:
+        for _ in range(repeat):
+            result = subprocess.run([sys.executable, "-c", script], cwd=work_dir, capture_output=True, text=True)
+            if result.returncode != 0:
+                return None
+            timing = json.loads(result.stdout.strip().splitlines()[-1])
+            if best is None or timing['window_ms'] < best['window_ms']:
+                best = timing
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the cold start of the GUI against a time budget")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS)
+    parser.add_argument("--window-budget-ms", type=float, default=DEFAULT_WINDOW_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to list")
+    parser.add_argument("--output", default="bench_startup.json", help="JSON file for the results")
+    args = parser.parse_args()
+
+    times = time_import("eloc_audio_processor", args.repeat)
+    import_ms = times["eloc_audio_processor"]
+    # Modules imported directly by the application modules, the ones worth making lazy
+    slowest = sorted(((name, ms) for name, ms in times.items() if name != "eloc_audio_processor"),
+                     key=lambda item: item[1], reverse=True)[:args.top]
+    eager = [name for name in LAZY_MODULES if name in times]
+
+    window = time_window(args.repeat)
+    if window is not None:
+        eager = sorted(set(eager) | {name for name in LAZY_MODULES if name in window['modules']
+                                     and name != 'PIL'})
+
+    print(f"Import of eloc_audio_processor: {import_ms:.1f} ms (budget {args.import_budget_ms:.0f} ms)")
+    for name, ms in slowest:
+        print(f"  {name:>30}: {ms:>8.1f} ms")
+    if window is not None:
+        print(f"Window drawn after {window['window_ms']:.1f} ms (budget {args.window_budget_ms:.0f} ms)")
+    else:
+        print("Window not measured (no display)")
+    if eager:
+        print(f"Imported at startup but expected to be lazy: {', '.join(eager)}")
+
+    over_budget = import_ms > args.import_budget_ms or (window is not None and window['window_ms'] > args.window_budget_ms)
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'import_ms': round(import_ms, 1),
+        'window_ms': round(window['window_ms'], 1) if window is not None else None,
+        'slowest_imports': {name: round(ms, 1) for name, ms in slowest},
+        'eager_modules': eager,
+        'within_budget': not over_budget and not eager,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=1)
+    print(f"Results written to {args.output}")
+    return 0 if results['within_budget'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
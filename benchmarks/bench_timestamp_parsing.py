@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import argparse
+import calendar
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# Make the application modules importable when run from the benchmarks folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eloc_engine import ElocEngine
+
+
+def make_detections(rows, days):
+    """Build an EI-results style table with one detection every few seconds over several days"""
+    start = pd.Timestamp("2025-03-10 00:00:00")
+    offsets = np.sort(np.random.default_rng(0).integers(0, days * 86400, rows))
+    timestamps = start + pd.to_timedelta(offsets, unit="s")
+    return pd.DataFrame({
+        "Hour:Min:Sec Day": timestamps.strftime("%H:%M:%S %a"),
+        "Month Date Year": " " + timestamps.strftime("%b %d %Y") + " ",
+    })
+
+
+def legacy_parse(processor, data):
+    """The per-row parsing path used by process_folder before vectorization"""
+    date_columns = data["Month Date Year"].str.strip().str.split(expand=True)
+    recording_start = data["Hour:Min:Sec Day"].apply(lambda x: x.split()[0])
+    recording_seconds = recording_start.apply(processor.time_to_seconds)
+    date_keys = date_columns[2] + "-" + date_columns[0] + "-" + date_columns[1]
+    day_seconds = {key: calendar.timegm(datetime.strptime(key, "%Y-%b-%d").timetuple()) for key in date_keys.unique()}
+    return (date_keys.map(day_seconds) + recording_seconds).to_numpy(dtype=np.int64)
+
+
+def best_of(func, repeat):
+    """Run func several times and return the fastest wall time and the last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and vectorized EI-results timestamp parsing")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    processor = ElocEngine()
+
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for rows in args.rows:
+        data = make_detections(rows, args.days)
+        legacy_time, legacy_result = best_of(lambda: legacy_parse(processor, data), args.repeat)
+        vector_time, vector_result = best_of(lambda: processor.parse_detection_times(data), args.repeat)
+        if not np.array_equal(legacy_result, vector_result):
+            print(f"Results differ for {rows} rows!")
+            sys.exit(1)
+        print(f"{rows:>10} {legacy_time:>12.3f} {vector_time:>15.3f} {legacy_time / vector_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
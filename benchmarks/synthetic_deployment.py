@@ -0,0 +1,147 @@
+import os
+import struct
+import argparse
+import calendar
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+# Seconds of noise generated at a time and repeated through each recording, keeps generation fast
+NOISE_BLOCK_SECONDS = 10
+
+
+def session_epoch_ms(start, utc_offset_hours=0):
+    """Epoch in milliseconds (UTC) of a recording session that starts at the local time start"""
+    return (calendar.timegm(start.timetuple()) - int(utc_offset_hours * 3600)) * 1000
+
+
+def wav_filename(prefix, epoch_ms, start):
+    """ELOC recording name: <prefix>_<session epoch ms>_<YYYY-MM-DD>_<HH-MM-SS>.wav with the local date and time
+    of the recording, every file of a session carries the epoch of the session"""
+    return f"{prefix}_{epoch_ms}_{start.strftime('%Y-%m-%d')}_{start.strftime('%H-%M-%S')}.wav"
+
+
+def write_wav(path, seconds, sample_rate, channels=1, sparse=False, rng=None):
+    """Write a 16-bit PCM WAV file of the given length.
+
+    The samples are low-level noise. With sparse=True the data chunk is left as a hole
+    in the file (silence), so month-scale datasets do not need their full size on disk.
+    """
+    block_align = channels * 2
+    data_size = int(seconds * sample_rate) * block_align
+    header = (struct.pack('<4sI4s', b'RIFF', 36 + data_size, b'WAVE')
+              + struct.pack('<4sIHHIIHH', b'fmt ', 16, 1, channels, sample_rate,
+                            sample_rate * block_align, block_align, 16)
+              + struct.pack('<4sI', b'data', data_size))
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        if sparse:
+            f.truncate(len(header) + data_size)
+            return data_size
+
+        rng = rng or np.random.default_rng(0)
+        block = rng.normal(0, 300, NOISE_BLOCK_SECONDS * sample_rate * channels).astype('<i2').tobytes()
+        remaining = data_size
+        while remaining > 0:
+            chunk = block[:remaining]
+            f.write(chunk)
+            remaining -= len(chunk)
+    return data_size
+
+
+def detection_rows(recording_starts, recording_seconds, detections_per_hour, rng):
+    """Random detection times (local wall-clock) spread over the recordings, sorted"""
+    per_recording = max(0, int(round(detections_per_hour * recording_seconds / 3600.0)))
+    times = []
+    for start in recording_starts:
+        # Keep a few seconds of margin so every snippet falls inside its recording
+        offsets = np.sort(rng.integers(5, max(6, int(recording_seconds) - 10), per_recording))
+        times.append(pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s'))
+    if not times:
+        return pd.DatetimeIndex([])
+    return pd.DatetimeIndex(np.concatenate([t.values for t in times]))
+
+
+def write_detection_csv(path, timestamps, sound_type, rng):
+    """Write an EI-results CSV in the layout produced by the ELOC inference firmware"""
+    scores = np.round(rng.uniform(0.6, 1.0, len(timestamps)), 2)
+    data = pd.DataFrame({
+        'Hour:Min:Sec Day': timestamps.strftime('%H:%M:%S %a'),
+        ' Month Date Year ': ' ' + timestamps.strftime('%b %d %Y') + ' ',
+        'background ': [f" {value:.2f}" for value in 1.0 - scores],
+        sound_type: [f" {value:.2f}" for value in scores],
+    })
+    with open(path, 'w', newline='') as f:
+        f.write("\n\n")  # The firmware starts the file with two empty lines
+        data.to_csv(f, index=False, lineterminator="\n")
+
+
+def make_deployment(folder_path, start, hours, sample_rate=16000, detections_per_hour=120, prefix="test2",
+                    recording_seconds=3600, utc_offset_hours=0, sound_type="trumpet", sparse=False, seed=0):
+    """Create one ELOC deployment folder with hourly WAV files and a matching EI-results CSV.
+
+    Returns a dict describing the deployment (files, detections and bytes written).
+    """
+    os.makedirs(folder_path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    recording_starts = [start + timedelta(seconds=i * recording_seconds) for i in range(hours * 3600 // recording_seconds)]
+    epoch_ms = session_epoch_ms(start, utc_offset_hours)
+    wav_bytes = 0
+    for recording_start in recording_starts:
+        wav_path = os.path.join(folder_path, wav_filename(prefix, epoch_ms, recording_start))
+        wav_bytes += write_wav(wav_path, recording_seconds, sample_rate, sparse=sparse, rng=rng)
+
+    timestamps = detection_rows(recording_starts, recording_seconds, detections_per_hour, rng)
+    csv_path = os.path.join(folder_path, f"EI-results-ID-{seed:06d}-DEPLOY-VER-1.csv")
+    write_detection_csv(csv_path, timestamps, sound_type, rng)
+
+    return {
+        'folder': folder_path,
+        'wav_files': len(recording_starts),
+        'detections': len(timestamps),
+        'wav_bytes': wav_bytes,
+        'csv_bytes': os.path.getsize(csv_path),
+        'sample_rate': sample_rate,
+        'sparse': sparse,
+    }
+
+
+def make_dataset(root, folders=1, hours=2, sample_rate=16000, detections_per_hour=120, sparse=False,
+                 start=datetime(2025, 3, 10, 0, 0, 0), prefix="test2", utc_offset_hours=0, seed=0):
+    """Create several deployment folders under root, each starting where the previous one ended"""
+    deployments = []
+    for index in range(folders):
+        folder_start = start + timedelta(hours=index * hours)
+        folder_path = os.path.join(root, f"{prefix}_{session_epoch_ms(folder_start, utc_offset_hours)}")
+        deployments.append(make_deployment(folder_path, folder_start, hours, sample_rate, detections_per_hour,
+                                           prefix, utc_offset_hours=utc_offset_hours, sparse=sparse, seed=seed + index))
+    return deployments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic ELOC deployments (hourly WAVs and EI-results CSVs)")
+    parser.add_argument("root", help="Folder to create the deployment folders in")
+    parser.add_argument("--folders", type=int, default=1)
+    parser.add_argument("--hours", type=int, default=2, help="Hours of recordings per folder")
+    parser.add_argument("--sample-rate", type=int, default=16000)
+    parser.add_argument("--detections-per-hour", type=float, default=120)
+    parser.add_argument("--start", default="2025-03-10 00:00:00", help="Local start time of the first recording")
+    parser.add_argument("--utc-offset", type=float, default=0, help="Hours between local time and UTC")
+    parser.add_argument("--prefix", default="test2")
+    parser.add_argument("--sparse", action="store_true", help="Leave the sample data as holes in the files (silence)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, '%Y-%m-%d %H:%M:%S')
+    deployments = make_dataset(args.root, args.folders, args.hours, args.sample_rate, args.detections_per_hour,
+                               args.sparse, start, args.prefix, args.utc_offset, args.seed)
+    for deployment in deployments:
+        print(f"{deployment['folder']}: {deployment['wav_files']} WAV files, {deployment['detections']} detections, "
+              f"{deployment['wav_bytes'] / 1e6:.1f} MB of audio")
+
+
+if __name__ == "__main__":
+    main()
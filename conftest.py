@@ -0,0 +1,2 @@
+# Marks the repository root for pytest, which puts this directory on sys.path so the
+# tests import the application modules (eloc_engine, wav_segments, ...) directly
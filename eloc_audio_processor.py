@@ -1,33 +1,70 @@
 import os
-import glob
-import pandas as pd
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import threading
 import string
 import ctypes
-import concurrent.futures
+import multiprocessing
 from datetime import datetime
-import csv
 import time
-import logging
 import sys
-import warnings
-from tkinterdnd2 import DND_FILES, TkinterDnD
+import itertools
 
-# Suppress the ffmpeg warning from pydub
-warnings.filterwarnings("ignore", category=RuntimeWarning, 
-                       message="Couldn't find ffmpeg or avconv - defaulting to ffmpeg, but may not work")
-
-# Import pydub after suppressing the warning
 try:
-    from pydub import AudioSegment
-    PYDUB_AVAILABLE = True
+    from tkinterdnd2 import DND_FILES, TkinterDnD
+    # A TkinterDnD.Tk window loads the tkdnd library when it is created
+    WindowBase = TkinterDnD.Tk
 except ImportError:
-    PYDUB_AVAILABLE = False
-    print("Warning: pydub module not available. Audio extraction will be disabled.")
+    DND_FILES = None
+    WindowBase = tk.Tk
+
+from eloc_engine import (ElocEngine, DEFAULT_READERS_PER_DEVICE, ENGINE_PROCESSES, ENGINE_THREADS,
+                         TABLE_LAYOUT_BOTH, TABLE_LAYOUT_DEPLOYMENT, TABLE_LAYOUT_PER_WAV, SNIPPETS_ARCHIVE, SNIPPETS_FILES,
+                         SNIPPET_CODEC_FLAC, SNIPPET_CODEC_WAV, create_output_dirs, make_folder_job)
+from eloc_metrics import METRICS_FILENAME, RunMetrics
+from eloc_progress import ProgressTracker
+from eloc_trace import TRACE_ENV_VAR, TraceRecorder
+from status_log import StatusLog
+
+# Interval in milliseconds at which the status bar shows the latest message
+STATUS_REFRESH_MS = 100
+
+# Folder of the application, the icons and the README are next to this file
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Choices of the Selection Tables option
+TABLE_LAYOUT_CHOICES = {
+    "One per Recording": TABLE_LAYOUT_PER_WAV,
+    "One per Deployment": TABLE_LAYOUT_DEPLOYMENT,
+    "Both": TABLE_LAYOUT_BOTH,
+}
+
+# Choices of the Audio Snippets option
+SNIPPET_FORMAT_CHOICES = {
+    "One File per Snippet": SNIPPETS_FILES,
+    "One Archive per Recording": SNIPPETS_ARCHIVE,
+}
 
-class ElocAudioProcessor(TkinterDnD.Tk):
+# Choices of the Snippet Encoding option: codec, downmix to mono, and decimation factor
+SNIPPET_ENCODING_CHOICES = {
+    "WAV": (SNIPPET_CODEC_WAV, False, 1),
+    "FLAC (Lossless)": (SNIPPET_CODEC_FLAC, False, 1),
+    "FLAC, Mono": (SNIPPET_CODEC_FLAC, True, 1),
+    "FLAC, Mono, 1/4 Rate": (SNIPPET_CODEC_FLAC, True, 4),
+    "WAV, Mono, 1/4 Rate": (SNIPPET_CODEC_WAV, True, 4),
+}
+
+# Choices of the Output Location option: whether outputs are staged locally, and whether the local copy is kept
+OUTPUT_LOCATION_CHOICES = {
+    "In Each Folder": (False, False),
+    "Local Staging, Copy Back": (True, False),
+    "Local Staging, Mirror": (True, True),
+}
+
+# Local directory the outputs are staged in before they are copied to the SD card
+STAGING_DIR = os.path.join(os.path.expanduser("~"), "ELOC_Staging")
+
+class ElocAudioProcessor(WindowBase):
     def __init__(self):
         super().__init__()
         
@@ -44,6 +81,9 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         # Store mapping of folder names to their full paths for drag & drop
         self.folder_path_mapping = {}
         
+        # Scanning and processing of folders, status messages go to update_status
+        self.engine = ElocEngine(status_callback=self.update_status)
+        
         # Processing state tracking
         self.is_processing = False
         self.stop_processing = False
@@ -55,6 +95,16 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         with open(self.log_file_path, 'w') as f:
             f.write(f"ELOC Audio Processor Log - Started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write("-" * 80 + "\n\n")
+        # Messages are written by a background thread in batches
+        self.status_log = StatusLog(self.log_file_path)
+        
+        # Latest status message from any thread as (sequence number, message), shown by refresh_status_bar
+        self.status_sequence = itertools.count(1)
+        self.latest_status = (0, None)
+        self.shown_status = 0
+        
+        # Byte-based progress of the current run, shown by refresh_status_bar
+        self.progress = None
         
         # Create a style for ttk widgets
         self.style = ttk.Style()
@@ -116,47 +166,21 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         # Create and place widgets
         self.create_widgets()
         
+        # Show status messages at a fixed refresh rate and flush the log when the window closes
+        self.after(STATUS_REFRESH_MS, self.refresh_status_bar)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # PIL is loaded for the icons once the window is shown
+        self.after_idle(self.load_header_icons)
+        
     def create_widgets(self):
         # Header section with logo and title
         header_frame = ttk.Frame(self.main_frame)
         header_frame.pack(fill=tk.X, pady=(0, 35))  # Increased bottom margin
         
-        # Load the ELOC icon with size reduction and transparency
-        try:
-            from PIL import Image, ImageTk
-            
-            # Open the image with PIL
-            original_image = Image.open("ELOC-icon.png")
-            
-            # Calculate the resize ratio to get 150px width while maintaining aspect ratio
-            width_percent = (80 / float(original_image.size[0]))
-            new_height = int((float(original_image.size[1]) * float(width_percent)))
-            
-            # Resize the image
-            resized_image = original_image.resize((80, new_height), Image.LANCZOS)
-            
-            # Add 30% transparency (70% opacity)
-            if resized_image.mode != 'RGBA':
-                resized_image = resized_image.convert('RGBA')
-            
-            # Create a new image with transparency
-            data = resized_image.getdata()
-            new_data = []
-            for item in data:
-                # Change all pixels to have 70% of their original opacity
-                new_data.append((item[0], item[1], item[2], int(item[3] * 0.7) if len(item) > 3 else int(255 * 0.7)))
-            
-            resized_image.putdata(new_data)
-            
-            # Convert to PhotoImage for tkinter
-            icon_image = ImageTk.PhotoImage(resized_image)
-            
-            # Display the image
-            icon_label = ttk.Label(header_frame, image=icon_image, background='#54613b')
-            icon_label.image = icon_image  # Keep a reference to prevent garbage collection
-            icon_label.pack(side=tk.LEFT, padx=(0, 30))  # Increased right margin
-        except Exception as e:
-            print(f"Error loading or processing icon: {str(e)}")
+        # The ELOC icon, its image is set by load_header_icons
+        self.icon_label = ttk.Label(header_frame, background='#54613b')
+        self.icon_label.pack(side=tk.LEFT, padx=(0, 30))  # Increased right margin
         
         # Title and subtitle in a vertical frame
         title_frame = ttk.Frame(header_frame)
@@ -172,28 +196,13 @@ class ElocAudioProcessor(TkinterDnD.Tk):
                                   font=('Segoe UI', 16), background='#54613b', foreground='#20241d')
         subtitle_label.pack(anchor=tk.W)
         
-        # Add help icon on the right side
-        try:
-            from PIL import Image, ImageTk
-            
-            # Open the help icon image
-            help_image = Image.open("help.png")
-            
-            # Resize the help icon to appropriate size
-            help_image = help_image.resize((30, 30), Image.LANCZOS)
-            
-            # Convert to PhotoImage for tkinter
-            help_icon = ImageTk.PhotoImage(help_image)
-            
-            # Create a label for the help icon and place it on the right side of the header
-            help_label = ttk.Label(header_frame, image=help_icon, background='#54613b', cursor="hand2")
-            help_label.image = help_icon  # Keep a reference to prevent garbage collection
-            help_label.pack(side=tk.RIGHT, padx=10)
-            
-            # Bind click event to open README
-            help_label.bind("<Button-1>", lambda e: self.open_readme())
-        except Exception as e:
-            print(f"Error loading help icon: {str(e)}")
+        # Add help icon on the right side, shown as "?" until load_header_icons sets its image
+        self.help_label = ttk.Label(header_frame, text="?", font=('Segoe UI', 16, 'bold'), background='#54613b',
+                                    foreground='#20241d', cursor="hand2")
+        self.help_label.pack(side=tk.RIGHT, padx=10)
+        
+        # Bind click event to open README
+        self.help_label.bind("<Button-1>", lambda e: self.open_readme())
         
         # Drive selection section
         drive_frame = ttk.Frame(self.main_frame)
@@ -233,9 +242,10 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         self.folder_tree = ttk.Treeview(list_frame, columns=columns, show="headings", selectmode="extended")
         self.folder_tree.pack(fill=tk.BOTH, expand=True)
         
-        # Set up drag and drop for the folder list
-        self.folder_tree.drop_target_register(DND_FILES)
-        self.folder_tree.dnd_bind('<<Drop>>', self.on_drop)
+        # Set up drag and drop for the folder list (without tkinterdnd2 folders are only added with the buttons)
+        if DND_FILES is not None:
+            self.folder_tree.drop_target_register(DND_FILES)
+            self.folder_tree.dnd_bind('<<Drop>>', self.on_drop)
         
         # Configure scrollbar
         scrollbar.config(command=self.folder_tree.yview)
@@ -274,6 +284,24 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         ttk.Spinbox(param_frame, from_=1, to=30, increment=1, textvariable=self.segment_length_var, width=10,
                    style='TSpinbox').grid(row=1, column=1, padx=5, pady=5)
         
+        # Number of files read at the same time from one drive, 0 for no limit
+        ttk.Label(param_frame, text="Readers per SD/USB Drive (0 = all):").grid(row=2, column=0, sticky=tk.W, padx=5, pady=5)
+        self.readers_per_device_var = tk.IntVar(value=DEFAULT_READERS_PER_DEVICE)
+        ttk.Spinbox(param_frame, from_=0, to=16, increment=1, textvariable=self.readers_per_device_var, width=10,
+                   style='TSpinbox').grid(row=2, column=1, padx=5, pady=5)
+        
+        # One table per WAV file, one multi-file table with a Raven listfile per deployment, or both
+        ttk.Label(param_frame, text="Selection Tables:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=5)
+        self.table_layout_var = tk.StringVar(value="One per Recording")
+        ttk.Combobox(param_frame, textvariable=self.table_layout_var, values=list(TABLE_LAYOUT_CHOICES),
+                     state='readonly', width=18).grid(row=3, column=1, padx=5, pady=5)
+        
+        # Write to the folders directly, or to fast local storage and copy each finished folder back
+        ttk.Label(param_frame, text="Output Location:").grid(row=4, column=0, sticky=tk.W, padx=5, pady=5)
+        self.output_location_var = tk.StringVar(value="In Each Folder")
+        ttk.Combobox(param_frame, textvariable=self.output_location_var, values=list(OUTPUT_LOCATION_CHOICES),
+                     state='readonly', width=24).grid(row=4, column=1, padx=5, pady=5)
+        
         # Processing options
         ttk.Label(param_frame, text="Processing Options:").grid(row=0, column=2, sticky=tk.W, padx=(20, 5), pady=5)
         
@@ -286,6 +314,23 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         ttk.Checkbutton(param_frame, text="Cut and Copy Detected Soundfiles", 
                        variable=self.extract_audio_var).grid(row=1, column=3, sticky=tk.W, padx=5, pady=5)
         
+        # Run folders in separate processes to use all CPU cores
+        self.use_processes_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(param_frame, text="Use Multiple Processes", 
+                       variable=self.use_processes_var).grid(row=2, column=3, sticky=tk.W, padx=5, pady=5)
+        
+        # Single snippet files, or one packed archive (review reel with an index) per WAV file
+        ttk.Label(param_frame, text="Audio Snippets:").grid(row=3, column=2, sticky=tk.W, padx=(20, 5), pady=5)
+        self.snippet_format_var = tk.StringVar(value="One File per Snippet")
+        ttk.Combobox(param_frame, textvariable=self.snippet_format_var, values=list(SNIPPET_FORMAT_CHOICES),
+                     state='readonly', width=24).grid(row=3, column=3, sticky=tk.W, padx=5, pady=5)
+        
+        # Uncompressed WAV, lossless FLAC, and mono or lower sample rates for low-frequency calls
+        ttk.Label(param_frame, text="Snippet Encoding:").grid(row=4, column=2, sticky=tk.W, padx=(20, 5), pady=5)
+        self.snippet_encoding_var = tk.StringVar(value="WAV")
+        ttk.Combobox(param_frame, textvariable=self.snippet_encoding_var, values=list(SNIPPET_ENCODING_CHOICES),
+                     state='readonly', width=24).grid(row=4, column=3, sticky=tk.W, padx=5, pady=5)
+        
         # Process button
         self.process_button = ttk.Button(self.main_frame, text="Process Selected Folders", 
                                         command=self.process_folders, style='Accent.TButton')
@@ -296,6 +341,11 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         status_bar = ttk.Label(self.main_frame, textvariable=self.status_var, relief='flat', anchor=tk.W)
         status_bar.pack(fill=tk.X, pady=(20, 0))
         
+        # Percentage, throughput and remaining time of the current run
+        self.progress_var = tk.StringVar(value="")
+        progress_bar = ttk.Label(self.main_frame, textvariable=self.progress_var, relief='flat', anchor=tk.W)
+        progress_bar.pack(fill=tk.X, pady=(5, 0))
+        
         # Initialize drives list
         self.refresh_drives()
         
@@ -317,6 +367,8 @@ class ElocAudioProcessor(TkinterDnD.Tk):
     
     def refresh_drives(self):
         """Refresh the list of available drives"""
+        # A re-inserted card may have changed without a newer folder mtime (FAT does not always update it)
+        self.engine.folder_scan_cache.clear()
         removable_drives = self.get_removable_drives()
         
         if removable_drives:
@@ -349,7 +401,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
             self.custom_folder_path = folder_path
             
             # Check if the selected folder directly contains wav and csv files
-            is_compatible, wav_count, compatible_csv_count = self.check_folder_compatibility(folder_path)
+            is_compatible, wav_count, compatible_csv_count = self.engine.check_folder_compatibility(folder_path)
             
             if wav_count > 0 and compatible_csv_count > 0:
                 # The selected folder directly contains compatible wav and csv files
@@ -373,7 +425,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
             
             # If we get here, check for subfolders
             try:
-                subfolders = [f for f in os.listdir(folder_path) if os.path.isdir(os.path.join(folder_path, f))]
+                subfolders = self.engine.scan_folder(folder_path)['subfolders']
                 
                 if not subfolders:
                     # If no subfolders and no compatible data in root, show message
@@ -403,7 +455,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
                     compatible_folders = 0
                     for folder in subfolders:
                         subfolder_path = os.path.join(folder_path, folder)
-                        is_compatible, subfolder_wav_count, compatible_csv_count = self.check_folder_compatibility(subfolder_path)
+                        is_compatible, subfolder_wav_count, compatible_csv_count = self.engine.check_folder_compatibility(subfolder_path)
                         
                         # Add to treeview with compatibility status
                         csv_status = "Yes" if is_compatible else "No"
@@ -432,7 +484,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         
         # Get all subfolders
         try:
-            subfolders = [f for f in os.listdir(eloc_path) if os.path.isdir(os.path.join(eloc_path, f))]
+            subfolders = self.engine.scan_folder(eloc_path)['subfolders']
             
             if not subfolders:
                 self.status_var.set(f"No subfolders found in {eloc_path}")
@@ -444,7 +496,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
                 folder_path = os.path.join(eloc_path, folder)
                 
                 # Check folder compatibility
-                is_compatible, wav_count, compatible_csv_count = self.check_folder_compatibility(folder_path)
+                is_compatible, wav_count, compatible_csv_count = self.engine.check_folder_compatibility(folder_path)
                 
                 # Add to treeview with compatibility status
                 csv_status = "Yes" if is_compatible else "No"
@@ -461,37 +513,6 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         except Exception as e:
             self.status_var.set(f"Error scanning folders: {str(e)}")
     
-    def is_csv_compatible(self, csv_path):
-        """Check if a CSV file is compatible with the expected format"""
-        try:
-            # Check if the filename starts with "EI-results"
-            filename = os.path.basename(csv_path)
-            return filename.startswith("EI-results")
-        except Exception as e:
-            self.update_status(f"Error checking CSV compatibility: {str(e)}")
-            return False
-    
-    def check_folder_compatibility(self, folder_path):
-        """Check if a folder has compatible CSV files and at least one WAV file"""
-        # Check for WAV files
-        wav_files = glob.glob(os.path.join(folder_path, "*.wav"))
-        wav_count = len(wav_files)
-        
-        if wav_count == 0:
-            return False, 0, 0  # No WAV files
-        
-        # Check for CSV files
-        csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-        
-        # Check if any CSV file is compatible
-        compatible_csv_count = 0
-        for csv_file in csv_files:
-            if self.is_csv_compatible(csv_file):
-                compatible_csv_count += 1
-        
-        # Return compatibility status, WAV count, and compatible CSV count
-        return compatible_csv_count > 0, wav_count, compatible_csv_count
-    
     def select_folders_with_csv(self):
         """Select all folders that contain compatible CSV files and at least one WAV file"""
         self.folder_tree.selection_set()  # Clear current selection
@@ -532,6 +553,18 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         # Get drive path
         drive_path = self.drive_var.get()
         
+        # Processing options are read here on the Tk thread
+        self.engine.create_tables = self.create_tables_var.get()
+        self.engine.extract_audio = self.extract_audio_var.get()
+        self.engine.table_layout = TABLE_LAYOUT_CHOICES[self.table_layout_var.get()]
+        self.engine.snippet_format = SNIPPET_FORMAT_CHOICES[self.snippet_format_var.get()]
+        self.engine.snippet_codec, self.engine.downmix, self.engine.decimation = \
+            SNIPPET_ENCODING_CHOICES[self.snippet_encoding_var.get()]
+        engine_mode = ENGINE_PROCESSES if self.use_processes_var.get() else ENGINE_THREADS
+        readers_per_device = self.readers_per_device_var.get()
+        staged, keep_staging = OUTPUT_LOCATION_CHOICES[self.output_location_var.get()]
+        staging = (STAGING_DIR, keep_staging) if staged else None
+        
         # Set processing state and update button
         self.is_processing = True
         self.stop_processing = False
@@ -540,7 +573,8 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         # Start processing in a separate thread
         self.status_var.set("Processing started...")
         threading.Thread(target=self.run_processing, 
-                        args=(drive_path, selected_folders, time_offset, segment_length),
+                        args=(drive_path, selected_folders, time_offset, segment_length, engine_mode, readers_per_device,
+                              staging),
                         daemon=True).start()
     
     def update_process_button(self):
@@ -550,8 +584,16 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         else:
             self.process_button.config(text="Process Selected Folders")
     
-    def run_processing(self, drive_path, selected_folders, time_offset, segment_length):
-        """Run the processing in a background thread with parallel processing"""
+    def run_processing(self, drive_path, selected_folders, time_offset, segment_length, engine_mode=ENGINE_THREADS,
+                       readers_per_device=DEFAULT_READERS_PER_DEVICE, staging=None):
+        """Run the processing in a background thread with parallel processing.
+        
+        All folders share one pool of workers, see ElocEngine.run_folder_jobs. With
+        ENGINE_PROCESSES the tasks run in worker processes that only receive a job
+        description, status messages come back through a queue. staging is None or
+        (staging directory, keep local copy), the outputs of each folder are then
+        written locally and copied to the folder when it is finished.
+        """
         try:
             total_folders = len(selected_folders)
             self.update_status(f"Starting to process {total_folders} folders... Please wait.")
@@ -561,10 +603,8 @@ class ElocAudioProcessor(TkinterDnD.Tk):
                 self.update_status("Processing stopped before starting.")
                 return
             
-            # Prepare folder paths and output directories
-            folder_paths = []
-            selection_tables_dirs = []
-            audio_segments_dirs = []
+            # Prepare folder jobs and output directories
+            jobs = []
             
             for folder in selected_folders:
                 # Check for stop signal
@@ -589,16 +629,16 @@ class ElocAudioProcessor(TkinterDnD.Tk):
                     folder_path = os.path.join(drive_path, "eloc", folder)
                 
                 # Create output directories
-                output_base = os.path.join(folder_path, "output")
-                selection_tables_dir = os.path.join(output_base, "Raven_Selection_Tables")
-                audio_segments_dir = os.path.join(output_base, "Audio_Segments")
-                
-                os.makedirs(selection_tables_dir, exist_ok=True)
-                os.makedirs(audio_segments_dir, exist_ok=True)
+                staging_root, keep_staging = staging or (None, True)
+                selection_tables_dir, audio_segments_dir = create_output_dirs(folder_path, staging_root)
+                mirror_to = os.path.join(folder_path, "output") if staging_root else None
                 
-                folder_paths.append(folder_path)
-                selection_tables_dirs.append(selection_tables_dir)
-                audio_segments_dirs.append(audio_segments_dir)
+                jobs.append(make_folder_job(folder_path, selection_tables_dir, audio_segments_dir,
+                                            time_offset, segment_length,
+                                            self.engine.create_tables, self.engine.extract_audio,
+                                            self.engine.table_layout, self.engine.snippet_format,
+                                            mirror_to, keep_staging, snippet_codec=self.engine.snippet_codec,
+                                            downmix=self.engine.downmix, decimation=self.engine.decimation))
             
             # Check for stop signal before processing
             if self.stop_processing:
@@ -608,513 +648,106 @@ class ElocAudioProcessor(TkinterDnD.Tk):
             # Process folders with parallel execution
             self.update_status(f"Processing {total_folders} folders in parallel... Please wait.")
             
-            # Use a ThreadPoolExecutor for parallel processing
-            # Limit the number of workers to avoid overloading the system
-            max_workers = min(os.cpu_count() or 4, total_folders)
-            self.update_status(f"Using {max_workers} parallel workers for processing.")
-            
             start_time = time.time()
+            completed_count = 0
             
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit all folder processing tasks
-                futures = []
-                for i, (folder_path, selection_tables_dir, audio_segments_dir) in enumerate(
-                    zip(folder_paths, selection_tables_dirs, audio_segments_dirs), 1
-                ):
-                    # Check for stop signal
-                    if self.stop_processing:
-                        self.update_status("Processing stopped during task submission.")
-                        break
-                    
-                    self.update_status(f"Submitting folder {i}/{total_folders}: {os.path.basename(folder_path)}")
-                    future = executor.submit(
-                        self.process_folder_parallel,
-                        folder_path, 
-                        selection_tables_dir, 
-                        audio_segments_dir, 
-                        time_offset, 
-                        segment_length,
-                        i,
-                        total_folders
-                    )
-                    futures.append(future)
-                
-                # Wait for all tasks to complete and handle results
-                completed_count = 0
-                for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
-                    # Check for stop signal
-                    if self.stop_processing:
-                        self.update_status("Processing stopped. Waiting for current tasks to complete...")
-                        # Cancel remaining futures
-                        for remaining_future in futures:
-                            remaining_future.cancel()
-                        break
-                    
-                    try:
-                        result = future.result()
-                        completed_count += 1
-                        self.update_status(f"Completed folder {completed_count}/{len(futures)}: {result}")
-                    except Exception as e:
-                        self.update_status(f"Error processing folder {i}: {str(e)}")
+            def folder_done(pipeline):
+                nonlocal completed_count
+                if pipeline.error is None and not pipeline.cancelled:
+                    completed_count += 1
+                    self.update_status(f"Completed folder {completed_count}/{total_folders}: {pipeline.folder_name}")
+            
+            # Timing and throughput of every stage, per folder and per WAV file
+            metrics = RunMetrics()
+            
+            # Timeline of every task for profiling, only when ELOC_TRACE names a file
+            trace_path = os.environ.get(TRACE_ENV_VAR)
+            trace = TraceRecorder() if trace_path else None
+            
+            # Planned and completed WAV bytes and segments for the progress line
+            self.progress = ProgressTracker()
+            
+            # Limit the number of workers to avoid overloading the system
+            max_workers = os.cpu_count() or 4
+            self.engine.run_folder_jobs(jobs, max_workers, engine_mode,
+                                        should_stop=lambda: self.stop_processing, on_folder_done=folder_done,
+                                        readers_per_device=readers_per_device, metrics=metrics, trace=trace,
+                                        progress=self.progress)
             
             end_time = time.time()
             processing_time = end_time - start_time
             
+            # Write the metrics next to the progress log and summarize them
+            metrics.finish()
+            metrics_summary = metrics.summary()
+            for line in metrics_summary:
+                self.update_status(line)
+            metrics_path = os.path.join(os.path.dirname(os.path.abspath(self.log_file_path)), METRICS_FILENAME)
+            try:
+                metrics.save(metrics_path)
+            except OSError as e:
+                self.update_status(f"Could not write metrics file {metrics_path}: {str(e)}")
+            summary_text = "\n\n" + "\n".join(metrics_summary)
+            
+            if trace is not None:
+                try:
+                    trace.save(trace_path)
+                    self.update_status(f"Trace written to {trace_path}")
+                except OSError as e:
+                    self.update_status(f"Could not write trace file {trace_path}: {str(e)}")
+            
             if self.stop_processing:
                 self.update_status(f"Processing stopped by user after {processing_time:.2f} seconds. {completed_count} folders completed.")
                 messagebox.showinfo("Processing Stopped", 
-                                   f"Processing was stopped by user. {completed_count} folders were completed in {processing_time:.2f} seconds.")
+                                   f"Processing was stopped by user. {completed_count} folders were completed in {processing_time:.2f} seconds."
+                                   + summary_text)
             else:
                 self.update_status(f"Processing complete! All folders processed in {processing_time:.2f} seconds.")
                 messagebox.showinfo("Processing Complete", 
-                                   f"All selected folders have been processed successfully in {processing_time:.2f} seconds.")
+                                   f"All selected folders have been processed successfully in {processing_time:.2f} seconds."
+                                   + summary_text)
             
         except Exception as e:
             self.update_status(f"Error during processing: {str(e)}")
+            self.status_log.flush()
             messagebox.showerror("Processing Error", f"An error occurred: {str(e)}")
         finally:
+            # Make sure the whole run is in the log file
+            self.status_log.flush()
+            
             # Reset processing state and update button
             self.is_processing = False
             self.stop_processing = False
             self.after(0, self.update_process_button)
     
-    def process_folder_parallel(self, folder_path, selection_tables_dir, audio_segments_dir, 
-                               time_offset, segment_length, folder_index, total_folders):
-        """Process a single folder in a parallel thread"""
-        try:
-            # Update status with thread-safe method
-            self.update_status(f"Processing folder {folder_index}/{total_folders}: {os.path.basename(folder_path)}...")
-            
-            # Process the folder using the existing method
-            self.process_folder(folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length)
-            
-            # Return the folder name for status updates
-            return os.path.basename(folder_path)
-        except Exception as e:
-            # Re-raise the exception to be caught by the executor
-            raise Exception(f"Error processing {os.path.basename(folder_path)}: {str(e)}")
-    
     def update_status(self, message):
         """Update status bar from a background thread and write to log file"""
-        # Update the status bar
-        self.after(0, lambda: self.status_var.set(message))
-        
-        # Write to log file
-        try:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            with open(self.log_file_path, 'a') as f:
-                f.write(f"[{timestamp}] {message}\n")
-        except Exception as e:
-            print(f"Error writing to log file: {str(e)}")
-    
-    def process_folder(self, folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length):
-        """Process a single folder (similar to the original scripts but adapted)"""
-        # Get WAV files and their start times
-        self.update_status(f"Scanning for WAV files in {os.path.basename(folder_path)}... Please wait.")
-        wav_files = glob.glob(os.path.join(folder_path, "*.wav"))
-        
-        if not wav_files:
-            self.update_status(f"No WAV files found in {folder_path}")
-            return
-        
-        self.update_status(f"Found {len(wav_files)} WAV files. Extracting timestamps... Please wait.")
-            
-        wav_start_times = {}
-        wav_file_lookup = {}  # Store WAV file info for better matching
-        month_map = {
-            '01': 'Jan', '02': 'Feb', '03': 'Mar', '04': 'Apr', '05': 'May', '06': 'Jun',
-            '07': 'Jul', '08': 'Aug', '09': 'Sep', '10': 'Oct', '11': 'Nov', '12': 'Dec'
-        }
-        
-        for wav_file in wav_files:
-            datetime_str = self.extract_datetime_from_filename(os.path.basename(wav_file))
-            if datetime_str:
-                date_parts = datetime_str.split()[0].split('-')
-                if len(date_parts) == 3:
-                    year, month_num, day = date_parts
-                    month_text = month_map.get(month_num, month_num)
-                    formatted_date = f"{year}-{month_text}-{day}"
-                    
-                    # Get the actual start time of the WAV file
-                    wav_start_seconds = self.datetime_to_seconds(datetime_str)
-                    
-                    # Store WAV file info with the date for lookup
-                    date_key = f"{year}-{month_text}-{day}"
-                    if date_key not in wav_file_lookup:
-                        wav_file_lookup[date_key] = []
-                    
-                    wav_file_lookup[date_key].append({
-                        'file_path': wav_file,
-                        'start_seconds': wav_start_seconds,
-                        'datetime_str': datetime_str
-                    })
-        
-        # Process CSV files
-        self.update_status(f"Scanning for CSV files in {os.path.basename(folder_path)}... Please wait.")
-        csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-        
-        if not csv_files:
-            self.update_status(f"No CSV files found in {folder_path}")
-            return
-            
-        self.update_status(f"Found {len(csv_files)} CSV files. Processing detection data... Please wait.")
-        
-        for csv_file in csv_files:
-            try:
-                # Load the CSV file
-                data = pd.read_csv(csv_file)
-                
-                # Strip spaces from column names
-                data.columns = data.columns.str.strip()
-
-                # Automatically detect the sound type column (not 'background' or date/time columns)
-                sound_column = None
-                for col in data.columns:
-                    if col not in ['Hour:Min:Sec Day', 'Month Date Year', 'background']:
-                        sound_column = col
-                        break
-                
-                if sound_column is None:
-                    self.update_status(f"Error: No sound type column found in {os.path.basename(csv_file)}")
-                    continue
-                
-                self.update_status(f"Processing {os.path.basename(csv_file)} - detected sound type: '{sound_column}'")
-                
-                # Split the 'Month Date Year' column into separate columns
-                date_columns = data['Month Date Year'].str.strip().str.split(expand=True)
-                
-                if date_columns.shape[1] == 3:
-                    data['Month'] = date_columns[0]
-                    data['Date'] = date_columns[1]
-                    data['Year'] = date_columns[2]
-                else:
-                    self.update_status(f"Unexpected date format in file {os.path.basename(csv_file)}")
-                    continue
-                
-                # Extract start time and convert to seconds since midnight
-                data['Recording_Start_Time'] = data['Hour:Min:Sec Day'].apply(lambda x: x.split()[0])
-                data['Recording_Seconds'] = data['Recording_Start_Time'].apply(self.time_to_seconds)
-                
-                # Group detections by WAV file instead of by hour
-                detections_by_wav = {}
-                
-                for i, row in data.iterrows():
-                    detection_time = row['Recording_Seconds']
-                    date_key = f"{row['Year']}-{row['Month']}-{row['Date']}"
-                    
-                    # Find which WAV file contains this detection
-                    wav_file_found = None
-                    wav_start_seconds = None
-                    
-                    if date_key in wav_file_lookup:
-                        for wav_info in wav_file_lookup[date_key]:
-                            wav_start = wav_info['start_seconds']
-                            wav_end = wav_start + 3600  # Assume 1-hour WAV files
-                            
-                            # Check if this detection falls within this WAV file's time range
-                            if wav_start <= detection_time < wav_end:
-                                wav_file_found = wav_info['file_path']
-                                wav_start_seconds = wav_start
-                                break
-                    
-                    if wav_file_found:
-                        # Group detections by WAV file
-                        wav_key = os.path.basename(wav_file_found).replace('.wav', '')
-                        if wav_key not in detections_by_wav:
-                            detections_by_wav[wav_key] = {
-                                'wav_file': wav_file_found,
-                                'wav_start_seconds': wav_start_seconds,
-                                'detections': []
-                            }
-                        
-                        detections_by_wav[wav_key]['detections'].append(row)
-                    else:
-                        self.update_status(f"No matching WAV file found for detection at {row['Recording_Start_Time']} on {date_key}")
-                
-                # Create selection tables grouped by WAV file
-                if self.create_tables_var.get():
-                    for wav_key, wav_data in detections_by_wav.items():
-                        wav_file_found = wav_data['wav_file']
-                        wav_start_seconds = wav_data['wav_start_seconds']
-                        detections = wav_data['detections']
-                        
-                        self.update_status(f"Creating Raven selection table for {wav_key}... Please wait.")
-                        
-                        # Initialize selection table content
-                        raven_table_content = "Selection\tView\tChannel\tBegin Time (s)\tEnd Time (s)\tLow Freq (Hz)\tHigh Freq (Hz)\n"
-                        
-                        # Sort detections by time
-                        detections.sort(key=lambda x: x['Recording_Seconds'])
-                        
-                        # Iterate over all detected events for this WAV file
-                        for selection_id, row in enumerate(detections, 1):
-                            # Calculate begin time with adjustable offset
-                            event_start_seconds = (row['Recording_Seconds'] - wav_start_seconds) + time_offset
-                            event_end_seconds = event_start_seconds + segment_length
-                            
-                            raven_table_content += (
-                                f"{selection_id}\tSpectrogram 1\t1\t{event_start_seconds:.2f}\t{event_end_seconds:.2f}\t"
-                                f"{row['background'] * 1000:.2f}\t{row[sound_column] * 5000:.2f}\n"
-                            )
-                        
-                        # Create filename based on WAV file name
-                        file_name = f"{wav_key}_SelectionTable.txt"
-                        output_path = os.path.join(selection_tables_dir, file_name)
-                        
-                        with open(output_path, 'w') as f:
-                            f.write(raven_table_content)
-                        
-                        self.update_status(f"Selection table created for {wav_key} with {len(detections)} detections")
-                
-                # Check if audio segments should be extracted
-                if self.extract_audio_var.get():
-                    self.update_status(f"Starting audio segment extraction... Please wait.")
-                    self.extract_audio_segments(folder_path, selection_tables_dir, audio_segments_dir)
-                
-            except Exception as e:
-                self.update_status(f"Error processing CSV file {os.path.basename(csv_file)}: {str(e)}")
-    
-    def extract_audio_segments(self, folder_path, selection_tables_dir, audio_segments_dir):
-        """Extract audio segments based on selection tables using optimized approach with parallel processing"""
-        self.update_status(f"Scanning for selection tables in {os.path.basename(selection_tables_dir)}... Please wait.")
-        selection_tables = glob.glob(os.path.join(selection_tables_dir, "*.txt"))
-        
-        if not selection_tables:
-            self.update_status("No selection tables found to extract audio segments from.")
-            return
-            
-        self.update_status(f"Found {len(selection_tables)} selection tables. Starting audio extraction... Please wait.")
-        
-        # Group segments by WAV file to avoid loading the same file multiple times
-        segments_by_wav = {}
-        
-        # First pass: Parse all selection tables and organize segments by WAV file
-        for selection_table in selection_tables:
-            # Find the corresponding WAV file
-            wav_file = self.find_wav_file(selection_table, folder_path)
-            if not wav_file:
-                self.update_status(f"No matching WAV file found for {os.path.basename(selection_table)}, skipping.")
-                continue
-            
-            # Parse the selection table
-            try:
-                with open(selection_table, 'r') as f:
-                    # Skip the header line
-                    header = f.readline()
-                    
-                    # Read the rest of the lines
-                    reader = csv.reader(f, delimiter='\t')
-                    for i, row in enumerate(reader, 1):
-                        if len(row) >= 5:  # Ensure we have enough columns
-                            try:
-                                # Extract begin and end times in seconds
-                                begin_time = float(row[3])
-                                end_time = float(row[4])
-                                
-                                # Store segment info
-                                if wav_file not in segments_by_wav:
-                                    segments_by_wav[wav_file] = []
-                                
-                                segments_by_wav[wav_file].append({
-                                    'begin_time': begin_time,
-                                    'end_time': end_time,
-                                    'segment_id': i,
-                                    'selection_table': os.path.basename(selection_table)
-                                })
-                            except Exception as e:
-                                self.update_status(f"Error parsing segment {i} in {os.path.basename(selection_table)}: {e}")
-            except Exception as e:
-                self.update_status(f"Error reading selection table {os.path.basename(selection_table)}: {e}")
-        
-        # Second pass: Process WAV files in parallel
-        total_wav_files = len(segments_by_wav)
-        if total_wav_files == 0:
-            self.update_status("No segments to extract.")
-            return
-            
-        self.update_status(f"Processing {total_wav_files} WAV files in parallel... Please wait.")
-        
-        # Determine the number of workers for parallel processing
-        # Use fewer workers for WAV processing to avoid memory issues
-        max_workers = min(os.cpu_count() or 2, total_wav_files, 4)  # Limit to 4 max to avoid memory issues
-        self.update_status(f"Using {max_workers} parallel workers for audio extraction.")
-        
-        start_time = time.time()
-        
-        # Process WAV files in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Prepare arguments for each WAV file
-            wav_tasks = []
-            for wav_file, segments in segments_by_wav.items():
-                # Sort segments by begin time to optimize sequential access
-                segments.sort(key=lambda x: x['begin_time'])
-                wav_tasks.append((wav_file, segments, audio_segments_dir))
-            
-            # Submit all WAV processing tasks
-            futures = {executor.submit(self.process_wav_file, *task, wav_index, total_wav_files): task 
-                      for wav_index, task in enumerate(wav_tasks, 1)}
-            
-            # Process results as they complete
-            for future in concurrent.futures.as_completed(futures):
-                try:
-                    wav_file, num_segments = future.result()
-                    self.update_status(f"Completed processing {os.path.basename(wav_file)} with {num_segments} segments.")
-                except Exception as e:
-                    wav_task = futures[future]
-                    wav_file = wav_task[0]
-                    self.update_status(f"Error processing WAV file {os.path.basename(wav_file)}: {str(e)}")
+        # The status bar picks up the latest message on its next refresh
+        self.latest_status = (next(self.status_sequence), message)
         
-        end_time = time.time()
-        processing_time = end_time - start_time
-        self.update_status(f"Audio extraction complete! Processed {total_wav_files} WAV files in {processing_time:.2f} seconds.")
-    
-    def process_wav_file(self, wav_file, segments, audio_segments_dir, wav_index, total_wav_files):
-        """Process a single WAV file and extract all its segments"""
-        try:
-            self.update_status(f"Processing WAV file {wav_index}/{total_wav_files}: {os.path.basename(wav_file)}...")
-            
-            # Get total segments for this WAV file
-            total_segments = len(segments)
-            self.update_status(f"Found {total_segments} segments to extract from {os.path.basename(wav_file)}.")
-            
-            # Use pydub's segment extraction with frame-accurate seeking
-            audio = AudioSegment.from_file(wav_file, format="wav")
-            audio_duration_s = len(audio) / 1000.0  # Convert to seconds
-            base_name = os.path.splitext(os.path.basename(wav_file))[0]
-            
-            self.update_status(f"Audio file duration: {audio_duration_s:.2f} seconds")
-            
-            # Track how many segments were actually processed
-            processed_segments = 0
-            skipped_segments = 0
-            
-            # Process all segments for this WAV file
-            for segment_index, segment_info in enumerate(segments, 1):
-                begin_time = segment_info['begin_time']
-                end_time = segment_info['end_time']
-                segment_id = segment_info['segment_id']
-                
-                # Validate segment times before processing
-                if begin_time < 0:
-                    self.update_status(f"Skipping segment {segment_index}: negative begin time ({begin_time:.2f}s)")
-                    skipped_segments += 1
-                    continue
-                
-                if end_time <= begin_time:
-                    self.update_status(f"Skipping segment {segment_index}: invalid time range ({begin_time:.2f}s to {end_time:.2f}s)")
-                    skipped_segments += 1
-                    continue
-                
-                if begin_time >= audio_duration_s:
-                    self.update_status(f"Skipping segment {segment_index}: begins after audio end ({begin_time:.2f}s >= {audio_duration_s:.2f}s)")
-                    skipped_segments += 1
-                    continue
-                
-                # Adjust end time if it exceeds audio duration
-                original_end_time = end_time
-                if end_time > audio_duration_s:
-                    end_time = audio_duration_s
-                    if segment_index <= 5:  # Only show first few warnings to avoid spam
-                        self.update_status(f"Adjusting segment {segment_index} end time from {original_end_time:.2f}s to {end_time:.2f}s")
-                
-                # Check if we have a meaningful segment duration
-                segment_duration = end_time - begin_time
-                if segment_duration < 0.1:  # Less than 0.1 seconds
-                    self.update_status(f"Skipping segment {segment_index}: too short ({segment_duration:.2f}s)")
-                    skipped_segments += 1
-                    continue
-                
-                # Convert to milliseconds for pydub
-                begin_ms = int(begin_time * 1000)
-                end_ms = int(end_time * 1000)
-                
-                # Generate output filename
-                segment_filename = f"{base_name}_segment_{segment_id:03d}_{begin_time:.2f}s-{end_time:.2f}s.wav"
-                segment_path = os.path.join(audio_segments_dir, segment_filename)
-                
-                # Check if segment already exists and is valid
-                if os.path.exists(segment_path):
-                    if os.path.getsize(segment_path) > 1000:  # More than 1KB indicates actual audio data
-                        if segment_index % 10 == 0:  # Only update status every 10 segments
-                            self.update_status(f"Segment {segment_index}/{total_segments} already exists, skipping.")
-                        continue
-                    else:
-                        # Remove empty file so we can recreate it properly
-                        os.remove(segment_path)
-                
-                # Extract and export the segment
-                if segment_index % 10 == 0:  # Only update status every 10 segments
-                    self.update_status(f"Exporting segment {segment_index}/{total_segments} from {os.path.basename(wav_file)}...")
-                
-                # Extract the segment and export it
-                segment = audio[begin_ms:end_ms]
-                
-                # Verify the extracted segment has actual audio data
-                if len(segment) < 100:  # Less than 0.1 seconds
-                    self.update_status(f"Skipping segment {segment_index}: extracted segment too short ({len(segment)}ms)")
-                    skipped_segments += 1
-                    continue
-                
-                segment.export(segment_path, format="wav")
-                
-                # Verify the exported file is not empty
-                if os.path.exists(segment_path) and os.path.getsize(segment_path) > 1000:
-                    processed_segments += 1
-                else:
-                    self.update_status(f"Warning: Exported segment {segment_index} appears empty, removing")
-                    if os.path.exists(segment_path):
-                        os.remove(segment_path)
-                    skipped_segments += 1
-            
-            # Free memory
-            del audio
-            
-            # Report results
-            if skipped_segments > 0:
-                self.update_status(f"Completed {os.path.basename(wav_file)}: {processed_segments} valid segments, {skipped_segments} skipped")
-            
-            # Return the WAV file name and number of segments processed for status updates
-            return wav_file, processed_segments
-            
-        except Exception as e:
-            # Re-raise the exception to be caught by the executor
-            raise Exception(f"Error processing {os.path.basename(wav_file)}: {str(e)}")
-    
-    # Helper functions
-    def extract_datetime_from_filename(self, filename):
-        """Extract datetime from WAV filename"""
-        # Expected format: [variable_prefix]_[timestamp]_[date]_[time].wav
-        # Count from the end: date is 2nd from last, time is 1st from last
-        parts = filename.split('_')
-        if len(parts) >= 3:
-            date_part = parts[-2]  # "2025-03-10" (2nd from end)
-            time_part = parts[-1].replace('.wav', '')  # "18-14-52" (1st from end)
-            time_part = time_part.replace('-', ':')  # Convert to "18:14:52"
-            return f"{date_part} {time_part}"
-        return None
-    
-    def datetime_to_seconds(self, datetime_str):
-        """Convert datetime string to seconds since midnight"""
-        dt = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-        return dt.hour * 3600 + dt.minute * 60 + dt.second
+        # Queue for the log file writer thread
+        self.status_log.write(message)
     
-    def time_to_seconds(self, time_str):
-        """Convert time to seconds since midnight"""
-        time_obj = datetime.strptime(time_str, '%H:%M:%S')
-        return time_obj.hour * 3600 + time_obj.minute * 60 + time_obj.second
+    def refresh_status_bar(self):
+        """Show the latest status message, called periodically on the Tk thread"""
+        sequence, message = self.latest_status
+        if sequence != self.shown_status:
+            self.shown_status = sequence
+            self.status_var.set(message)
+        if self.progress is not None:
+            self.progress_var.set(self.progress.format())
+        self.after(STATUS_REFRESH_MS, self.refresh_status_bar)
     
-    def month_name_to_number(self, month_name):
-        """Convert month name to number"""
-        month_map = {
-            'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
-            'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
-        }
-        return month_map.get(month_name, month_name)
+    def on_close(self):
+        """Write any queued log messages before closing the window"""
+        self.stop_processing = True
+        self.status_log.close()
+        self.destroy()
     
     def open_readme(self):
         """Open the README.md file when the help icon is clicked"""
         try:
-            readme_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "README.md")
+            readme_path = os.path.join(APP_DIR, "README.md")
             if os.path.exists(readme_path):
                 # Use the default system application to open the README file
                 if sys.platform == 'win32':
@@ -1134,6 +767,44 @@ class ElocAudioProcessor(TkinterDnD.Tk):
             messagebox.showerror("Error", f"Could not open README file: {str(e)}")
             self.status_var.set(f"Error opening README: {str(e)}")
     
+    def load_icon(self, filename, width, height=None, opacity=None):
+        """Load an image from the application folder as a PhotoImage of the given width.
+        
+        The height follows the aspect ratio unless given. With opacity the alpha channel
+        is scaled in one pass over a 256-entry lookup table.
+        """
+        from PIL import Image, ImageTk
+        
+        image = Image.open(os.path.join(APP_DIR, filename))
+        if height is None:
+            height = int(image.size[1] * width / float(image.size[0]))
+        image = image.resize((width, height), Image.LANCZOS)
+        
+        if opacity is not None:
+            if image.mode != 'RGBA':
+                image = image.convert('RGBA')
+            image.putalpha(image.getchannel('A').point(lambda alpha: int(alpha * opacity)))
+        
+        # Convert to PhotoImage for tkinter
+        return ImageTk.PhotoImage(image)
+    
+    def load_header_icons(self):
+        """Show the ELOC and help icons, called once the window is shown so PIL does not delay it"""
+        # The ELOC icon with size reduction and 30% transparency (70% opacity)
+        try:
+            icon_image = self.load_icon("ELOC-icon.png", 80, opacity=0.7)
+            self.icon_label.configure(image=icon_image)
+            self.icon_label.image = icon_image  # Keep a reference to prevent garbage collection
+        except Exception as e:
+            print(f"Error loading or processing icon: {str(e)}")
+        
+        try:
+            help_icon = self.load_icon("help.png", 30, 30)
+            self.help_label.configure(image=help_icon, text="")
+            self.help_label.image = help_icon  # Keep a reference to prevent garbage collection
+        except Exception as e:
+            print(f"Error loading help icon: {str(e)}")
+    
     def on_drop(self, event):
         """Handle dropped files/folders from Windows Explorer"""
         # Get the dropped data
@@ -1280,12 +951,10 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         folders_added = 0
         
         for path in root_folders:
-            # Check if the folder directly contains WAV and CSV files
-            wav_count = len(glob.glob(os.path.join(path, "*.wav")))
-            csv_count = len(glob.glob(os.path.join(path, "*.csv")))
-            
-            # Check folder compatibility
-            is_compatible, wav_count, compatible_csv_count = self.check_folder_compatibility(path)
+            # Check folder compatibility (the scan is cached, so the counts below cost nothing extra)
+            is_compatible, wav_count, compatible_csv_count = self.engine.check_folder_compatibility(path)
+            scan = self.engine.scan_folder(path)
+            csv_count = len(scan['csv_files'])
             
             if wav_count > 0 and compatible_csv_count > 0:
                 # The folder directly contains compatible WAV and CSV files
@@ -1308,7 +977,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
             else:
                 # Check for subfolders
                 try:
-                    subfolders = [f for f in os.listdir(path) if os.path.isdir(os.path.join(path, f))]
+                    subfolders = scan['subfolders']
                     
                     if not subfolders:
                         # If no subfolders and no WAV/CSV files in root, show message
@@ -1333,7 +1002,7 @@ class ElocAudioProcessor(TkinterDnD.Tk):
                         compatible_folders = 0
                         for folder in subfolders:
                             subfolder_path = os.path.join(path, folder)
-                            is_compatible, subfolder_wav_count, compatible_csv_count = self.check_folder_compatibility(subfolder_path)
+                            is_compatible, subfolder_wav_count, compatible_csv_count = self.engine.check_folder_compatibility(subfolder_path)
                             
                             # Add to treeview with compatibility status
                             csv_status = "Yes" if is_compatible else "No"
@@ -1362,26 +1031,9 @@ class ElocAudioProcessor(TkinterDnD.Tk):
         self.select_folders_with_csv()
         
         return "break"  # Prevent further handling of the drop event
-    
-    def find_wav_file(self, selection_table_filename, folder_path):
-        """Find the corresponding WAV file for a selection table"""
-        # New format: WAV_filename_SelectionTable.txt
-        # Extract the WAV filename from the selection table filename
-        base_name = os.path.basename(selection_table_filename).replace('_SelectionTable.txt', '')
-        
-        # The base_name should now be the WAV filename without extension
-        # e.g., "1753053819136_2025-07-22_15-20-21"
-        wav_filename = f"{base_name}.wav"
-        wav_file_path = os.path.join(folder_path, wav_filename)
-        
-        # Check if the WAV file exists
-        if os.path.exists(wav_file_path):
-            self.update_status(f"Found matching WAV file for selection table: {wav_filename}")
-            return wav_file_path
-        else:
-            self.update_status(f"WAV file not found: {wav_filename} in {folder_path}")
-            return None
 
 if __name__ == "__main__":
+    # Needed for the process pool when running as a frozen executable
+    multiprocessing.freeze_support()
     app = ElocAudioProcessor()
     app.mainloop()
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+import argparse
+
+# The engine (and with it pandas and numpy) is only imported once the arguments are parsed,
+# so --help and argument errors return immediately
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Create Raven selection tables and extract audio snippets for ELOC deployments without the GUI.")
+    parser.add_argument("paths", nargs="+",
+                        help="Deployment folders, folders containing deployments, or SD card roots with an 'eloc' folder")
+    parser.add_argument("--offset", type=float, default=-2,
+                        help="Begin-time offset of each selection in seconds (default: -2)")
+    parser.add_argument("--length", type=float, default=5,
+                        help="Snippet length in seconds (default: 5)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of parallel workers (default: number of CPU cores)")
+    parser.add_argument("--processes", action="store_true",
+                        help="Run the work in worker processes instead of threads")
+    parser.add_argument("--readers-per-drive", type=int, default=None,
+                        help="Files read at the same time from one removable drive (SD card, USB); internal "
+                             "drives are not limited, 0 for no limit (default: 1)")
+    parser.add_argument("--no-audio", action="store_true",
+                        help="Only create selection tables, do not extract audio snippets")
+    parser.add_argument("--tables", choices=("per_wav", "deployment", "both"), default="per_wav",
+                        help="One selection table per WAV file, one multi-file table and Raven listfile "
+                             "per deployment, or both (default: per_wav)")
+    parser.add_argument("--snippets", choices=("files", "archive"), default="files",
+                        help="One WAV file per snippet, or one archive per recording that plays as a review reel "
+                             "and holds an index of the snippets (default: files)")
+    parser.add_argument("--codec", choices=("wav", "flac"), default="wav",
+                        help="Write the snippets as uncompressed WAV or lossless FLAC, FLAC needs FFmpeg (default: wav)")
+    parser.add_argument("--downmix", action="store_true",
+                        help="Mix the snippets of multi-channel recordings down to mono")
+    parser.add_argument("--decimate", type=int, choices=(1, 2, 4, 8), default=1,
+                        help="Divide the sample rate of the snippets by this factor, with an anti-alias filter, "
+                             "for low-frequency calls such as rumbles (default: 1)")
+    parser.add_argument("--backend", choices=("auto", "direct", "ffmpeg", "pydub"), default="auto",
+                        help="How snippets are cut: copied from the recording (direct), one FFmpeg process per "
+                             "recording, or pydub. auto picks the fastest available (default: auto)")
+    parser.add_argument("--staging", default=None,
+                        help="Write the outputs to this local folder first and copy each finished deployment "
+                             "to its output folder in one pass")
+    parser.add_argument("--keep-staging", action="store_true",
+                        help="Keep the staged outputs as a local mirror, so later runs skip unchanged recordings")
+    parser.add_argument("--log", default=None,
+                        help="Also append status messages to this log file")
+    parser.add_argument("--metrics", default=None,
+                        help="Write per-stage metrics as JSON to this file (default: next to --log)")
+    parser.add_argument("--trace", default=None,
+                        help="Write a timeline of all tasks in Chrome trace-event format to this file")
+    parser.add_argument("--progress-interval", type=float, default=2.0,
+                        help="Seconds between progress lines (default: 2)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Only print errors and the final summary")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    from eloc_engine import ElocEngine, DEFAULT_READERS_PER_DEVICE, ENGINE_PROCESSES, ENGINE_THREADS, \
+        create_output_dirs, make_folder_job
+    from eloc_metrics import METRICS_FILENAME, RunMetrics
+    from eloc_progress import ProgressTracker
+    from eloc_trace import TraceRecorder
+    from status_log import StatusLog
+
+    status_log = StatusLog(args.log) if args.log else None
+
+    def update_status(message, always=False):
+        if always or not args.quiet or message.startswith("Error"):
+            print(message, flush=True)
+        if status_log is not None:
+            status_log.write(message)
+
+    engine = ElocEngine(status_callback=update_status, create_tables=True, extract_audio=not args.no_audio,
+                        table_layout=args.tables, snippet_format=args.snippets,
+                        snippet_codec=args.codec, downmix=args.downmix, decimation=args.decimate,
+                        extraction_backend=args.backend)
+
+    # Collect the deployment folders of every path given on the command line
+    folders = []
+    for path in args.paths:
+        path = os.path.abspath(path)
+        if not os.path.isdir(path):
+            update_status(f"Error: {path} is not a folder")
+            continue
+        found = engine.find_deployment_folders(path)
+        if not found:
+            update_status(f"No folders with WAV files and EI-results CSV files found in {path}")
+        folders.extend(folder for folder in found if folder not in folders)
+
+    if not folders:
+        update_status("Nothing to process.", always=True)
+        if status_log is not None:
+            status_log.close()
+        return 1
+
+    jobs = []
+    for folder_path in folders:
+        selection_tables_dir, audio_segments_dir = create_output_dirs(folder_path, args.staging)
+        mirror_to = os.path.join(folder_path, "output") if args.staging else None
+        jobs.append(make_folder_job(folder_path, selection_tables_dir, audio_segments_dir, args.offset, args.length,
+                                    engine.create_tables, engine.extract_audio, engine.table_layout,
+                                    engine.snippet_format, mirror_to, args.keep_staging,
+                                    snippet_codec=engine.snippet_codec, downmix=engine.downmix,
+                                    decimation=engine.decimation, extraction_backend=engine.extraction_backend))
+
+    engine_mode = ENGINE_PROCESSES if args.processes else ENGINE_THREADS
+    readers_per_device = DEFAULT_READERS_PER_DEVICE if args.readers_per_drive is None else args.readers_per_drive
+
+    metrics_path = args.metrics
+    if metrics_path is None and args.log:
+        metrics_path = os.path.join(os.path.dirname(os.path.abspath(args.log)), METRICS_FILENAME)
+    metrics = RunMetrics()
+    trace = TraceRecorder() if args.trace else None
+
+    def print_progress(tracker):
+        text = tracker.format()
+        if text:
+            print(text, flush=True)
+
+    progress = None if args.quiet else ProgressTracker(on_change=print_progress, min_interval=args.progress_interval)
+
+    update_status(f"Starting to process {len(jobs)} folders...")
+    start_time = time.time()
+    try:
+        pipelines = engine.run_folder_jobs(jobs, args.workers, engine_mode, readers_per_device=readers_per_device,
+                                           metrics=metrics, trace=trace, progress=progress)
+    except KeyboardInterrupt:
+        print("Interrupted.")
+        return 130
+    finally:
+        if status_log is not None:
+            status_log.flush()
+
+    if progress is not None:
+        print_progress(progress)
+    # A folder with WAV files that could not be extracted counts as failed, even though its tables were written
+    failed = [pipeline for pipeline in pipelines if pipeline.error is not None or pipeline.failed_wavs]
+    processing_time = time.time() - start_time
+    update_status(f"Processed {len(pipelines) - len(failed)}/{len(pipelines)} folders in {processing_time:.2f} seconds.",
+                  always=True)
+    for pipeline in failed:
+        if pipeline.error is not None:
+            update_status(f"Error: {pipeline.job['folder_path']} failed: {pipeline.error}")
+        else:
+            update_status(f"Error: {pipeline.job['folder_path']}: {len(pipeline.failed_wavs)} WAV files could not be extracted")
+
+    metrics.finish()
+    for line in metrics.summary():
+        update_status(line, always=True)
+    if metrics_path:
+        try:
+            metrics.save(metrics_path)
+        except OSError as e:
+            update_status(f"Error: could not write metrics file {metrics_path}: {str(e)}")
+    if trace is not None:
+        try:
+            trace.save(args.trace)
+        except OSError as e:
+            update_status(f"Error: could not write trace file {args.trace}: {str(e)}")
+
+    if status_log is not None:
+        status_log.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
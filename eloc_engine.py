@@ -0,0 +1,1942 @@
+import os
+import glob
+import csv
+import json
+import sys
+import shutil
+import hashlib
+import calendar
+import time
+import warnings
+import threading
+import multiprocessing
+import concurrent.futures
+from datetime import datetime
+
+# numpy, pandas and pydub are imported by the stages that use them, so the GUI window
+# opens without waiting for them (about half a second on a typical laptop)
+
+# Suppress the ffmpeg warning from pydub
+warnings.filterwarnings("ignore", category=RuntimeWarning, 
+                       message="Couldn't find ffmpeg or avconv - defaulting to ffmpeg, but may not work")
+
+from wav_segments import (WAVE_FORMAT_PCM, CoalescedReader, WavFormatError, read_wav_header, segment_frame_range,
+                          write_wav_data)
+from selection_tables import raven_columns, write_listfile, write_selection_table
+from snippet_archive import ARCHIVE_SUFFIX, SnippetArchiveWriter, pcm_fmt_chunk
+from snippet_codec import (CODEC_EXTENSIONS, FLAC_MAX_SAMPLE_WIDTH, MIN_ENCODED_BYTES, SNIPPET_CODEC_FLAC,
+                           SNIPPET_CODEC_WAV, SnippetEncoder)
+from ffmpeg_segments import FFMPEG_SEGMENTS_PER_RUN, extract_segments, probe_audio, segment_output_options
+from output_mirror import is_current, mirror_tree
+from eloc_metrics import peak_rss_bytes
+from eloc_scheduler import (Task, WorkScheduler, STAGE_SCAN, STAGE_PARSE, STAGE_ASSIGN, STAGE_TABLES,
+                            STAGE_EXTRACT, STAGE_ENCODE, STAGE_FINISH)
+
+# Manifest in each folder's output directory describing what has already been processed
+MANIFEST_FILENAME = "eloc_manifest.json"
+MANIFEST_VERSION = 1
+
+# Number of EI-results rows parsed at a time, keeps memory flat on very large inference logs
+DETECTION_CSV_CHUNK_ROWS = 50000
+
+# Engines used to run the tasks of folder jobs in run_folder_jobs
+ENGINE_THREADS = "threads"
+ENGINE_PROCESSES = "processes"
+
+# Tasks reading from the same removable drive (SD card, card reader or USB drive) at a time, 0 for
+# no limit. Cards are fastest with one sequential reader, internal drives are never limited
+DEFAULT_READERS_PER_DEVICE = 1
+
+# Drive type returned by GetDriveTypeW for SD cards and USB sticks on Windows
+DRIVE_REMOVABLE = 2
+
+# Selection tables written per folder: one per WAV file, one multi-file table (and Raven
+# listfile) for the whole deployment, or both
+TABLE_LAYOUT_PER_WAV = "per_wav"
+TABLE_LAYOUT_DEPLOYMENT = "deployment"
+TABLE_LAYOUT_BOTH = "both"
+TABLE_LAYOUTS = (TABLE_LAYOUT_PER_WAV, TABLE_LAYOUT_DEPLOYMENT, TABLE_LAYOUT_BOTH)
+
+# Audio snippets written per WAV file: one file per segment, or one packed archive
+# (a review reel with an index, see snippet_archive)
+SNIPPETS_FILES = "files"
+SNIPPETS_ARCHIVE = "archive"
+SNIPPET_FORMATS = (SNIPPETS_FILES, SNIPPETS_ARCHIVE)
+
+# Backends cutting the snippets from a recording, see ElocEngine.choose_backend: the RIFF
+# header parser copying frame ranges, one ffmpeg process per batch of snippets, or pydub
+BACKEND_AUTO = "auto"
+BACKEND_DIRECT = "direct"
+BACKEND_FFMPEG = "ffmpeg"
+BACKEND_PYDUB = "pydub"
+EXTRACTION_BACKENDS = (BACKEND_AUTO, BACKEND_DIRECT, BACKEND_FFMPEG, BACKEND_PYDUB)
+
+# Raw snippet data a pipeline task reads before handing it to an encode task, which does not
+# hold the drive. The rest of the recording is read by the next task (bounds the audio held in memory)
+ENCODE_BATCH_BYTES = 8 * 1024 * 1024
+
+
+class ProcessingCancelled(Exception):
+    """Raised inside a stage when the run was cancelled, see ElocEngine.check_cancelled"""
+
+
+def load_audio_segment_class():
+    """Import pydub's AudioSegment on first use, None if pydub is not installed"""
+    try:
+        from pydub import AudioSegment
+    except ImportError:
+        return None
+    return AudioSegment
+
+
+class ElocEngine:
+    """Scanning, CSV parsing, selection table writing and audio extraction for ELOC folders.
+    
+    The engine has no user interface, status messages are passed to status_callback
+    (printed if there is none). It only holds plain settings, so worker processes can
+    build their own engine from a job description.
+    """
+    
+    def __init__(self, status_callback=None, create_tables=True, extract_audio=True,
+                 table_layout=TABLE_LAYOUT_PER_WAV, snippet_format=SNIPPETS_FILES,
+                 snippet_codec=SNIPPET_CODEC_WAV, downmix=False, decimation=1, extraction_backend=BACKEND_AUTO):
+        self.status_callback = status_callback
+        self.create_tables = create_tables
+        self.extract_audio = extract_audio
+        self.table_layout = table_layout
+        self.snippet_format = snippet_format
+        self.snippet_codec = snippet_codec
+        self.downmix = downmix
+        self.decimation = decimation
+        self.extraction_backend = extraction_backend
+        
+        # Cached folder scans keyed by folder path, see scan_folder
+        self.folder_scan_cache = {}
+        
+        # Counters of the task running in each thread, see run_timed
+        self._task_stats = threading.local()
+        
+        # Event (threading or multiprocessing.Manager) that is set to cancel running stages
+        self.cancel_event = None
+        
+        # Called with progress increments of the running stages, see report_progress
+        self.progress_callback = None
+    
+    def update_status(self, message):
+        """Report a status message"""
+        if self.status_callback is not None:
+            self.status_callback(message)
+        else:
+            print(message)
+    
+    def check_cancelled(self):
+        """Raise ProcessingCancelled if the run was cancelled, called between units of work"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ProcessingCancelled()
+    
+    def report_progress(self, **increments):
+        """Report completed work, e.g. done_segments=1, to eloc_progress.ProgressTracker (ignored without one)"""
+        if self.progress_callback is not None:
+            self.progress_callback(increments)
+    
+    def count(self, name, value=1):
+        """Add to a counter of the task running in this thread (ignored outside run_timed)"""
+        counters = getattr(self._task_stats, 'counters', None)
+        if counters is not None:
+            counters[name] = counters.get(name, 0) + value
+    
+    def run_timed(self, method, args, traced=False):
+        """Call an engine method and return (result, stats) with its wall time and counters.
+        
+        The stats also hold the peak RSS of the process so far (not of the method), which
+        eloc_metrics.RunMetrics only uses for the peak memory of the whole run.
+        
+        With traced=True the stats also hold the start time, CPU time and the process
+        and thread that ran the method, for eloc_trace.TraceRecorder.
+        """
+        counters = self._task_stats.counters = {}
+        if traced:
+            start_wall = time.time()
+            start_cpu = time.thread_time()
+        start_time = time.perf_counter()
+        try:
+            result = getattr(self, method)(*args)
+        finally:
+            self._task_stats.counters = None
+        stats = dict(counters, seconds=time.perf_counter() - start_time, peak_rss=peak_rss_bytes())
+        if traced:
+            stats.update(start=start_wall, cpu_seconds=time.thread_time() - start_cpu, pid=os.getpid(),
+                         tid=threading.get_ident(), thread=threading.current_thread().name)
+        return result, stats
+    
+    def is_csv_compatible(self, csv_path):
+        """Check if a CSV file is compatible with the expected format"""
+        try:
+            # Check if the filename starts with "EI-results"
+            filename = os.path.basename(csv_path)
+            return filename.startswith("EI-results")
+        except Exception as e:
+            self.update_status(f"Error checking CSV compatibility: {str(e)}")
+            return False
+    
+    def check_folder_compatibility(self, folder_path):
+        """Check if a folder has compatible CSV files and at least one WAV file"""
+        scan = self.scan_folder(folder_path)
+        wav_count = len(scan['wav_files'])
+        
+        if wav_count == 0:
+            return False, 0, 0  # No WAV files
+        
+        # Return compatibility status, WAV count, and compatible CSV count
+        compatible_csv_count = len(scan['compatible_csv_files'])
+        return compatible_csv_count > 0, wav_count, compatible_csv_count
+    
+    def scan_folder(self, folder_path, refresh=False):
+        """Classify the files of a folder in a single directory pass.
+        
+        Returns a dict with the paths of the WAV, CSV and compatible CSV files and the
+        names of the subfolders. Results are cached until the folder's mtime changes, so
+        rescanning an unchanged SD card does not touch the directory again.
+        """
+        scan = {'wav_files': [], 'csv_files': [], 'compatible_csv_files': [], 'subfolders': []}
+        try:
+            mtime_ns = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return scan
+        
+        cached = self.folder_scan_cache.get(folder_path)
+        if not refresh and cached is not None and cached[0] == mtime_ns:
+            return cached[1]
+        
+        try:
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if name.startswith('.'):
+                        continue  # Hidden files (e.g. macOS "._" files) were never matched by glob either
+                    if entry.is_dir():
+                        scan['subfolders'].append(name)
+                        continue
+                    extension = os.path.splitext(name)[1].lower()
+                    if extension == '.wav':
+                        scan['wav_files'].append(entry.path)
+                    elif extension == '.csv':
+                        scan['csv_files'].append(entry.path)
+                        if self.is_csv_compatible(entry.path):
+                            scan['compatible_csv_files'].append(entry.path)
+        except OSError as e:
+            self.update_status(f"Error scanning {folder_path}: {str(e)}")
+            return scan
+        
+        for key in scan:
+            scan[key].sort()
+        self.folder_scan_cache[folder_path] = (mtime_ns, scan)
+        return scan
+    
+    def find_deployment_folders(self, path):
+        """Find the folders to process under a path: the path itself if it holds compatible
+        WAV and CSV files, otherwise its compatible subfolders (of 'eloc' on an SD card)"""
+        compatible, _, _ = self.check_folder_compatibility(path)
+        if compatible:
+            return [path]
+        
+        eloc_path = os.path.join(path, "eloc")
+        if os.path.isdir(eloc_path):
+            path = eloc_path
+        folders = []
+        for folder in self.scan_folder(path)['subfolders']:
+            folder_path = os.path.join(path, folder)
+            if self.check_folder_compatibility(folder_path)[0]:
+                folders.append(folder_path)
+        return folders
+    
+    def run_folder_jobs(self, jobs, max_workers=None, engine_mode=ENGINE_THREADS, should_stop=None, on_folder_done=None,
+                        readers_per_device=DEFAULT_READERS_PER_DEVICE, metrics=None, trace=None, progress=None):
+        """Process several folders described by make_folder_job on one shared pool of workers.
+        
+        Each folder is split into the tasks of a FolderPipeline and a WorkScheduler keeps
+        max_workers tasks running across all folders, so one folder with many WAV files
+        and several small folders both keep every worker busy. Tasks that read the
+        recordings (scan, CSV parsing, reading snippets) are limited to readers_per_device
+        per removable drive if it is not 0, internal drives and CPU-bound stages use every
+        worker. on_folder_done is called with each finished pipeline.
+        
+        Once should_stop() returns True (or on Ctrl+C) queued tasks are dropped and the
+        running ones stop at their next CSV chunk, table or segment. The timing and
+        counters of every task are added to metrics (an eloc_metrics.RunMetrics) if
+        given, and their spans to trace (an eloc_trace.TraceRecorder). Planned and
+        completed WAV bytes and segments go to progress (an eloc_progress.ProgressTracker).
+        Returns the pipelines, failed ones have error set.
+        """
+        max_workers = max_workers or os.cpu_count() or 4
+        traced = trace is not None
+        pipelines = [FolderPipeline(self, job, metrics, trace, progress) for job in jobs]
+        
+        # Folders from an SD card, a custom folder or a drag & drop are grouped by the drive they are on
+        devices = {pipeline.device for pipeline in pipelines if pipeline.device is not None}
+        removable_devices = {pipeline.device for pipeline in pipelines
+                             if pipeline.device is not None and pipeline.removable}
+        if readers_per_device and removable_devices:
+            resource_limits = {device: readers_per_device for device in removable_devices}
+            self.update_status(f"Reading from {len(devices)} drive(s), up to {readers_per_device} reader(s) at a time "
+                               f"from each of the {len(removable_devices)} removable drive(s).")
+        else:
+            resource_limits = {}
+            self.update_status(f"Reading from {len(devices)} drive(s).")
+        
+        # Progress of the worker processes arrives through forward_progress
+        if progress is not None:
+            self.progress_callback = progress.update
+        
+        manager = None
+        progress_queue = None
+        progress_thread = None
+        if engine_mode == ENGINE_PROCESSES:
+            # Worker processes build their own engine and report status messages and progress through a managed queue
+            manager = multiprocessing.Manager()
+            progress_queue = manager.Queue()
+            cancel_event = manager.Event()
+            progress_thread = threading.Thread(target=self.forward_progress, args=(progress_queue,), daemon=True)
+            progress_thread.start()
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+            submit = lambda task: executor.submit(run_engine_task, task.pipeline.job, task.method, task.args,
+                                                  progress_queue, traced, cancel_event, progress is not None)
+            self.update_status(f"Using {max_workers} worker processes for processing.")
+        else:
+            cancel_event = threading.Event()
+            self.cancel_event = cancel_event
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+            submit = lambda task: executor.submit(self.run_timed, task.method, task.args, traced)
+            self.update_status(f"Using {max_workers} parallel workers for processing.")
+        
+        def folder_done(pipeline):
+            if traced and pipeline.trace_start is not None:
+                trace.add_folder(pipeline.folder_name, pipeline.trace_start, pipeline.trace_end,
+                                 {'folder': pipeline.job['folder_path'], 'error': str(pipeline.error or '')})
+            if on_folder_done is not None:
+                on_folder_done(pipeline)
+        
+        def stop_requested():
+            if not cancel_event.is_set() and should_stop is not None and should_stop():
+                cancel_event.set()  # Running tasks stop at their next check_cancelled
+            return cancel_event.is_set()
+        
+        try:
+            with executor:
+                scheduler = WorkScheduler(submit, max_workers, stop_requested, resource_limits, record_ready_time=traced)
+                try:
+                    scheduler.run(pipelines, folder_done)
+                except KeyboardInterrupt:
+                    # Let the running tasks stop quickly before the executor waits for them
+                    cancel_event.set()
+                    raise
+        finally:
+            self.cancel_event = None
+            self.progress_callback = None
+            
+            # Folders with dropped tasks are left unfinished, their manifest is not saved
+            for pipeline in pipelines:
+                if not pipeline.done:
+                    pipeline.cancelled = True
+            # Stop forwarding messages from worker processes
+            if progress_queue is not None:
+                progress_queue.put(None)
+                progress_thread.join()
+                manager.shutdown()
+        
+        return pipelines
+    
+    def forward_progress(self, progress_queue):
+        """Pass messages and progress from worker processes on until None is received"""
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                break
+            kind, payload = item
+            if kind == 'status':
+                self.update_status(payload)
+            elif kind == 'progress':
+                self.report_progress(**payload)
+    
+    def process_folder(self, folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length):
+        """Process a single folder (similar to the original scripts but adapted)"""
+        job = make_folder_job(folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length,
+                              self.create_tables, self.extract_audio, self.table_layout, self.snippet_format,
+                              snippet_codec=self.snippet_codec, downmix=self.downmix, decimation=self.decimation,
+                              extraction_backend=self.extraction_backend)
+        folder = self.prepare_folder(job)
+        if folder is None:
+            return
+        
+        # Parse all EI-results files of the folder concurrently
+        detection_tables = self.load_detection_csvs(folder['csv_files'])
+        detections_by_wav, csv_errors = self.assign_folder_detections(folder, detection_tables)
+        extraction_plan, new_manifest = self.write_folder_tables(folder, detections_by_wav, csv_errors)
+        
+        # Check if audio segments should be extracted
+        extracted = {}
+        if self.extract_audio and extraction_plan:
+            self.update_status(f"Starting audio segment extraction... Please wait.")
+            extracted = self.extract_audio_segments(folder_path, selection_tables_dir, audio_segments_dir, extraction_plan)
+        
+        self.finish_folder(folder, new_manifest, extracted)
+    
+    def prepare_folder(self, job):
+        """Scan a folder and check its manifest, the first stage of processing a folder.
+        
+        Returns the state passed on to the later stages (job values, CSV files, manifest,
+        input signatures and the WAV index), or None if there is nothing to do.
+        """
+        folder_path = job['folder_path']
+        
+        # Get WAV files and their start times
+        self.update_status(f"Scanning for WAV files in {os.path.basename(folder_path)}... Please wait.")
+        scan = self.scan_folder(folder_path, refresh=True)
+        wav_files = scan['wav_files']
+        
+        if not wav_files:
+            self.update_status(f"No WAV files found in {folder_path}")
+            return None
+        
+        self.update_status(f"Scanning for CSV files in {os.path.basename(folder_path)}... Please wait.")
+        csv_files = scan['compatible_csv_files']
+        
+        if not csv_files:
+            self.update_status(f"No CSV files found in {folder_path}")
+            return None
+        
+        # Compare the folder with the manifest of the previous run, so only new or changed
+        # recordings are processed again (e.g. when an SD card comes back mid-deployment)
+        parameters = {'time_offset': job['time_offset'], 'segment_length': job['segment_length']}
+        if self.table_layout != TABLE_LAYOUT_PER_WAV:
+            # Only recorded when set, so manifests written before there was a choice stay current
+            parameters['table_layout'] = self.table_layout
+        if self.snippet_format != SNIPPETS_FILES:
+            parameters['snippet_format'] = self.snippet_format
+        if self.snippet_codec != SNIPPET_CODEC_WAV:
+            parameters['snippet_codec'] = self.snippet_codec
+        if self.downmix:
+            parameters['downmix'] = True
+        if self.decimation > 1:
+            parameters['decimation'] = self.decimation
+        output_base = os.path.dirname(job['selection_tables_dir'])
+        manifest_dirs = self.manifest_dirs(job)
+        manifest = self.load_manifest(os.path.dirname(manifest_dirs[0]))
+        inputs = {os.path.basename(path): self.file_signature(path) for path in sorted(wav_files + csv_files)}
+        
+        if self.manifest_is_current(manifest, inputs, parameters, *manifest_dirs, self.create_tables, self.extract_audio):
+            self.update_status(f"No new or changed recordings in {os.path.basename(folder_path)}, skipping.")
+            if job['mirror_to'] and not job['keep_staging']:
+                # Only the empty output directories were staged
+                shutil.rmtree(os.path.dirname(output_base), ignore_errors=True)
+            elif job['mirror_to'] and not is_current(os.path.join(output_base, MANIFEST_FILENAME),
+                                                     os.path.join(job['mirror_to'], MANIFEST_FILENAME)):
+                # The copy of an earlier run did not finish
+                self.mirror_output(job)
+            return None
+        
+        self.update_status(f"Found {len(wav_files)} WAV files. Extracting timestamps... Please wait.")
+            
+        # Sorted index of absolute WAV start and end times for batched detection lookup
+        wav_paths, wav_starts, wav_ends = self.build_wav_index(wav_files)
+        
+        if not wav_paths:
+            self.update_status(f"No WAV files with a recognisable start time found in {folder_path}")
+            return None
+        
+        # Process CSV files
+        self.update_status(f"Found {len(csv_files)} CSV files. Processing detection data... Please wait.")
+        
+        return dict(job, csv_files=csv_files, parameters=parameters, output_base=output_base, manifest=manifest,
+                    manifest_dirs=manifest_dirs, inputs=inputs, wav_paths=wav_paths, wav_starts=wav_starts,
+                    wav_ends=wav_ends)
+    
+    def assign_folder_detections(self, folder, detection_tables):
+        """Group the detections of the parsed CSV files by the WAV file that contains them.
+        
+        Returns the detections per WAV file and whether any CSV file could not be used.
+        """
+        import pandas as pd
+        
+        wav_paths = folder['wav_paths']
+        wav_starts = folder['wav_starts']
+        wav_ends = folder['wav_ends']
+        csv_errors = len(detection_tables) < len(folder['csv_files'])
+        
+        # Group detections by WAV file and sound type, a later CSV file of the same sound type (a newer
+        # model version) replaces the detections of an earlier one, other sound types are kept
+        detections_by_wav = {}
+        detection_parts = {}
+        
+        for csv_file, data, sound_column in detection_tables:
+            try:
+                self.update_status(f"Processing {os.path.basename(csv_file)} - detected sound type: '{sound_column}'")
+                
+                invalid_times = data['Detection_Seconds'] < 0
+                if invalid_times.all():
+                    self.update_status(f"Unexpected date format in file {os.path.basename(csv_file)}")
+                    csv_errors = True
+                    continue
+                if invalid_times.any():
+                    self.update_status(f"Skipping {int(invalid_times.sum())} rows with an unreadable date or time in {os.path.basename(csv_file)}")
+                    data = data[~invalid_times]
+                
+                # Assign every detection to the WAV file that contains it in one vectorized pass
+                wav_indices = self.assign_detections_to_wavs(data['Detection_Seconds'].to_numpy(), wav_starts, wav_ends)
+                data['WAV_Index'] = wav_indices
+                
+                unmatched = data[wav_indices < 0]
+                if len(unmatched) > 0:
+                    first_time = time.strftime('%H:%M:%S on %Y-%b-%d', time.gmtime(unmatched['Detection_Seconds'].iloc[0]))
+                    self.update_status(f"No matching WAV file found for {len(unmatched)} detections (first at {first_time})")
+                
+                matched = data[wav_indices >= 0].sort_values('Detection_Seconds', kind='stable')
+                self.count('detections', len(matched))
+                replaced = 0
+                for wav_index, detections in matched.groupby('WAV_Index', sort=True):
+                    wav_file_found = wav_paths[wav_index]
+                    wav_key = os.path.splitext(os.path.basename(wav_file_found))[0]
+                    detections_by_wav.setdefault(wav_key, {
+                        'wav_file': wav_file_found,
+                        'wav_start_seconds': wav_starts[wav_index],
+                        'detections': None,
+                        'sound_column': None,
+                        'sound_columns': None
+                    })
+                    parts = detection_parts.setdefault(wav_key, {})
+                    replaced += sound_column in parts
+                    parts[sound_column] = detections
+                if replaced:
+                    self.update_status(f"{os.path.basename(csv_file)} replaces the '{sound_column}' detections of "
+                                       f"{replaced} recordings from an earlier CSV file")
+                
+            except Exception as e:
+                csv_errors = True
+                self.update_status(f"Error processing CSV file {os.path.basename(csv_file)}: {str(e)}")
+        
+        # Detections of several sound types are merged into one list per recording in time order, every
+        # sound type keeps its scores in its own column (empty in the rows of the other sound types)
+        for wav_key, parts in detection_parts.items():
+            wav_data = detections_by_wav[wav_key]
+            wav_data['sound_columns'] = list(parts)
+            wav_data['sound_column'] = '+'.join(parts)
+            if len(parts) == 1:
+                wav_data['detections'] = next(iter(parts.values()))
+            else:
+                wav_data['detections'] = pd.concat(list(parts.values()), ignore_index=True).sort_values(
+                    'Detection_Seconds', kind='stable')
+        
+        return detections_by_wav, csv_errors
+    
+    def write_folder_tables(self, folder, detections_by_wav, csv_errors):
+        """Write the selection tables of the changed WAV files and plan their audio segments.
+        
+        Returns the segments to extract per WAV file and the new manifest of the folder.
+        """
+        import numpy as np
+        
+        selection_tables_dir = folder['selection_tables_dir']
+        audio_segments_dir = folder['audio_segments_dir']
+        time_offset = folder['time_offset']
+        segment_length = folder['segment_length']
+        parameters = folder['parameters']
+        inputs = folder['inputs']
+        manifest = folder['manifest']
+        create_tables = self.create_tables
+        extract_audio = self.extract_audio
+        per_wav_tables = create_tables and self.table_layout != TABLE_LAYOUT_DEPLOYMENT
+        deployment_table = create_tables and self.table_layout != TABLE_LAYOUT_PER_WAV
+        
+        # Inputs are only recorded when every CSV file was read, so a failed file is retried next run
+        new_manifest = {
+            'version': MANIFEST_VERSION,
+            'parameters': parameters,
+            'inputs': {} if csv_errors else inputs,
+            'wav_files': {},
+            'deployment_table': None
+        }
+        
+        # One table for the whole deployment, rewritten whenever a recording changed
+        if deployment_table:
+            try:
+                new_manifest['deployment_table'] = self.write_deployment_table(folder, detections_by_wav)
+            except Exception as e:
+                self.update_status(f"Error creating deployment selection table for {os.path.basename(folder['folder_path'])}: {str(e)}")
+        elif manifest['deployment_table']:
+            # A deployment table from an earlier run would no longer match the recordings
+            for file_name in manifest['deployment_table'].values():
+                table_path = os.path.join(selection_tables_dir, file_name)
+                if os.path.exists(table_path):
+                    os.remove(table_path)
+        
+        # Segments to cut from each WAV file, extracted once for the whole folder
+        extraction_plan = {}
+        unchanged_wavs = 0
+        failed_wavs = 0
+        
+        for wav_key, wav_data in detections_by_wav.items():
+            self.check_cancelled()
+            wav_file_found = wav_data['wav_file']
+            wav_start_seconds = wav_data['wav_start_seconds']
+            detections = wav_data['detections']
+            sound_column = wav_data['sound_column']
+            sound_columns = wav_data['sound_columns']
+            wav_name = os.path.basename(wav_file_found)
+            file_name = f"{wav_key}_SelectionTable.txt"
+            
+            entry = {
+                'file': inputs[wav_name],
+                'parameters': dict(parameters, sound_column=sound_column),
+                'detections': self.detections_digest(detections, sound_columns),
+                'selection_table': file_name if per_wav_tables else None,
+                'segments': None
+            }
+            previous = manifest['wav_files'].get(wav_name)
+            if self.manifest_entry_is_current(previous, entry, *folder['manifest_dirs'], extract_audio):
+                new_manifest['wav_files'][wav_name] = previous
+                unchanged_wavs += 1
+                continue
+            
+            if previous and previous.get('segments') and (
+                    previous.get('file') != entry['file'] or previous.get('detections') != entry['detections']
+                    or previous.get('parameters') != entry['parameters']):
+                # Snippets cut from an older version of this recording would otherwise be kept
+                for segment_file in previous['segments']:
+                    segment_path = os.path.join(audio_segments_dir, segment_file)
+                    if os.path.exists(segment_path):
+                        os.remove(segment_path)
+            
+            try:
+                # Create selection tables grouped by WAV file
+                if per_wav_tables:
+                    self.update_status(f"Creating Raven selection table for {wav_key}... Please wait.")
+                    
+                    # Begin times with adjustable offset for all detected events of this WAV file (already sorted by time)
+                    begin_times = (detections['Detection_Seconds'].to_numpy(dtype=np.float64) - wav_start_seconds) + time_offset
+                    scores, sound_types = self.detection_scores(wav_data)
+                    columns = raven_columns(begin_times, begin_times + segment_length,
+                                            detections['background'].to_numpy(dtype=np.float64) * 1000,
+                                            scores * 5000)
+                    if len(sound_columns) > 1:
+                        columns.append(('Sound Type', sound_types, '%s'))
+                    
+                    # Create filename based on WAV file name
+                    output_path = os.path.join(selection_tables_dir, file_name)
+                    
+                    self.count('bytes_written', write_selection_table(output_path, columns))
+                    self.count('tables')
+                    
+                    self.update_status(f"Selection table created for {wav_key} with {len(detections)} detections")
+                
+                # Plan the audio segments of this WAV file, matching the rows of its selection table
+                extraction_plan[wav_file_found] = self.plan_wav_segments(
+                    detections, wav_start_seconds, time_offset, segment_length, file_name)
+                new_manifest['wav_files'][wav_name] = entry
+            except Exception as e:
+                failed_wavs += 1
+                self.update_status(f"Error creating selection table for {wav_key}: {str(e)}")
+        
+        if unchanged_wavs:
+            self.update_status(f"Skipped {unchanged_wavs} unchanged recordings in {os.path.basename(folder['folder_path'])}")
+        if failed_wavs:
+            # A failed recording has no entry, so the folder would otherwise look unchanged on the next run
+            new_manifest['inputs'] = {}
+        
+        return extraction_plan, new_manifest
+    
+    def write_deployment_table(self, folder, detections_by_wav):
+        """Write one Raven selection table for all WAV files of a folder, plus the listfile to open them with.
+        
+        Raven opens the listfile as one file sequence, so Begin Time counts from the
+        start of the first recording. Begin Path, File Offset (s) and Begin File give
+        the recording and time within it. Returns the file names for the manifest.
+        """
+        import numpy as np
+        
+        folder_name = os.path.basename(folder['folder_path'])
+        selection_tables_dir = folder['selection_tables_dir']
+        time_offset = folder['time_offset']
+        segment_length = folder['segment_length']
+        self.update_status(f"Creating deployment selection table for {folder_name}... Please wait.")
+        
+        # Start of each recording within the sequence, the recordings are played back to back
+        wav_paths = folder['wav_paths']
+        durations = folder['wav_ends'] - folder['wav_starts']
+        sequence_starts = dict(zip(wav_paths, np.concatenate(([0.0], np.cumsum(durations)[:-1]))))
+        
+        parts = []
+        for wav_data in sorted(detections_by_wav.values(), key=lambda wav_data: wav_data['wav_start_seconds']):
+            self.check_cancelled()
+            detections = wav_data['detections']
+            wav_file = wav_data['wav_file']
+            file_offsets = (detections['Detection_Seconds'].to_numpy(dtype=np.float64) - wav_data['wav_start_seconds']) + time_offset
+            scores, sound_types = self.detection_scores(wav_data)
+            parts.append({
+                'file_offsets': file_offsets,
+                'begin_times': sequence_starts[wav_file] + file_offsets,
+                'low_freqs': detections['background'].to_numpy(dtype=np.float64) * 1000,
+                'high_freqs': scores * 5000,
+                'paths': np.full(len(detections), os.path.abspath(wav_file), dtype=object),
+                'files': np.full(len(detections), os.path.basename(wav_file), dtype=object),
+                'sound_types': sound_types,
+            })
+        combined = {key: np.concatenate([part[key] for part in parts]) if parts else np.empty(0)
+                    for key in ('file_offsets', 'begin_times', 'low_freqs', 'high_freqs', 'paths', 'files',
+                                'sound_types')}
+        sound_columns = {column for wav_data in detections_by_wav.values() for column in wav_data['sound_columns']}
+        
+        begin_times = combined['begin_times']
+        columns = raven_columns(begin_times, begin_times + segment_length, combined['low_freqs'], combined['high_freqs'])
+        columns += [
+            ('Begin Path', combined['paths'], '%s'),
+            ('File Offset (s)', combined['file_offsets'], '%.2f'),
+            ('Begin File', combined['files'], '%s'),
+        ]
+        if len(sound_columns) > 1:
+            columns.append(('Sound Type', combined['sound_types'], '%s'))
+        
+        table_name = f"{folder_name}_SelectionTable.txt"
+        listfile_name = f"{folder_name}_ListFile.txt"
+        written = write_listfile(os.path.join(selection_tables_dir, listfile_name),
+                                 [os.path.abspath(wav_file) for wav_file in wav_paths])
+        written += write_selection_table(os.path.join(selection_tables_dir, table_name), columns)
+        self.count('tables')
+        self.count('bytes_written', written)
+        
+        self.update_status(f"Deployment selection table created for {folder_name} with {len(begin_times)} detections "
+                           f"from {len(wav_paths)} WAV files")
+        return {'table': table_name, 'listfile': listfile_name}
+    
+    def finish_folder(self, folder, new_manifest, extracted):
+        """Record the extracted segment files and save the manifest, the last stage of processing a folder"""
+        for wav_file, segment_files in extracted.items():
+            new_manifest['wav_files'][os.path.basename(wav_file)]['segments'] = segment_files
+        
+        self.save_manifest(folder['output_base'], new_manifest)
+        if folder['mirror_to']:
+            self.mirror_output(folder)
+    
+    def mirror_output(self, job):
+        """Copy the outputs of a folder from the local staging directory to the folder itself.
+        
+        New and changed files are copied in one sequential pass, the manifest last. Only
+        outputs that the folder's previous manifest records and the new one no longer
+        does are removed from the folder. The staging copy is removed afterwards unless
+        the job keeps it for the next run.
+        """
+        output_base = os.path.dirname(job['selection_tables_dir'])
+        folder_name = os.path.basename(job['folder_path'])
+        stale_files = (self.manifest_output_files(self.load_manifest(job['mirror_to']), job)
+                       - self.manifest_output_files(self.load_manifest(output_base), job))
+        self.update_status(f"Copying the outputs of {folder_name} to {job['mirror_to']}... Please wait.")
+        copied, copied_bytes, removed = mirror_tree(output_base, job['mirror_to'], stale_files)
+        self.count('bytes_written', copied_bytes)
+        self.update_status(f"Copied {copied} files ({copied_bytes / 1e6:.1f} MB) of {folder_name}"
+                           + (f", removed {removed} old files" if removed else ""))
+        if not job['keep_staging']:
+            shutil.rmtree(os.path.dirname(output_base), ignore_errors=True)
+    
+    def storage_device(self, path):
+        """Identify the drive (volume) a path is on, None if it cannot be determined"""
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            return None
+    
+    def is_removable_drive(self, path):
+        """Check whether a path is on an SD card, card reader or USB drive rather than an internal disk"""
+        try:
+            if os.name == 'nt':
+                import ctypes
+                drive = os.path.splitdrive(os.path.abspath(path))[0] + "\\"
+                return ctypes.windll.kernel32.GetDriveTypeW(drive) == DRIVE_REMOVABLE
+            if sys.platform == 'darwin':
+                # External volumes are mounted under /Volumes, the startup disk is not
+                return os.path.realpath(path).startswith('/Volumes/')
+            
+            # Linux: the sysfs entry of a partition is below the one of its disk, which has the removable flag
+            st_dev = os.stat(path).st_dev
+            block = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+            for directory in (block, os.path.dirname(block)):
+                removable_path = os.path.join(directory, 'removable')
+                if os.path.exists(removable_path):
+                    with open(removable_path) as f:
+                        if f.read().strip() == '1':
+                            return True
+            # USB disks and card readers often report fixed media, SD slots are on the MMC bus
+            return '/usb' in block or '/mmc' in block
+        except (OSError, AttributeError):
+            return False
+    
+    def file_signature(self, path):
+        """Size and modification time used to detect changed input files"""
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    
+    def detection_scores(self, wav_data):
+        """Score and sound type of every detection of one WAV file, from the column of its own sound type"""
+        import numpy as np
+        
+        detections = wav_data['detections']
+        scores = np.full(len(detections), np.nan)
+        sound_types = np.empty(len(detections), dtype=object)
+        for column in wav_data['sound_columns']:
+            values = detections[column].to_numpy(dtype=np.float64)
+            own = np.isnan(scores) & ~np.isnan(values)
+            scores[own] = values[own]
+            sound_types[own] = column
+        return scores, sound_types
+    
+    def detections_digest(self, detections, sound_columns):
+        """Fingerprint of the detections assigned to one WAV file"""
+        import numpy as np
+        
+        digest = hashlib.sha1('+'.join(sound_columns).encode('utf-8'))
+        for column in ('Detection_Seconds', 'background', *sound_columns):
+            digest.update(np.ascontiguousarray(detections[column].to_numpy()).tobytes())
+        return digest.hexdigest()
+    
+    def load_manifest(self, output_base):
+        """Load the processing manifest of a folder, or an empty one if there is none"""
+        empty = {'version': MANIFEST_VERSION, 'parameters': None, 'inputs': {}, 'wav_files': {}, 'deployment_table': None}
+        manifest_path = os.path.join(output_base, MANIFEST_FILENAME)
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        
+        if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+            return empty
+        manifest.setdefault('inputs', {})
+        manifest.setdefault('wav_files', {})
+        manifest.setdefault('deployment_table', None)
+        return manifest
+    
+    def save_manifest(self, output_base, manifest):
+        """Write the processing manifest of a folder atomically"""
+        manifest_path = os.path.join(output_base, MANIFEST_FILENAME)
+        temp_path = manifest_path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            os.replace(temp_path, manifest_path)
+        except OSError as e:
+            self.update_status(f"Could not write manifest {manifest_path}: {str(e)}")
+    
+    def manifest_dirs(self, job):
+        """(selection tables, audio segments) directories the manifest of a folder job is checked against.
+        
+        Without a kept staging copy the outputs of earlier runs are only in the folder itself.
+        """
+        if job['mirror_to'] and not job['keep_staging']:
+            return (os.path.join(job['mirror_to'], os.path.basename(job['selection_tables_dir'])),
+                    os.path.join(job['mirror_to'], os.path.basename(job['audio_segments_dir'])))
+        return job['selection_tables_dir'], job['audio_segments_dir']
+    
+    def manifest_output_files(self, manifest, job):
+        """Paths of the outputs a manifest records as written, relative to the output directory"""
+        tables_dir = os.path.basename(job['selection_tables_dir'])
+        segments_dir = os.path.basename(job['audio_segments_dir'])
+        files = {MANIFEST_FILENAME}
+        for entry in manifest['wav_files'].values():
+            if entry.get('selection_table'):
+                files.add(os.path.join(tables_dir, entry['selection_table']))
+            for segment_file in entry.get('segments') or []:
+                files.add(os.path.join(segments_dir, segment_file))
+        for file_name in (manifest['deployment_table'] or {}).values():
+            files.add(os.path.join(tables_dir, file_name))
+        return files
+    
+    def manifest_outputs_exist(self, entry, selection_tables_dir, audio_segments_dir, extract_audio):
+        """Check that the outputs recorded for a WAV file are still on disk"""
+        if entry.get('selection_table') and not os.path.exists(os.path.join(selection_tables_dir, entry['selection_table'])):
+            return False
+        if extract_audio:
+            if entry.get('segments') is None:
+                return False
+            for segment_file in entry['segments']:
+                if not os.path.exists(os.path.join(audio_segments_dir, segment_file)):
+                    return False
+        return True
+    
+    def manifest_entry_is_current(self, previous, entry, selection_tables_dir, audio_segments_dir, extract_audio):
+        """Check whether a WAV file was already processed with the same inputs and parameters"""
+        if not previous:
+            return False
+        for key in ('file', 'parameters', 'detections', 'selection_table'):
+            if previous.get(key) != entry[key]:
+                return False
+        return self.manifest_outputs_exist(previous, selection_tables_dir, audio_segments_dir, extract_audio)
+    
+    def manifest_is_current(self, manifest, inputs, parameters, selection_tables_dir, audio_segments_dir,
+                            create_tables, extract_audio):
+        """Check whether a whole folder is unchanged since the run that wrote the manifest"""
+        if not manifest['inputs'] or manifest['inputs'] != inputs or manifest['parameters'] != parameters:
+            return False
+        deployment_table = manifest['deployment_table']
+        if bool(deployment_table) != (create_tables and self.table_layout != TABLE_LAYOUT_PER_WAV):
+            return False
+        if deployment_table and not all(os.path.exists(os.path.join(selection_tables_dir, deployment_table[key]))
+                                        for key in ('table', 'listfile')):
+            return False
+        per_wav_tables = create_tables and self.table_layout != TABLE_LAYOUT_DEPLOYMENT
+        for entry in manifest['wav_files'].values():
+            if bool(entry.get('selection_table')) != per_wav_tables:
+                return False
+            if not self.manifest_outputs_exist(entry, selection_tables_dir, audio_segments_dir, extract_audio):
+                return False
+        return True
+    
+    def plan_wav_segments(self, detections, wav_start_seconds, time_offset, segment_length, selection_table):
+        """Build the list of segments to extract from one WAV file, one per selection table row"""
+        # Times are rounded like the selection table so snippets match the table exactly
+        begin_times = (detections['Detection_Seconds'].to_numpy() - wav_start_seconds) + time_offset
+        end_times = begin_times + segment_length
+        return [
+            {
+                'begin_time': round(float(begin_time), 2),
+                'end_time': round(float(end_time), 2),
+                'segment_id': segment_id,
+                'selection_table': selection_table
+            }
+            for segment_id, (begin_time, end_time) in enumerate(zip(begin_times, end_times), 1)
+        ]
+    
+    def load_detection_csvs(self, csv_files):
+        """Read several EI-results CSV files in parallel, returning (csv_file, data, sound_column) tuples in order"""
+        if not csv_files:
+            return []
+        
+        max_workers = min(os.cpu_count() or 2, len(csv_files))
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self.read_detection_csv, csv_file) for csv_file in csv_files]
+            for csv_file, future in zip(csv_files, futures):
+                try:
+                    data, sound_column = future.result()
+                except Exception as e:
+                    self.update_status(f"Error processing CSV file {os.path.basename(csv_file)}: {str(e)}")
+                    continue
+                if sound_column is None:
+                    self.update_status(f"Error: No sound type column found in {os.path.basename(csv_file)}")
+                    continue
+                results.append((csv_file, data, sound_column))
+        
+        return results
+    
+    def read_detection_csv(self, csv_file):
+        """Read an EI-results CSV file in bounded chunks, keeping only the columns used for processing.
+        
+        Returns a compact DataFrame with 'Detection_Seconds', 'background' and the sound
+        column, plus the name of the sound column (None if the file has none).
+        """
+        import numpy as np
+        import pandas as pd
+        
+        # Read the header first to find the columns we need, names may be padded with spaces
+        header = pd.read_csv(csv_file, nrows=0).columns
+        columns = {col.strip(): col for col in header}
+        
+        # Automatically detect the sound type column (not 'background' or date/time columns)
+        sound_column = None
+        for col in columns:
+            if col not in ['Hour:Min:Sec Day', 'Month Date Year', 'background']:
+                sound_column = col
+                break
+        
+        if sound_column is None:
+            return None, None
+        
+        missing = [col for col in ('Hour:Min:Sec Day', 'Month Date Year', 'background') if col not in columns]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        
+        dtypes = {
+            columns['Hour:Min:Sec Day']: str,
+            columns['Month Date Year']: 'category',
+            columns['background']: 'float32',
+            columns[sound_column]: 'float32',
+        }
+        
+        chunks = []
+        reader = pd.read_csv(csv_file, usecols=list(dtypes), dtype=dtypes, chunksize=DETECTION_CSV_CHUNK_ROWS)
+        for chunk in reader:
+            self.check_cancelled()
+            chunk.columns = chunk.columns.str.strip()
+            # Only the parsed time and the scores are kept, the text columns are dropped per chunk
+            chunks.append(pd.DataFrame({
+                'Detection_Seconds': self.parse_detection_times(chunk),
+                'background': chunk['background'].to_numpy(),
+                sound_column: chunk[sound_column].to_numpy(),
+            }))
+        
+        if not chunks:
+            data = pd.DataFrame({
+                'Detection_Seconds': np.empty(0, dtype=np.int64),
+                'background': np.empty(0, dtype=np.float32),
+                sound_column: np.empty(0, dtype=np.float32),
+            })
+        else:
+            data = pd.concat(chunks, ignore_index=True)
+        self.count('rows', len(data))
+        self.count('bytes_read', os.path.getsize(csv_file))
+        return data, sound_column
+    
+    def extract_audio_segments(self, folder_path, selection_tables_dir, audio_segments_dir, segments_by_wav=None):
+        """Extract audio segments with parallel processing, returning the segment files written per WAV file.
+        
+        segments_by_wav maps WAV files to the segments planned by process_folder. Without
+        a plan the segments are read back from the selection tables on disk, which covers
+        tables generated elsewhere.
+        """
+        if segments_by_wav is None:
+            segments_by_wav = self.read_selection_tables(folder_path, selection_tables_dir)
+        
+        total_wav_files = len(segments_by_wav)
+        if total_wav_files == 0:
+            self.update_status("No segments to extract.")
+            return {}
+            
+        self.update_status(f"Processing {total_wav_files} WAV files in parallel... Please wait.")
+        
+        # Determine the number of workers for parallel processing
+        # Use fewer workers for WAV processing to avoid memory issues
+        max_workers = min(os.cpu_count() or 2, total_wav_files, 4)  # Limit to 4 max to avoid memory issues
+        self.update_status(f"Using {max_workers} parallel workers for audio extraction.")
+        
+        start_time = time.time()
+        
+        # Process WAV files in parallel
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Prepare arguments for each WAV file
+            wav_tasks = []
+            for wav_file, segments in segments_by_wav.items():
+                # Sort segments by begin time to optimize sequential access
+                segments.sort(key=lambda x: x['begin_time'])
+                wav_tasks.append((wav_file, segments, audio_segments_dir))
+            
+            # Submit all WAV processing tasks
+            futures = {executor.submit(self.process_wav_file, *task, wav_index, total_wav_files): task 
+                      for wav_index, task in enumerate(wav_tasks, 1)}
+            
+            # Process results as they complete
+            extracted = {}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    wav_file, num_segments, segment_files = future.result()
+                    extracted[wav_file] = segment_files
+                    self.update_status(f"Completed processing {os.path.basename(wav_file)} with {num_segments} segments.")
+                except Exception as e:
+                    wav_task = futures[future]
+                    wav_file = wav_task[0]
+                    self.update_status(f"Error processing WAV file {os.path.basename(wav_file)}: {str(e)}")
+        
+        end_time = time.time()
+        processing_time = end_time - start_time
+        self.update_status(f"Audio extraction complete! Processed {total_wav_files} WAV files in {processing_time:.2f} seconds.")
+        return extracted
+    
+    def read_selection_tables(self, folder_path, selection_tables_dir):
+        """Parse the selection tables in a folder and group their segments by WAV file"""
+        self.update_status(f"Scanning for selection tables in {os.path.basename(selection_tables_dir)}... Please wait.")
+        selection_tables = glob.glob(os.path.join(selection_tables_dir, "*.txt"))
+        
+        if not selection_tables:
+            self.update_status("No selection tables found to extract audio segments from.")
+            return {}
+            
+        self.update_status(f"Found {len(selection_tables)} selection tables. Starting audio extraction... Please wait.")
+        
+        # Group segments by WAV file to avoid loading the same file multiple times
+        segments_by_wav = {}
+        
+        # First pass: Parse all selection tables and organize segments by WAV file
+        for selection_table in selection_tables:
+            # Find the corresponding WAV file
+            wav_file = self.find_wav_file(selection_table, folder_path)
+            if not wav_file:
+                self.update_status(f"No matching WAV file found for {os.path.basename(selection_table)}, skipping.")
+                continue
+            
+            # Parse the selection table
+            try:
+                with open(selection_table, 'r') as f:
+                    # Skip the header line
+                    header = f.readline()
+                    
+                    # Read the rest of the lines
+                    reader = csv.reader(f, delimiter='\t')
+                    for i, row in enumerate(reader, 1):
+                        if len(row) >= 5:  # Ensure we have enough columns
+                            try:
+                                # Extract begin and end times in seconds
+                                begin_time = float(row[3])
+                                end_time = float(row[4])
+                                
+                                # Store segment info
+                                if wav_file not in segments_by_wav:
+                                    segments_by_wav[wav_file] = []
+                                
+                                segments_by_wav[wav_file].append({
+                                    'begin_time': begin_time,
+                                    'end_time': end_time,
+                                    'segment_id': i,
+                                    'selection_table': os.path.basename(selection_table)
+                                })
+                            except Exception as e:
+                                self.update_status(f"Error parsing segment {i} in {os.path.basename(selection_table)}: {e}")
+            except Exception as e:
+                self.update_status(f"Error reading selection table {os.path.basename(selection_table)}: {e}")
+        
+        return segments_by_wav
+    
+    def process_wav_file(self, wav_file, segments, audio_segments_dir, wav_index, total_wav_files,
+                         encode_batch_bytes=None):
+        """Process a single WAV file and extract all its segments.
+        
+        With encode_batch_bytes, snippets copied from the recording that need encoding are
+        only read: about that many bytes of their data are returned as an encode batch for
+        write_encoded_snippets, together with the segments left to read. The result is then
+        (wav_file, processed_segments, segment_files, encode_batch, remaining_segments).
+        """
+        try:
+            self.update_status(f"Processing WAV file {wav_index}/{total_wav_files}: {os.path.basename(wav_file)}...")
+            
+            # Get total segments for this WAV file
+            total_segments = len(segments)
+            self.update_status(f"Found {total_segments} segments to extract from {os.path.basename(wav_file)}.")
+            
+            # Parse only the RIFF header, segments are read by seeking to their frame range.
+            # ffmpeg or pydub are used for files the header parser cannot handle, see choose_backend.
+            wav_info = None
+            audio = None
+            header_error = None
+            try:
+                wav_info = read_wav_header(wav_file)
+            except WavFormatError as e:
+                header_error = e
+            backend, ffmpeg_path = self.choose_backend(wav_info)
+            
+            if backend == BACKEND_DIRECT:
+                if wav_info is None:
+                    raise header_error
+                audio_duration_s = wav_info.duration
+            elif backend == BACKEND_FFMPEG:
+                if wav_info is not None:
+                    audio_duration_s, sample_rate = wav_info.duration, wav_info.sample_rate
+                else:
+                    self.update_status(f"Using FFmpeg for {os.path.basename(wav_file)}: {str(header_error)}")
+                    audio_duration_s, sample_rate = probe_audio(ffmpeg_path, wav_file)
+            else:
+                AudioSegment = load_audio_segment_class()
+                if AudioSegment is None:
+                    raise WavFormatError(f"{str(header_error or 'pydub is not installed')} (install pydub to read other formats)")
+                if header_error is not None:
+                    self.update_status(f"Falling back to pydub for {os.path.basename(wav_file)}: {str(header_error)}")
+                wav_info = None
+                audio = AudioSegment.from_file(wav_file, format="wav")
+                self.count('bytes_read', os.path.getsize(wav_file))
+                audio_duration_s = len(audio) / 1000.0  # Convert to seconds
+            base_name = os.path.splitext(os.path.basename(wav_file))[0]
+            
+            self.update_status(f"Audio file duration: {audio_duration_s:.2f} seconds")
+            
+            ffmpeg_outputs = None
+            encoder = None
+            if backend == BACKEND_FFMPEG:
+                # Snippets are collected and written in batches, one ffmpeg process per batch
+                ffmpeg_outputs = []
+                ffmpeg_options = segment_output_options(self.snippet_codec, wav_info, sample_rate, self.downmix,
+                                                        self.decimation)
+                extension = CODEC_EXTENSIONS[self.snippet_codec]
+                min_snippet_bytes = MIN_ENCODED_BYTES
+            else:
+                # Downmixed, decimated or FLAC snippets go through an encoder, plain WAV snippets are copied as they are
+                if wav_info is not None:
+                    source_fmt_chunk = wav_info.fmt_chunk
+                else:
+                    source_fmt_chunk = pcm_fmt_chunk(audio.channels, audio.frame_rate, audio.sample_width)
+                encoder = self.snippet_encoder(source_fmt_chunk, os.path.basename(wav_file))
+                extension = encoder.extension if encoder is not None else ".wav"
+                min_snippet_bytes = MIN_ENCODED_BYTES if encoder is not None else 1000  # More than 1KB indicates actual audio data
+            
+            # Track how many segments were actually processed
+            processed_segments = 0
+            skipped_segments = 0
+            existing_segments = 0
+            segment_files = []
+            
+            # Check every segment first, so only the ranges of the snippets that are cut are read
+            cuts = []
+            for segment_index, segment_info in enumerate(segments, 1):
+                begin_time = segment_info['begin_time']
+                end_time = segment_info['end_time']
+                segment_id = segment_info['segment_id']
+                
+                # Validate segment times before processing
+                if begin_time < 0:
+                    self.update_status(f"Skipping segment {segment_index}: negative begin time ({begin_time:.2f}s)")
+                    skipped_segments += 1
+                    continue
+                
+                if end_time <= begin_time:
+                    self.update_status(f"Skipping segment {segment_index}: invalid time range ({begin_time:.2f}s to {end_time:.2f}s)")
+                    skipped_segments += 1
+                    continue
+                
+                if begin_time >= audio_duration_s:
+                    self.update_status(f"Skipping segment {segment_index}: begins after audio end ({begin_time:.2f}s >= {audio_duration_s:.2f}s)")
+                    skipped_segments += 1
+                    continue
+                
+                # Adjust end time if it exceeds audio duration
+                original_end_time = end_time
+                if end_time > audio_duration_s:
+                    end_time = audio_duration_s
+                    if segment_index <= 5:  # Only show first few warnings to avoid spam
+                        self.update_status(f"Adjusting segment {segment_index} end time from {original_end_time:.2f}s to {end_time:.2f}s")
+                
+                # Check if we have a meaningful segment duration
+                segment_duration = end_time - begin_time
+                if segment_duration < 0.1:  # Less than 0.1 seconds
+                    self.update_status(f"Skipping segment {segment_index}: too short ({segment_duration:.2f}s)")
+                    skipped_segments += 1
+                    continue
+                
+                # Generate output filename
+                segment_filename = f"{base_name}_segment_{segment_id:03d}_{begin_time:.2f}s-{end_time:.2f}s{extension}"
+                segment_path = os.path.join(audio_segments_dir, segment_filename)
+                
+                # Check if segment already exists and is valid
+                if self.snippet_format != SNIPPETS_ARCHIVE and os.path.exists(segment_path):
+                    if os.path.getsize(segment_path) > min_snippet_bytes:
+                        if segment_index % 10 == 0:  # Only update status every 10 segments
+                            self.update_status(f"Segment {segment_index}/{total_segments} already exists, skipping.")
+                        segment_files.append(segment_filename)
+                        existing_segments += 1
+                        continue
+                    else:
+                        # Remove empty file so we can recreate it properly
+                        os.remove(segment_path)
+                
+                start_frame = end_frame = None
+                if wav_info is not None:
+                    # Sample-accurate frame range of the segment
+                    start_frame, end_frame = segment_frame_range(wav_info, begin_time, end_time)
+                    extracted_ms = (end_frame - start_frame) * 1000.0 / wav_info.sample_rate
+                elif audio is not None:
+                    # pydub slices in milliseconds and stops at the end of the audio
+                    extracted_ms = max(0, min(int(end_time * 1000), len(audio)) - int(begin_time * 1000))
+                else:
+                    extracted_ms = (end_time - begin_time) * 1000.0
+                
+                # Verify the extracted segment has actual audio data
+                if extracted_ms < 100:  # Less than 0.1 seconds
+                    self.update_status(f"Skipping segment {segment_index}: extracted segment too short ({extracted_ms:.0f}ms)")
+                    skipped_segments += 1
+                    continue
+                
+                cuts.append({
+                    'segment_index': segment_index,
+                    'segment_id': segment_id,
+                    'begin_time': begin_time,
+                    'end_time': end_time,
+                    'filename': segment_filename,
+                    'path': segment_path,
+                    'start_frame': start_frame,
+                    'end_frame': end_frame
+                })
+            self.report_progress(done_segments=len(segments) - len(cuts))
+            
+            src = None
+            reader = None
+            if backend == BACKEND_DIRECT:
+                # Detections a few seconds apart give overlapping segments, each region is read once
+                src = open(wav_file, 'rb')
+                reader = CoalescedReader(src, wav_info, [(cut['start_frame'], cut['end_frame']) for cut in cuts])
+            archive = None
+            encode_batch = None
+            batch_bytes = 0
+            remaining_segments = []
+            finished = []
+            try:
+                # Packed snippets all go into one archive, written under a temporary name like single snippets
+                if self.snippet_format == SNIPPETS_ARCHIVE:
+                    archive_filename = base_name + ARCHIVE_SUFFIX
+                    archive_path = os.path.join(audio_segments_dir, archive_filename)
+                    archive = SnippetArchiveWriter(archive_path + ".part",
+                                                   encoder.fmt_chunk if encoder is not None else source_fmt_chunk)
+                elif encoder is not None and reader is not None and encode_batch_bytes:
+                    # The snippets are encoded by another task, which does not hold the drive
+                    encode_batch = []
+                
+                # Cut the checked segments of this WAV file
+                for cut_index, cut in enumerate(cuts):
+                    self.check_cancelled()
+                    if cut_index > 0 and encode_batch is None:
+                        self.report_progress(done_segments=1)  # The previous segment, however it ended
+                    segment_index = cut['segment_index']
+                    segment_id = cut['segment_id']
+                    begin_time = cut['begin_time']
+                    end_time = cut['end_time']
+                    segment_filename = cut['filename']
+                    segment_path = cut['path']
+                    start_frame = cut['start_frame']
+                    end_frame = cut['end_frame']
+                    
+                    # Extract and export the segment
+                    if segment_index % 10 == 0:  # Only update status every 10 segments
+                        self.update_status(f"Exporting segment {segment_index}/{total_segments} from {os.path.basename(wav_file)}...")
+                    
+                    if audio is not None:
+                        # Convert to milliseconds for pydub
+                        segment = audio[int(begin_time * 1000):int(end_time * 1000)]
+                    
+                    if ffmpeg_outputs is not None:
+                        ffmpeg_outputs.append((segment_index, segment_filename, segment_path, begin_time, end_time))
+                        if wav_info is not None:
+                            self.count('encoded_bytes', (end_frame - start_frame) * wav_info.block_align)
+                        continue
+                    
+                    if encoder is not None:
+                        if wav_info is not None:
+                            data = reader.read(start_frame, end_frame)
+                        else:
+                            data = segment.raw_data
+                        if encode_batch is not None:
+                            encode_batch.append((segment_index, segment_filename, segment_path, data))
+                            batch_bytes += len(data)
+                            if batch_bytes >= encode_batch_bytes:
+                                remaining_segments = [segments[later['segment_index'] - 1] for later in cuts[cut_index + 1:]]
+                                break
+                            continue
+                        self.count('encoded_bytes', len(data))
+                    
+                    if archive is not None:
+                        if encoder is not None:
+                            encode_start = time.perf_counter()
+                            archive.add_data(segment_id, begin_time, end_time, encoder.convert(data))
+                            self.count('encode_seconds', time.perf_counter() - encode_start)
+                        elif wav_info is not None:
+                            archive.add_data(segment_id, begin_time, end_time, reader.read(start_frame, end_frame))
+                        else:
+                            archive.add_data(segment_id, begin_time, end_time, segment.raw_data)
+                        processed_segments += 1
+                        continue
+                    
+                    if encoder is not None:
+                        written, encode_seconds = encoder.write(data, segment_path)
+                        self.count('encode_seconds', encode_seconds)
+                        finished.append((segment_index, segment_filename, segment_path, written))
+                        continue
+                    
+                    # Written under a temporary name, so an interrupted export never leaves a partial snippet
+                    partial_path = segment_path + ".part"
+                    try:
+                        if wav_info is not None:
+                            write_wav_data(wav_info, reader.read(start_frame, end_frame), partial_path)
+                        else:
+                            segment.export(partial_path, format="wav")
+                        os.replace(partial_path, segment_path)
+                    finally:
+                        if os.path.exists(partial_path):
+                            os.remove(partial_path)
+                    
+                    # Verify the exported file is not empty
+                    if os.path.exists(segment_path) and os.path.getsize(segment_path) > 1000:
+                        processed_segments += 1
+                        segment_files.append(segment_filename)
+                        self.count('bytes_written', os.path.getsize(segment_path))
+                    else:
+                        self.update_status(f"Warning: Exported segment {segment_index} appears empty, removing")
+                        if os.path.exists(segment_path):
+                            os.remove(segment_path)
+                        skipped_segments += 1
+                if cuts and encode_batch is None:
+                    self.report_progress(done_segments=1)
+                
+                # Encoded snippets and those of ffmpeg are verified once they are written, like the copied ones above
+                for batch_start in range(0, len(ffmpeg_outputs or []), FFMPEG_SEGMENTS_PER_RUN):
+                    self.check_cancelled()
+                    batch = ffmpeg_outputs[batch_start:batch_start + FFMPEG_SEGMENTS_PER_RUN]
+                    encode_start = time.perf_counter()
+                    sizes = extract_segments(ffmpeg_path, wav_file, [(begin, end, path) for _, _, path, begin, end in batch],
+                                             ffmpeg_options)
+                    self.count('encode_seconds', time.perf_counter() - encode_start)
+                    # ffmpeg reads the recording from the first to the end of the last snippet of the batch
+                    read_seconds = min(audio_duration_s, max(end for _, _, _, _, end in batch)) - min(begin for _, _, _, begin, _ in batch)
+                    self.count('bytes_read', int(os.path.getsize(wav_file) * read_seconds / audio_duration_s))
+                    finished.extend((segment_index, segment_filename, segment_path, size)
+                                    for (segment_index, segment_filename, segment_path, _, _), size in zip(batch, sizes))
+                
+                for segment_index, segment_filename, segment_path, written in finished:
+                    if written > min_snippet_bytes:
+                        processed_segments += 1
+                        segment_files.append(segment_filename)
+                        self.count('bytes_written', written)
+                    else:
+                        self.update_status(f"Warning: Exported segment {segment_index} appears empty, removing")
+                        os.remove(segment_path)
+                        skipped_segments += 1
+                
+                if archive is not None and processed_segments:
+                    self.count('bytes_written', archive.close())
+                    os.replace(archive_path + ".part", archive_path)
+                    segment_files.append(archive_filename)
+            finally:
+                if src is not None:
+                    src.close()
+                if reader is not None:
+                    self.count('bytes_read', reader.bytes_read)
+                    self.count('bytes_read_saved', reader.bytes_saved)
+                if archive is not None:
+                    if not archive.f.closed:
+                        archive.abort()
+                    if os.path.exists(archive_path + ".part"):
+                        os.remove(archive_path + ".part")
+            
+            # Free memory
+            del audio
+            
+            self.count('segments_written', processed_segments)
+            self.count('segments_skipped', skipped_segments)
+            self.count('segments_existing', existing_segments)
+            
+            # Report results
+            if skipped_segments > 0:
+                self.update_status(f"Completed {os.path.basename(wav_file)}: {processed_segments} valid segments, {skipped_segments} skipped")
+            
+            # Return the WAV file name, number of segments processed and the segment files written
+            if encode_batch_bytes:
+                return (wav_file, processed_segments, segment_files, (encoder, encode_batch) if encode_batch else None,
+                        remaining_segments)
+            return wav_file, processed_segments, segment_files
+            
+        except ProcessingCancelled:
+            raise
+        except Exception as e:
+            # Re-raise the exception to be caught by the executor
+            raise Exception(f"Error processing {os.path.basename(wav_file)}: {str(e)}")
+    
+    def write_encoded_snippets(self, wav_file, encoder, snippets):
+        """Encode and write snippets read by process_wav_file, returns (wav_file, processed_segments, segment_files).
+        
+        snippets are (segment index, file name, path, raw data) tuples. The task reads
+        nothing from the recording's drive, so it runs while the next snippets are read.
+        """
+        try:
+            processed_segments = 0
+            skipped_segments = 0
+            segment_files = []
+            for segment_index, segment_filename, segment_path, data in snippets:
+                self.check_cancelled()
+                self.count('encoded_bytes', len(data))
+                written, encode_seconds = encoder.write(data, segment_path)
+                self.count('encode_seconds', encode_seconds)
+                if written > MIN_ENCODED_BYTES:
+                    processed_segments += 1
+                    segment_files.append(segment_filename)
+                    self.count('bytes_written', written)
+                else:
+                    self.update_status(f"Warning: Exported segment {segment_index} appears empty, removing")
+                    os.remove(segment_path)
+                    skipped_segments += 1
+                self.report_progress(done_segments=1)
+            
+            self.count('segments_written', processed_segments)
+            self.count('segments_skipped', skipped_segments)
+            return wav_file, processed_segments, segment_files
+            
+        except ProcessingCancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"Error encoding snippets of {os.path.basename(wav_file)}: {str(e)}")
+    
+    def choose_backend(self, wav_info):
+        """Backend cutting the snippets of one WAV file and the ffmpeg executable it uses.
+        
+        With BACKEND_AUTO the fastest one that can produce the snippets is used: frame
+        ranges copied straight from the recording for PCM WAV files, one ffmpeg process
+        per batch of snippets for FLAC snippets and other formats (instead of one encode
+        per snippet), and pydub when ffmpeg was not found (see setup_ffmpeg.py).
+        """
+        from setup_ffmpeg import find_ffmpeg
+        
+        backend = self.extraction_backend
+        if backend in (BACKEND_DIRECT, BACKEND_PYDUB):
+            return backend, None
+        if backend == BACKEND_FFMPEG:
+            ffmpeg_path = find_ffmpeg()
+            if ffmpeg_path is None:
+                raise RuntimeError("FFmpeg was not found (see setup_ffmpeg.py)")
+            if self.snippet_format != SNIPPETS_ARCHIVE:
+                return backend, ffmpeg_path
+        
+        # Archives are filled with the raw frames, which ffmpeg does not hand back
+        fallback = BACKEND_DIRECT if wav_info is not None else BACKEND_PYDUB
+        if self.snippet_format == SNIPPETS_ARCHIVE:
+            return fallback, None
+        if wav_info is not None:
+            flac_possible = (wav_info.format_tag == WAVE_FORMAT_PCM
+                             and wav_info.block_align // wav_info.channels <= FLAC_MAX_SAMPLE_WIDTH)
+            if self.snippet_codec != SNIPPET_CODEC_FLAC or not flac_possible:
+                return fallback, None
+        ffmpeg_path = find_ffmpeg()
+        return (BACKEND_FFMPEG if ffmpeg_path is not None else fallback), ffmpeg_path
+    
+    def snippet_encoder(self, fmt_chunk, wav_name):
+        """SnippetEncoder for the snippets of one WAV file, None if they are plain WAV copies"""
+        # Archives stay WAV files, their index points to frames in the data chunk
+        codec = SNIPPET_CODEC_WAV if self.snippet_format == SNIPPETS_ARCHIVE else self.snippet_codec
+        if self.snippet_codec == SNIPPET_CODEC_FLAC and codec != SNIPPET_CODEC_FLAC:
+            self.update_status("Snippet archives are written as WAV, FLAC is only used for single snippet files")
+        if codec == SNIPPET_CODEC_WAV and not self.downmix and self.decimation <= 1:
+            return None
+        
+        ffmpeg_path = None
+        if codec == SNIPPET_CODEC_FLAC:
+            from setup_ffmpeg import find_ffmpeg
+            ffmpeg_path = find_ffmpeg()
+        encoder = SnippetEncoder(fmt_chunk, codec, self.downmix, self.decimation, ffmpeg_path)
+        if encoder.notice:
+            self.update_status(f"Writing the snippets of {wav_name} as WAV: {encoder.notice}")
+        if encoder.codec == SNIPPET_CODEC_WAV and not encoder.converts:
+            return None
+        return encoder
+    
+    # Helper functions
+    
+    def extract_datetime_from_filename(self, filename):
+        """Extract datetime from WAV filename"""
+        # Expected format: [variable_prefix]_[timestamp]_[date]_[time].wav
+        # Count from the end: date is 2nd from last, time is 1st from last
+        parts = os.path.splitext(filename)[0].split('_')
+        if len(parts) >= 3:
+            date_part = parts[-2]  # "2025-03-10" (2nd from end)
+            time_part = parts[-1]  # "18-14-52" (1st from end)
+            time_part = time_part.replace('-', ':')  # Convert to "18:14:52"
+            return f"{date_part} {time_part}"
+        return None
+    
+    def wav_start_time(self, filename):
+        """Get the absolute start time of a WAV file in local wall-clock seconds since the epoch"""
+        # The date and time parts are the start of this file
+        datetime_str = self.extract_datetime_from_filename(filename)
+        if datetime_str:
+            try:
+                dt = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
+                return calendar.timegm(dt.timetuple())
+            except ValueError:
+                pass
+        
+        # The epoch-millisecond part (3rd from end) is the start of the recording session, shared
+        # by every file of a folder, so it is only used for names without a readable date and time
+        parts = os.path.splitext(filename)[0].split('_')
+        if len(parts) >= 3 and parts[-3].isdigit():
+            return int(parts[-3]) / 1000.0
+        
+        return None
+    
+    def build_wav_index(self, wav_files):
+        """Build arrays of WAV paths with absolute start and end times, sorted by start time"""
+        import numpy as np
+        
+        entries = []
+        for wav_file in wav_files:
+            start_seconds = self.wav_start_time(os.path.basename(wav_file))
+            if start_seconds is None:
+                self.update_status(f"Could not determine start time of {os.path.basename(wav_file)}, skipping.")
+                continue
+            
+            # The real length comes from the WAV header
+            try:
+                duration = read_wav_header(wav_file).duration
+            except (OSError, WavFormatError):
+                duration = 3600  # Assume a 1-hour WAV file if the header cannot be read
+            entries.append((start_seconds, start_seconds + duration, wav_file))
+        
+        entries.sort()
+        wav_paths = [entry[2] for entry in entries]
+        wav_starts = np.array([entry[0] for entry in entries], dtype=np.float64)
+        wav_ends = np.array([entry[1] for entry in entries], dtype=np.float64)
+        return wav_paths, wav_starts, wav_ends
+    
+    def assign_detections_to_wavs(self, detection_seconds, wav_starts, wav_ends):
+        """Return the index of the WAV file containing each detection, or -1 if there is none"""
+        import numpy as np
+        
+        detection_seconds = np.asarray(detection_seconds, dtype=np.float64)
+        if len(wav_starts) == 0:
+            return np.full(len(detection_seconds), -1, dtype=np.int64)
+        
+        # Latest WAV file starting at or before each detection
+        indices = np.searchsorted(wav_starts, detection_seconds, side='right') - 1
+        inside = (indices >= 0) & (detection_seconds < wav_ends[np.clip(indices, 0, None)])
+        return np.where(inside, indices, -1).astype(np.int64)
+    
+    def parse_detection_times(self, data):
+        """Convert the 'Hour:Min:Sec Day' and 'Month Date Year' columns to int64 epoch seconds.
+        
+        Times are local wall-clock time, like the WAV filenames. Rows that cannot be
+        parsed are set to -1, which never falls inside a WAV file.
+        """
+        import numpy as np
+        import pandas as pd
+        
+        # Dates repeat for every detection of a day, so only the distinct values are parsed
+        date_codes, unique_dates = pd.factorize(data['Month Date Year'].astype(str))
+        unique_days = pd.to_datetime(pd.Index(unique_dates).str.strip(), format='%b %d %Y', errors='coerce')
+        day_seconds = np.where(unique_days.isna(), -1, unique_days.to_numpy(dtype='datetime64[s]').astype(np.int64))
+        
+        # Times are fixed width 'HH:MM:SS Day', decode the digits directly from the bytes
+        times = data['Hour:Min:Sec Day'].astype(str).to_numpy()
+        seconds = np.full(len(times), -1, dtype=np.int64)
+        try:
+            raw = times.astype('S8')
+            digits = np.frombuffer(raw.tobytes(), dtype=np.uint8).reshape(-1, 8).astype(np.int64) - ord('0')
+            hours = digits[:, 0] * 10 + digits[:, 1]
+            minutes = digits[:, 3] * 10 + digits[:, 4]
+            secs = digits[:, 6] * 10 + digits[:, 7]
+            fixed_width = (
+                ((digits[:, [0, 1, 3, 4, 6, 7]] >= 0) & (digits[:, [0, 1, 3, 4, 6, 7]] <= 9)).all(axis=1)
+                & (raw.view(np.uint8).reshape(-1, 8)[:, 2] == ord(':'))
+                & (raw.view(np.uint8).reshape(-1, 8)[:, 5] == ord(':'))
+                & (hours < 24) & (minutes < 60) & (secs < 60)
+            )
+            seconds[fixed_width] = (hours * 3600 + minutes * 60 + secs)[fixed_width]
+        except UnicodeEncodeError:
+            fixed_width = np.zeros(len(times), dtype=bool)
+        
+        # Anything else (e.g. a single digit hour) goes through the slower generic parser
+        if not fixed_width.all():
+            others = pd.Series(times[~fixed_width]).str.strip().str.split(n=1).str[0]
+            parsed = pd.to_timedelta(others, errors='coerce')
+            seconds[~fixed_width] = np.where(parsed.isna(), -1, parsed.dt.total_seconds().fillna(-1).astype(np.int64))
+        
+        day = day_seconds[date_codes] if len(day_seconds) else np.full(len(times), -1, dtype=np.int64)
+        valid = (date_codes >= 0) & (day >= 0) & (seconds >= 0)
+        return np.where(valid, day + seconds, -1).astype(np.int64)
+    
+    def datetime_to_seconds(self, datetime_str):
+        """Convert datetime string to seconds since midnight"""
+        dt = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
+        return dt.hour * 3600 + dt.minute * 60 + dt.second
+    
+    def time_to_seconds(self, time_str):
+        """Convert time to seconds since midnight"""
+        time_obj = datetime.strptime(time_str, '%H:%M:%S')
+        return time_obj.hour * 3600 + time_obj.minute * 60 + time_obj.second
+    
+    def month_name_to_number(self, month_name):
+        """Convert month name to number"""
+        month_map = {
+            'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
+            'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12'
+        }
+        return month_map.get(month_name, month_name)
+    
+    def find_wav_file(self, selection_table_filename, folder_path):
+        """Find the corresponding WAV file for a selection table"""
+        # New format: WAV_filename_SelectionTable.txt
+        # Extract the WAV filename from the selection table filename
+        base_name = os.path.basename(selection_table_filename).replace('_SelectionTable.txt', '')
+        
+        # The base_name should now be the WAV filename without extension
+        # e.g., "1753053819136_2025-07-22_15-20-21"
+        wav_filename = f"{base_name}.wav"
+        wav_file_path = os.path.join(folder_path, wav_filename)
+        
+        # Check if the WAV file exists
+        if os.path.exists(wav_file_path):
+            self.update_status(f"Found matching WAV file for selection table: {wav_filename}")
+            return wav_file_path
+        else:
+            self.update_status(f"WAV file not found: {wav_filename} in {folder_path}")
+            return None
+
+
+def staging_output_base(staging_root, folder_path):
+    """Output directory of a folder in a local staging directory, unique per source folder"""
+    folder_key = hashlib.sha1(os.path.abspath(folder_path).encode('utf-8')).hexdigest()[:8]
+    return os.path.join(staging_root, f"{os.path.basename(folder_path)}_{folder_key}", "output")
+
+
+def create_output_dirs(folder_path, staging_root=None):
+    """Create the output directories of a folder, returns (selection_tables_dir, audio_segments_dir).
+    
+    With staging_root the outputs are written to local storage first, see make_folder_job.
+    """
+    if staging_root:
+        output_base = staging_output_base(staging_root, folder_path)
+    else:
+        output_base = os.path.join(folder_path, "output")
+    selection_tables_dir = os.path.join(output_base, "Raven_Selection_Tables")
+    audio_segments_dir = os.path.join(output_base, "Audio_Segments")
+    
+    os.makedirs(selection_tables_dir, exist_ok=True)
+    os.makedirs(audio_segments_dir, exist_ok=True)
+    return selection_tables_dir, audio_segments_dir
+
+
+def make_folder_job(folder_path, selection_tables_dir, audio_segments_dir, time_offset, segment_length,
+                    create_tables=True, extract_audio=True, table_layout=TABLE_LAYOUT_PER_WAV,
+                    snippet_format=SNIPPETS_FILES, mirror_to=None, keep_staging=True,
+                    snippet_codec=SNIPPET_CODEC_WAV, downmix=False, decimation=1, extraction_backend=BACKEND_AUTO):
+    """Describe the processing of one folder with plain values that can be sent to a worker process.
+    
+    When the output directories are in a staging directory (see create_output_dirs),
+    mirror_to is the output directory in the folder the results are copied to once the
+    folder is finished. keep_staging keeps the local copy, so the next run can skip
+    unchanged recordings without reading the outputs back from the card.
+    """
+    return {
+        'folder_path': folder_path,
+        'selection_tables_dir': selection_tables_dir,
+        'audio_segments_dir': audio_segments_dir,
+        'time_offset': time_offset,
+        'segment_length': segment_length,
+        'create_tables': create_tables,
+        'extract_audio': extract_audio,
+        'table_layout': table_layout,
+        'snippet_format': snippet_format,
+        'mirror_to': mirror_to,
+        'keep_staging': keep_staging,
+        'snippet_codec': snippet_codec,
+        'downmix': downmix,
+        'decimation': decimation,
+        'extraction_backend': extraction_backend
+    }
+
+
+def run_engine_task(job, method, args, progress_queue=None, traced=False, cancel_event=None, report_progress=False):
+    """Run one ElocEngine method for a folder job, used as the worker function of the process pool.
+    
+    Status messages are put on progress_queue as ('status', message) tuples, progress
+    increments as ('progress', increments) if report_progress is set. Returns
+    (result, stats) like ElocEngine.run_timed.
+    """
+    status_callback = None
+    if progress_queue is not None:
+        status_callback = lambda message: progress_queue.put(('status', message))
+    
+    engine = ElocEngine(status_callback, create_tables=job['create_tables'], extract_audio=job['extract_audio'],
+                        table_layout=job['table_layout'], snippet_format=job['snippet_format'],
+                        snippet_codec=job['snippet_codec'], downmix=job['downmix'], decimation=job['decimation'],
+                        extraction_backend=job['extraction_backend'])
+    engine.cancel_event = cancel_event
+    if progress_queue is not None and report_progress:
+        engine.progress_callback = lambda increments: progress_queue.put(('progress', increments))
+    return engine.run_timed(method, args, traced)
+
+
+class FolderPipeline:
+    """Task graph of one folder job for WorkScheduler.
+    
+    scan -> parse (one task per CSV file) -> assign -> tables -> extract (one task per
+    WAV file) -> finish. Extract tasks hold the folder's drive; snippets that need
+    encoding are read in batches and each batch is encoded by an encode task that does
+    not, while the next extract task of the WAV file reads on. A WAV file is done once
+    all its tasks are. Tasks only name ElocEngine methods and plain arguments, so the
+    same graph runs on threads or in worker processes. Status messages about the
+    results go to the engine that owns the pipeline, task stats to metrics and trace,
+    planned and finished WAV bytes to progress.
+    """
+    
+    def __init__(self, engine, job, metrics=None, trace=None, progress=None):
+        self.engine = engine
+        self.job = job
+        self.metrics = metrics
+        self.trace = trace
+        self.progress = progress
+        self.trace_start = None  # Start of the first and end of the last task, for the folder's span
+        self.trace_end = None
+        self.folder_name = os.path.basename(job['folder_path'])
+        self.device = engine.storage_device(job['folder_path'])  # Resource of the tasks reading the folder
+        self.removable = self.device is not None and engine.is_removable_drive(job['folder_path'])
+        self.folder = None
+        self.done = False
+        self.cancelled = False
+        self.error = None
+        self.failed_wavs = []  # WAV files whose extraction failed, the rest of the folder is still finished
+        self.pending = 0
+        self.wav_tasks = {}  # Extract and encode tasks in flight per WAV file, and the snippets they wrote
+        self.wav_segments = {}
+    
+    def start(self):
+        return [Task(self, STAGE_SCAN, 'prepare_folder', (self.job,), resource=self.device)]
+    
+    def task_done(self, task, outcome):
+        result, stats = outcome
+        if self.metrics is not None:
+            wav_file = task.args[0] if task.stage in (STAGE_EXTRACT, STAGE_ENCODE) else None
+            self.metrics.add(self.job['folder_path'], task.stage, stats, wav_file)
+        if self.trace is not None:
+            self.trace_task(task, stats)
+        if self.done:
+            return []  # The folder was cancelled or failed while this task was running
+        
+        if task.stage == STAGE_SCAN:
+            if result is None:
+                self.done = True  # Nothing to do for this folder
+                return []
+            self.folder = result
+            self.report_progress(planned_bytes=sum(self.wav_size(wav_file) for wav_file in result['wav_paths']))
+            csv_files = result['csv_files']
+            self.detection_tables = [None] * len(csv_files)
+            self.pending = len(csv_files)
+            return [Task(self, STAGE_PARSE, 'read_detection_csv', (csv_file,), sequence=index, key=index,
+                         resource=self.device)
+                    for index, csv_file in enumerate(csv_files)]
+        
+        if task.stage == STAGE_PARSE:
+            csv_file = task.args[0]
+            data, sound_column = result
+            if sound_column is None:
+                self.engine.update_status(f"Error: No sound type column found in {os.path.basename(csv_file)}")
+            else:
+                self.detection_tables[task.key] = (csv_file, data, sound_column)
+            return self.parse_finished()
+        
+        if task.stage == STAGE_ASSIGN:
+            detections_by_wav, csv_errors = result
+            return [Task(self, STAGE_TABLES, 'write_folder_tables', (self.folder, detections_by_wav, csv_errors))]
+        
+        if task.stage == STAGE_TABLES:
+            extraction_plan, self.new_manifest = result
+            self.extracted = {}
+            if not self.job['extract_audio']:
+                extraction_plan = {}
+            # WAV files without segments to cut are done once their tables are written
+            self.report_progress(done_bytes=sum(self.wav_size(wav_file) for wav_file in self.folder['wav_paths']
+                                                if wav_file not in extraction_plan),
+                                 planned_segments=sum(len(segments) for segments in extraction_plan.values()))
+            if not extraction_plan:
+                return [self.finish_task()]
+            
+            self.engine.update_status(f"Starting audio segment extraction for {self.folder_name}... Please wait.")
+            self.extract_start_time = time.time()
+            total_wav_files = len(extraction_plan)
+            tasks = []
+            for wav_index, (wav_file, segments) in enumerate(extraction_plan.items(), 1):
+                # Sort segments by begin time to optimize sequential access
+                segments.sort(key=lambda x: x['begin_time'])
+                tasks.append(self.extract_task(wav_file, segments, wav_index, total_wav_files))
+                self.wav_tasks[wav_file] = 1
+                self.wav_segments[wav_file] = (0, [])
+            self.pending = len(tasks)
+            return tasks
+        
+        if task.stage == STAGE_EXTRACT:
+            wav_file, num_segments, segment_files, encode_batch, remaining_segments = result
+            tasks = []
+            if encode_batch is not None:
+                encoder, snippets = encode_batch
+                tasks.append(Task(self, STAGE_ENCODE, 'write_encoded_snippets', (wav_file, encoder, snippets),
+                                  sequence=task.sequence))
+            if remaining_segments:
+                tasks.append(self.extract_task(wav_file, remaining_segments, task.args[3], task.args[4]))
+            return tasks + self.wav_task_done(wav_file, num_segments, segment_files, len(tasks))
+        
+        if task.stage == STAGE_ENCODE:
+            wav_file, num_segments, segment_files = result
+            return self.wav_task_done(wav_file, num_segments, segment_files)
+        
+        self.done = True
+        return []
+    
+    def task_failed(self, task, error):
+        if self.done:
+            return []
+        if isinstance(error, ProcessingCancelled):
+            # The manifest is not saved, so the folder is picked up again on the next run
+            self.cancelled = True
+            self.done = True
+            self.engine.update_status(f"Processing of {self.folder_name} cancelled.")
+            return []
+        
+        if task.stage == STAGE_PARSE:
+            self.engine.update_status(f"Error processing CSV file {os.path.basename(task.args[0])}: {str(error)}")
+            return self.parse_finished()
+        
+        if task.stage in (STAGE_EXTRACT, STAGE_ENCODE):
+            wav_file = task.args[0]
+            if wav_file not in self.failed_wavs:
+                self.failed_wavs.append(wav_file)
+            self.engine.update_status(f"Error processing WAV file {os.path.basename(wav_file)}: {str(error)}")
+            return self.wav_task_done(wav_file, 0, [])
+        
+        self.error = error
+        self.done = True
+        self.engine.update_status(f"Error processing {self.folder_name}: {str(error)}")
+        return []
+    
+    def trace_task(self, task, stats):
+        """Add the span of a finished task to the trace"""
+        if task.stage in (STAGE_PARSE, STAGE_EXTRACT, STAGE_ENCODE):
+            name = f"{task.stage} {os.path.basename(task.args[0])}"
+        else:
+            name = f"{task.stage} {self.folder_name}"
+        args = {'folder': self.folder_name}
+        if task.ready_time is not None:
+            # Time between the task becoming ready and a worker (and drive) being free for it
+            args['waited_ms'] = round(max(0.0, stats['start'] - task.ready_time) * 1000, 3)
+        self.trace.add_task(name, task.stage, stats, args)
+        
+        end = stats['start'] + stats['seconds']
+        self.trace_start = stats['start'] if self.trace_start is None else min(self.trace_start, stats['start'])
+        self.trace_end = end if self.trace_end is None else max(self.trace_end, end)
+    
+    def wav_size(self, wav_file):
+        """Size of a WAV file of the folder from the scan signatures"""
+        return self.folder['inputs'].get(os.path.basename(wav_file), {}).get('size', 0)
+    
+    def report_progress(self, **increments):
+        if self.progress is not None:
+            self.progress.update(increments)
+    
+    def parse_finished(self):
+        """Continue with the assignment once every CSV file of the folder is parsed"""
+        self.pending -= 1
+        if self.pending > 0:
+            return []
+        detection_tables = [table for table in self.detection_tables if table is not None]
+        self.detection_tables = None
+        return [Task(self, STAGE_ASSIGN, 'assign_folder_detections', (self.folder, detection_tables))]
+    
+    def extract_task(self, wav_file, segments, wav_index, total_wav_files):
+        return Task(self, STAGE_EXTRACT, 'process_wav_file',
+                    (wav_file, segments, self.folder['audio_segments_dir'], wav_index, total_wav_files,
+                     ENCODE_BATCH_BYTES),
+                    sequence=wav_index, resource=self.device)
+    
+    def wav_task_done(self, wav_file, num_segments, segment_files, new_tasks=0):
+        """Count a finished extract or encode task of a WAV file, which is done once none are left"""
+        done_segments, done_files = self.wav_segments[wav_file]
+        self.wav_segments[wav_file] = (done_segments + num_segments, done_files + segment_files)
+        self.wav_tasks[wav_file] += new_tasks - 1
+        if self.wav_tasks[wav_file] > 0:
+            return []
+        
+        num_segments, segment_files = self.wav_segments.pop(wav_file)
+        self.report_progress(done_bytes=self.wav_size(wav_file))
+        if wav_file not in self.failed_wavs:
+            self.extracted[wav_file] = segment_files
+            self.engine.update_status(f"Completed processing {os.path.basename(wav_file)} with {num_segments} segments.")
+        return self.extract_finished()
+    
+    def extract_finished(self):
+        """Save the manifest once every WAV file of the folder is extracted"""
+        self.pending -= 1
+        if self.pending > 0:
+            return []
+        processing_time = time.time() - self.extract_start_time
+        self.engine.update_status(f"Audio extraction complete for {self.folder_name}! "
+                                  f"Processed {len(self.extracted)} WAV files in {processing_time:.2f} seconds.")
+        return [self.finish_task()]
+    
+    def finish_task(self):
+        # Copying the outputs back from a staging directory writes to the folder's drive
+        resource = self.device if self.job['mirror_to'] else None
+        return Task(self, STAGE_FINISH, 'finish_folder', (self.folder, self.new_manifest, self.extracted),
+                    resource=resource)
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+
+# Metrics of the last run, written next to the progress log
+METRICS_FILENAME = "eloc_metrics.json"
+
+# Counters collected per task, see ElocEngine.count
+COUNTER_NAMES = ('bytes_read', 'bytes_read_saved', 'bytes_written', 'rows', 'detections', 'tables',
+                 'segments_written', 'segments_skipped', 'segments_existing', 'encoded_bytes', 'encode_seconds')
+
+
+def peak_rss_bytes():
+    """Peak resident memory of the current process since it started in bytes, None if it cannot be determined.
+
+    This is a high-water mark of the whole process, not of the task that is running.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+    if sys.platform == 'win32':
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                            ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                            ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.PeakWorkingSetSize
+        except (OSError, AttributeError):
+            pass
+    return None
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+
+class RunMetrics:
+    """Wall time and counters of every pipeline stage, per folder and per WAV file.
+
+    add() is called with the stats returned by ElocEngine.run_timed for every task and
+    is safe to call from several threads. to_dict() gives the machine-readable report.
+    Peak memory is only reported for the whole run, as the largest high-water mark of
+    this process and the worker processes that ran tasks.
+    """
+
+    def __init__(self):
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.wall_seconds = None
+        self.peak_rss = peak_rss_bytes()
+        self.stages = {}
+        self.folders = {}
+        self._lock = threading.Lock()
+
+    def add(self, folder, stage, stats, wav_file=None):
+        with self._lock:
+            folder_metrics = self.folders.setdefault(folder, {'stages': {}, 'wav_files': {}})
+            targets = [self.stages.setdefault(stage, {}), folder_metrics['stages'].setdefault(stage, {})]
+            if wav_file is not None:
+                targets.append(folder_metrics['wav_files'].setdefault(os.path.basename(wav_file), {}))
+            for target in targets:
+                target['calls'] = target.get('calls', 0) + 1
+                target['seconds'] = target.get('seconds', 0.0) + stats.get('seconds', 0.0)
+                for name in COUNTER_NAMES:
+                    if stats.get(name):
+                        target[name] = target.get(name, 0) + stats[name]
+            if stats.get('peak_rss'):
+                self.peak_rss = max(self.peak_rss or 0, stats['peak_rss'])
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self.start_time
+        self.peak_rss = max(self.peak_rss or 0, peak_rss_bytes() or 0) or None
+
+    def to_dict(self):
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': self.wall_seconds,
+            'peak_rss': self.peak_rss,
+            'stages': self.stages,
+            'folders': self.folders,
+        }
+
+    def save(self, path):
+        """Write the metrics as JSON, replacing the file of the previous run"""
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(temp_path, path)
+
+    def summary(self):
+        """A few lines per stage for the status bar, the log and the completion dialog"""
+        lines = []
+        for stage, metrics in self.stages.items():
+            parts = [f"{stage}: {metrics['seconds']:.2f}s in {metrics['calls']} tasks"]
+            if metrics.get('bytes_read'):
+                rate = metrics['bytes_read'] / metrics['seconds'] if metrics['seconds'] else 0
+                parts.append(f"{format_bytes(metrics['bytes_read'])} read ({format_bytes(rate)}/s)")
+            if metrics.get('bytes_read_saved'):
+                # Overlapping segments served from one coalesced read
+                parts.append(f"{format_bytes(metrics['bytes_read_saved'])} not read again")
+            if metrics.get('bytes_written'):
+                parts.append(f"{format_bytes(metrics['bytes_written'])} written")
+            if metrics.get('encoded_bytes') and metrics.get('bytes_written'):
+                # Uncompressed snippet audio against the files written, and the rate of a single encoder
+                ratio = metrics['encoded_bytes'] / metrics['bytes_written']
+                parts.append(f"{format_bytes(metrics['encoded_bytes'])} of audio encoded at {ratio:.1f}:1")
+                if metrics.get('encode_seconds'):
+                    parts.append(f"{format_bytes(metrics['encoded_bytes'] / metrics['encode_seconds'])}/s per encoder")
+            for name in ('rows', 'detections', 'tables', 'segments_written', 'segments_skipped', 'segments_existing'):
+                if metrics.get(name):
+                    parts.append(f"{metrics[name]} {name.replace('_', ' ')}")
+            lines.append(", ".join(parts))
+        if self.wall_seconds is not None:
+            lines.append(f"Total: {self.wall_seconds:.2f}s"
+                         + (f", peak memory {format_bytes(self.peak_rss)}" if self.peak_rss else ""))
+        return lines
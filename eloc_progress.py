@@ -0,0 +1,80 @@
+import time
+import threading
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class ProgressTracker:
+    """Planned and completed work of a run, in WAV bytes and segments.
+
+    The pipelines add planned work as folders are scanned and planned, and completed
+    work as WAV files and segments finish (from any worker thread or process, see
+    ElocEngine.report_progress). snapshot() gives percentage, throughput and ETA.
+    on_change, if given, is called with the tracker at most every min_interval seconds.
+    """
+
+    def __init__(self, on_change=None, min_interval=1.0):
+        self.on_change = on_change
+        self.min_interval = min_interval
+        self.start_time = time.perf_counter()
+        self.planned_bytes = 0
+        self.done_bytes = 0
+        self.planned_segments = 0
+        self.done_segments = 0
+        self._last_change = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, event):
+        """Add the increments of a progress event, e.g. {'done_bytes': 1024, 'done_segments': 1}"""
+        with self._lock:
+            self.planned_bytes += event.get('planned_bytes', 0)
+            self.done_bytes += event.get('done_bytes', 0)
+            self.planned_segments += event.get('planned_segments', 0)
+            self.done_segments += event.get('done_segments', 0)
+            now = time.perf_counter()
+            notify = self.on_change is not None and now - self._last_change >= self.min_interval
+            if notify:
+                self._last_change = now
+        if notify:
+            self.on_change(self)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self.start_time
+            planned_bytes = self.planned_bytes
+            done_bytes = min(self.done_bytes, planned_bytes)
+            done_segments = self.done_segments
+            planned_segments = self.planned_segments
+
+        byte_rate = done_bytes / elapsed if elapsed > 0 else 0.0
+        eta = (planned_bytes - done_bytes) / byte_rate if byte_rate > 0 else None
+        return {
+            'elapsed': elapsed,
+            'percent': 100.0 * done_bytes / planned_bytes if planned_bytes else 0.0,
+            'planned_bytes': planned_bytes,
+            'done_bytes': done_bytes,
+            'planned_segments': planned_segments,
+            'done_segments': done_segments,
+            'mb_per_s': byte_rate / 1e6,
+            'segments_per_s': done_segments / elapsed if elapsed > 0 else 0.0,
+            'eta': eta,
+        }
+
+    def format(self):
+        """One line for the status bar or the console"""
+        progress = self.snapshot()
+        if not progress['planned_bytes']:
+            return ""
+        text = (f"{progress['percent']:.0f}% | {progress['mb_per_s']:.1f} MB/s | "
+                f"{progress['done_segments']}/{progress['planned_segments']} segments "
+                f"({progress['segments_per_s']:.0f}/s)")
+        if progress['eta'] is not None and progress['percent'] < 100:
+            text += f" | ETA {format_duration(progress['eta'])}"
+        return text
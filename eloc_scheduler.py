@@ -0,0 +1,142 @@
+import time
+import heapq
+import itertools
+import concurrent.futures
+
+# Pipeline stages in the order they run for a folder
+STAGE_SCAN = "scan"
+STAGE_PARSE = "parse"
+STAGE_ASSIGN = "assign"
+STAGE_TABLES = "tables"
+STAGE_EXTRACT = "extract"
+STAGE_ENCODE = "encode"
+STAGE_FINISH = "finish"
+
+# Earlier stages are dispatched first so every folder reaches extraction quickly, and
+# finishing a folder is cheap and releases its memory. Snippets that were read are
+# encoded before more are read, which bounds the audio waiting in memory
+STAGE_PRIORITY = {
+    STAGE_SCAN: 1,
+    STAGE_PARSE: 2,
+    STAGE_ASSIGN: 3,
+    STAGE_TABLES: 4,
+    STAGE_ENCODE: 5,
+    STAGE_EXTRACT: 6,
+    STAGE_FINISH: 0,
+}
+
+
+class Task:
+    """One unit of work of a pipeline: an ElocEngine method name and its arguments.
+
+    sequence orders tasks of the same stage, e.g. the n-th WAV file of every folder
+    gets sequence n, so extraction is interleaved across folders. resource names what
+    the task reads from (e.g. a storage device), None for CPU-bound tasks.
+    """
+
+    def __init__(self, pipeline, stage, method, args, sequence=0, key=None, resource=None):
+        self.pipeline = pipeline
+        self.stage = stage
+        self.method = method
+        self.args = args
+        self.sequence = sequence
+        self.key = key
+        self.resource = resource
+        self.ready_time = None  # When the task became ready, only recorded for traces
+
+
+class WorkScheduler:
+    """Run the task graphs of several pipelines on one shared pool of workers.
+
+    submit(task) hands a task to the pool and returns a future. At most max_workers
+    tasks are in flight; the rest wait in a priority queue, so the order in which
+    work starts is decided here rather than by the pool's FIFO. resource_limits caps
+    the tasks in flight per task resource; tasks without a resource, or with one that
+    is not in the dict, only count against max_workers.
+
+    A pipeline provides start() and task_done(task, result) / task_failed(task, error),
+    each returning the tasks that became ready, and a done attribute.
+    """
+
+    def __init__(self, submit, max_workers, should_stop=None, resource_limits=None, record_ready_time=False):
+        self.submit = submit
+        self.max_workers = max(1, max_workers)
+        self.should_stop = should_stop or (lambda: False)
+        self.resource_limits = resource_limits or {}
+        self.record_ready_time = record_ready_time
+        self.stopped = False
+        self._ready = {}  # Priority queue of ready tasks per resource
+        self._busy = {}  # Tasks in flight per resource
+        self._counter = itertools.count()
+
+    def push(self, tasks):
+        for task in tasks:
+            if self.record_ready_time:
+                task.ready_time = time.time()
+            priority = (STAGE_PRIORITY.get(task.stage, 9), task.sequence, next(self._counter))
+            heapq.heappush(self._ready.setdefault(task.resource, []), (priority, task))
+
+    def has_ready(self):
+        return any(self._ready.values())
+
+    def run(self, pipelines, on_pipeline_done=None):
+        """Run all pipelines to completion (or until should_stop() returns True)"""
+        for pipeline in pipelines:
+            self.push(pipeline.start())
+            self._check_done(pipeline, on_pipeline_done)
+
+        in_flight = {}
+        while self.has_ready() or in_flight:
+            if not self.stopped and self.should_stop():
+                # Queued work is dropped, tasks already running are allowed to finish
+                self.stopped = True
+                self._ready = {}
+
+            while len(in_flight) < self.max_workers:
+                task = self._next_task()
+                if task is None:
+                    break  # Nothing ready, or every resource with ready tasks is at its limit
+                self._busy[task.resource] = self._busy.get(task.resource, 0) + 1
+                in_flight[self.submit(task)] = task
+
+            if not in_flight:
+                continue
+
+            done, _ = concurrent.futures.wait(in_flight, timeout=0.2,
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                task = in_flight.pop(future)
+                self._busy[task.resource] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    new_tasks = task.pipeline.task_failed(task, e)
+                else:
+                    new_tasks = task.pipeline.task_done(task, result)
+                if not self.stopped:
+                    self.push(new_tasks)
+                self._check_done(task.pipeline, on_pipeline_done)
+
+        return pipelines
+
+    def _next_task(self):
+        """Pop the highest priority ready task whose resource has a free slot"""
+        best = None
+        for resource, ready in self._ready.items():
+            if not ready or not self._has_capacity(resource):
+                continue
+            if best is None or ready[0][0] < best[0][0]:
+                best = ready
+        if best is None:
+            return None
+        return heapq.heappop(best)[1]
+
+    def _has_capacity(self, resource):
+        limit = self.resource_limits.get(resource) if resource is not None else None
+        return limit is None or self._busy.get(resource, 0) < max(1, limit)
+
+    def _check_done(self, pipeline, on_pipeline_done):
+        if pipeline.done and not getattr(pipeline, '_reported', False):
+            pipeline._reported = True
+            if on_pipeline_done is not None:
+                on_pipeline_done(pipeline)
@@ -0,0 +1,72 @@
+import os
+import json
+import threading
+
+# Set to a file path to record a timeline trace of the GUI's processing runs
+TRACE_ENV_VAR = "ELOC_TRACE"
+
+# Thread ids of the synthetic per-folder tracks, far away from real thread ids
+FOLDER_TRACK_BASE = 1 << 48
+
+
+class TraceRecorder:
+    """Collect spans of pipeline tasks and write them in Chrome trace-event format.
+
+    The file can be opened in chrome://tracing or https://ui.perfetto.dev. Every task
+    appears on the track of the thread (and process) that ran it, every folder job on
+    a track of its own. Nothing is recorded unless a recorder is passed to
+    ElocEngine.run_folder_jobs.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.thread_names = {}
+        self.folder_tracks = {}
+        self._lock = threading.Lock()
+
+    def add_task(self, name, category, stats, args=None):
+        """Add the span of a task from the stats returned by ElocEngine.run_timed(traced=True)"""
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': stats['start'] * 1e6,
+            'dur': stats['seconds'] * 1e6,
+            'pid': stats['pid'],
+            'tid': stats['tid'],
+            'args': dict(args or {}, cpu_ms=round(stats['cpu_seconds'] * 1000, 3)),
+        }
+        with self._lock:
+            self.events.append(event)
+            self.thread_names[(stats['pid'], stats['tid'])] = stats['thread']
+
+    def add_folder(self, folder_name, start, end, args=None):
+        """Add the span of a whole folder job, from its first task to its last"""
+        with self._lock:
+            tid = self.folder_tracks.setdefault(folder_name, FOLDER_TRACK_BASE + len(self.folder_tracks))
+            self.events.append({
+                'name': folder_name,
+                'cat': 'folder',
+                'ph': 'X',
+                'ts': start * 1e6,
+                'dur': (end - start) * 1e6,
+                'pid': os.getpid(),
+                'tid': tid,
+                'args': args or {},
+            })
+            self.thread_names[(os.getpid(), tid)] = f"Folder {folder_name}"
+
+    def to_dict(self):
+        with self._lock:
+            metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                        for (pid, tid), name in self.thread_names.items()]
+            metadata += [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                          'args': {'name': 'ELOC main' if pid == os.getpid() else f"ELOC worker {pid}"}}
+                         for pid in sorted({pid for pid, _ in self.thread_names})]
+            return {'traceEvents': metadata + sorted(self.events, key=lambda event: event['ts']),
+                    'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        """Write the trace as JSON"""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
@@ -0,0 +1,96 @@
+import os
+import re
+import subprocess
+
+from wav_segments import WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, WavFormatError
+from snippet_codec import FLAC_COMPRESSION_LEVEL, SNIPPET_CODEC_FLAC
+
+# Snippets written by one ffmpeg process, keeps the command line short (Windows allows
+# 32767 characters) and lets a cancelled run stop between processes
+FFMPEG_SEGMENTS_PER_RUN = 32
+
+# ffmpeg encoder that keeps the sample format of a WAV file
+PCM_CODECS = {
+    (WAVE_FORMAT_PCM, 1): 'pcm_u8',
+    (WAVE_FORMAT_PCM, 2): 'pcm_s16le',
+    (WAVE_FORMAT_PCM, 3): 'pcm_s24le',
+    (WAVE_FORMAT_PCM, 4): 'pcm_s32le',
+    (WAVE_FORMAT_IEEE_FLOAT, 4): 'pcm_f32le',
+    (WAVE_FORMAT_IEEE_FLOAT, 8): 'pcm_f64le',
+}
+DEFAULT_PCM_CODEC = 'pcm_s16le'
+
+# No console window pops up for every ffmpeg process when run from the GUI on Windows
+CREATION_FLAGS = getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+
+
+def run_ffmpeg(command):
+    """Run ffmpeg and return its stderr, raises RuntimeError with the last error line if it fails"""
+    result = subprocess.run(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            creationflags=CREATION_FLAGS)
+    stderr = result.stderr.decode('utf-8', 'replace')
+    if result.returncode != 0:
+        lines = stderr.strip().splitlines()
+        raise RuntimeError(f"ffmpeg failed: {lines[-1] if lines else result.returncode}")
+    return stderr
+
+
+def probe_audio(ffmpeg_path, path):
+    """(duration in seconds, sample rate) of a file the RIFF header parser cannot read"""
+    # Without an output ffmpeg exits with an error after printing the stream information
+    result = subprocess.run([ffmpeg_path, '-hide_banner', '-i', path], stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, creationflags=CREATION_FLAGS)
+    stderr = result.stderr.decode('utf-8', 'replace')
+    duration = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', stderr)
+    sample_rate = re.search(r'Audio: .*?(\d+) Hz', stderr)
+    if duration is None or sample_rate is None:
+        raise WavFormatError(f"FFmpeg cannot read {os.path.basename(path)}")
+    hours, minutes, seconds = duration.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds), int(sample_rate.group(1))
+
+
+def segment_output_options(codec, wav_info=None, sample_rate=None, downmix=False, decimation=1):
+    """ffmpeg output options of one snippet, matching what SnippetEncoder writes"""
+    if codec == SNIPPET_CODEC_FLAC:
+        options = ['-c:a', 'flac', '-compression_level', str(FLAC_COMPRESSION_LEVEL), '-f', 'flac']
+    else:
+        pcm_codec = DEFAULT_PCM_CODEC
+        if wav_info is not None:
+            pcm_codec = PCM_CODECS.get((wav_info.format_tag, wav_info.block_align // wav_info.channels),
+                                       DEFAULT_PCM_CODEC)
+        options = ['-c:a', pcm_codec, '-f', 'wav']
+    if downmix:
+        options += ['-ac', '1']
+    if decimation > 1:
+        options += ['-ar', str(max(1, int(round(sample_rate / float(decimation)))))]
+    return options
+
+
+def extract_segments(ffmpeg_path, input_path, segments, output_options):
+    """Write several snippets of one recording with a single ffmpeg process.
+
+    segments is a list of (begin time, end time, output path). ffmpeg seeks to the first
+    snippet and decodes the recording once up to the end of the last one, every output
+    keeps its own time range (relative to the seek position). The snippets are written
+    under temporary names that replace the output paths once ffmpeg succeeded. Returns
+    the size of each snippet in bytes.
+    """
+    first_begin = min(begin_time for begin_time, _, _ in segments)
+    last_end = max(end_time for _, end_time, _ in segments)
+    command = [ffmpeg_path, '-hide_banner', '-loglevel', 'error',
+               '-ss', f"{first_begin:.6f}", '-t', f"{last_end - first_begin:.6f}", '-i', input_path]
+    for begin_time, end_time, output_path in segments:
+        command += ['-ss', f"{begin_time - first_begin:.6f}", '-t', f"{end_time - begin_time:.6f}", '-map', '0:a:0']
+        command += output_options + ['-y', output_path + ".part"]
+
+    try:
+        run_ffmpeg(command)
+        sizes = []
+        for _, _, output_path in segments:
+            os.replace(output_path + ".part", output_path)
+            sizes.append(os.path.getsize(output_path))
+    finally:
+        for _, _, output_path in segments:
+            if os.path.exists(output_path + ".part"):
+                os.remove(output_path + ".part")
+    return sizes
@@ -0,0 +1,76 @@
+import os
+import shutil
+
+# Size of the blocks used when copying output files, large blocks keep the copy sequential
+MIRROR_BLOCK_SIZE = 4 * 1024 * 1024
+
+# Files copied last, so a target only has a manifest once the outputs it lists are there
+LAST_FILES = ("eloc_manifest.json",)
+
+
+def list_files(base):
+    """Paths of all files below base relative to it, without temporary files"""
+    files = []
+    for root, _, names in os.walk(base):
+        for name in names:
+            if not name.endswith(('.part', '.tmp')):
+                files.append(os.path.relpath(os.path.join(root, name), base))
+    return files
+
+
+def copy_file(source_path, target_path):
+    """Copy one file through a temporary name and keep its modification time, returns the bytes copied"""
+    partial_path = target_path + ".part"
+    try:
+        with open(source_path, 'rb') as src, open(partial_path, 'wb') as out:
+            shutil.copyfileobj(src, out, MIRROR_BLOCK_SIZE)
+        shutil.copystat(source_path, partial_path)
+        os.replace(partial_path, target_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return os.path.getsize(target_path)
+
+
+def is_current(source_path, target_path):
+    """Check whether a copy has the size and modification time of its source"""
+    try:
+        source = os.stat(source_path)
+        target = os.stat(target_path)
+    except OSError:
+        return False
+    # FAT32 stores modification times in 2 second steps
+    return source.st_size == target.st_size and abs(source.st_mtime - target.st_mtime) <= 2
+
+
+def mirror_tree(source_base, target_base, stale_files=()):
+    """Copy the new and changed files of source_base to target_base in one pass.
+
+    Files are copied one after another in name order. Of the files that are not in
+    source_base only stale_files (paths relative to target_base, e.g. outputs an earlier
+    run wrote that are no longer current) are removed, any other file in target_base is
+    kept. Returns (files copied, bytes copied, files removed).
+    """
+    source_files = list_files(source_base)
+    source_set = set(source_files)
+    copied = 0
+    copied_bytes = 0
+    removed = 0
+
+    # Stale files first, so the target never holds more than needed while the new files are copied
+    for relative_path in sorted(stale_files):
+        target_path = os.path.join(target_base, relative_path)
+        if relative_path not in source_set and os.path.isfile(target_path):
+            os.remove(target_path)
+            removed += 1
+
+    for relative_path in sorted(source_files, key=lambda path: (os.path.basename(path) in LAST_FILES, path)):
+        source_path = os.path.join(source_base, relative_path)
+        target_path = os.path.join(target_base, relative_path)
+        if is_current(source_path, target_path):
+            continue
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        copied_bytes += copy_file(source_path, target_path)
+        copied += 1
+
+    return copied, copied_bytes, removed
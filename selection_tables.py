@@ -0,0 +1,105 @@
+import os
+
+# Header of the standard columns of a Raven selection table
+RAVEN_COLUMNS = ('Selection', 'View', 'Channel', 'Begin Time (s)', 'End Time (s)', 'Low Freq (Hz)', 'High Freq (Hz)')
+
+# View and channel of every selection, the snippets are single spectrogram views
+DEFAULT_VIEW = "Spectrogram 1"
+DEFAULT_CHANNEL = 1
+
+# Rows formatted at a time, keeps the text held in memory small for very large tables
+TABLE_BLOCK_ROWS = 10000
+
+
+def raven_columns(begin_times, end_times, low_freqs, high_freqs, first_selection=1,
+                  view=DEFAULT_VIEW, channel=DEFAULT_CHANNEL):
+    """Standard Raven columns as (name, values, format) for write_selection_table.
+
+    values is an array with one value per row or a single value used for every row.
+    """
+    import numpy as np
+
+    rows = len(begin_times)
+    return [
+        ('Selection', np.arange(first_selection, first_selection + rows), '%d'),
+        ('View', view, '%s'),
+        ('Channel', channel, '%d'),
+        ('Begin Time (s)', begin_times, '%.2f'),
+        ('End Time (s)', end_times, '%.2f'),
+        ('Low Freq (Hz)', low_freqs, '%.2f'),
+        ('High Freq (Hz)', high_freqs, '%.2f'),
+    ]
+
+
+def format_rows(columns, start, stop):
+    """Format rows start..stop of the columns as tab separated lines in one call"""
+    import numpy as np
+
+    row_format = []
+    values = []
+    for name, column_values, value_format in columns:
+        if np.ndim(column_values) == 0:
+            # The same in every row, so it goes straight into the row format
+            row_format.append((value_format % column_values).replace('%', '%%'))
+        else:
+            row_format.append(value_format)
+            values.append(column_values[start:stop])
+    rows = stop - start
+    line_format = "\t".join(row_format) + "\n"
+    if not values:
+        return (line_format % ()) * rows
+
+    if all(np.asarray(column).dtype.kind in 'iuf' for column in values):
+        flat = np.column_stack([np.asarray(column, dtype=np.float64) for column in values]).ravel().tolist()
+    else:
+        table = np.empty((rows, len(values)), dtype=object)
+        for index, column in enumerate(values):
+            table[:, index] = column
+        flat = table.ravel().tolist()
+    return (line_format * rows) % tuple(flat)
+
+
+def write_selection_table(path, columns):
+    """Write a selection table with the given (name, values, format) columns, see raven_columns.
+
+    The rows are formatted in blocks and streamed to a temporary file that replaces
+    path once it is complete, so an interrupted run never leaves a partial table.
+    Returns the number of characters written.
+    """
+    import numpy as np
+
+    rows = max([len(values) for _, values, _ in columns if np.ndim(values) > 0], default=0)
+    partial_path = path + ".part"
+    written = 0
+    try:
+        with open(partial_path, 'w') as f:
+            header = "\t".join(name for name, _, _ in columns) + "\n"
+            f.write(header)
+            written += len(header)
+            for start in range(0, rows, TABLE_BLOCK_ROWS):
+                block = format_rows(columns, start, min(rows, start + TABLE_BLOCK_ROWS))
+                f.write(block)
+                written += len(block)
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return written
+
+
+def write_listfile(path, audio_paths):
+    """Write a Raven listfile, one audio file per line, that opens the files as one sequence.
+
+    Written through a temporary file like write_selection_table. Returns the number of
+    characters written.
+    """
+    content = "".join(audio_path + "\n" for audio_path in audio_paths)
+    partial_path = path + ".part"
+    try:
+        with open(partial_path, 'w') as f:
+            f.write(content)
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return len(content)
@@ -11,6 +11,17 @@ def download_progress(count, block_size, total_size):
     sys.stdout.write(f"\rDownloading FFmpeg: {percent}% [{count * block_size} / {total_size} bytes]")
     sys.stdout.flush()
 
+def find_ffmpeg():
+    """Path of the FFmpeg executable in the PATH or in this directory, None if it is not installed"""
+    path = shutil.which("ffmpeg")
+    if path:
+        return path
+    for directory in (os.getcwd(), os.path.dirname(os.path.abspath(__file__))):
+        local_path = os.path.join(directory, "ffmpeg.exe")
+        if os.path.exists(local_path):
+            return local_path
+    return None
+
 def main():
     print("FFmpeg Setup Utility for ELOC Audio Processor")
     print("=============================================")
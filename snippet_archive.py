@@ -0,0 +1,163 @@
+import os
+import struct
+
+from wav_segments import WavFormatError, read_wav_header, wav_header_bytes
+
+# Name of the archive holding the snippets of one recording
+ARCHIVE_SUFFIX = "_snippets.wav"
+
+# RIFF chunk with the snippet index: version and count, then one entry per snippet with the
+# segment id, first frame and number of frames in the data chunk, and begin and end time in the recording
+INDEX_CHUNK_ID = b'elix'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<II')
+INDEX_ENTRY = struct.Struct('<IQIdd')
+
+# Cue point of a snippet start: id, position, chunk id, chunk start, block start, sample offset
+CUE_POINT = struct.Struct('<II4sIII')
+
+
+def pcm_fmt_chunk(channels, sample_rate, sample_width):
+    """fmt chunk body of uncompressed PCM audio, for snippets decoded by pydub"""
+    block_align = channels * sample_width
+    return struct.pack('<HHIIHH', 1, channels, sample_rate, sample_rate * block_align, block_align, sample_width * 8)
+
+
+class SnippetArchiveWriter:
+    """Write all snippets of a recording back to back into one WAV file with an index.
+
+    The data chunk holds the snippets in the order they are added, so the archive plays
+    as a review reel of every detection. A 'cue ' chunk with labels marks the start of
+    each snippet for audio editors, and an 'elix' chunk maps segment ids to frame
+    ranges for SnippetArchive. The sizes in the header are filled in by close().
+    """
+
+    def __init__(self, path, fmt_chunk):
+        self.path = path
+        self.fmt_chunk = fmt_chunk
+        self.block_align = struct.unpack('<H', fmt_chunk[12:14])[0]
+        self.entries = []
+        self.frames = 0
+        self.f = open(path, 'wb')
+        fmt_padding = b'\x00' if len(fmt_chunk) % 2 else b''
+        self.f.write(struct.pack('<4sI4s', b'RIFF', 0, b'WAVE')
+                     + struct.pack('<4sI', b'fmt ', len(fmt_chunk)) + fmt_chunk + fmt_padding
+                     + struct.pack('<4sI', b'data', 0))
+        self.data_offset = self.f.tell()
+
+    def add_data(self, segment_id, begin_time, end_time, data):
+        """Append the raw sample data of a snippet, returns the number of frames"""
+        num_frames = len(data) // self.block_align
+        self.f.write(data[:num_frames * self.block_align])
+        self.add_entry(segment_id, num_frames, begin_time, end_time)
+        return num_frames
+
+    def add_entry(self, segment_id, num_frames, begin_time, end_time):
+        self.entries.append((segment_id, self.frames, num_frames, begin_time, end_time))
+        self.frames += num_frames
+
+    def close(self):
+        """Write the cue points and the index and fill in the chunk sizes, returns the file size"""
+        data_size = self.frames * self.block_align
+        if data_size % 2:
+            self.f.write(b'\x00')
+
+        cue = struct.pack('<I', len(self.entries)) + b''.join(
+            CUE_POINT.pack(index, first_frame, b'data', 0, 0, first_frame)
+            for index, (_, first_frame, _, _, _) in enumerate(self.entries, 1))
+        self.write_chunk(b'cue ', cue)
+
+        labels = b''
+        for index, (segment_id, _, _, begin_time, end_time) in enumerate(self.entries, 1):
+            text = f"Segment {segment_id:03d} {begin_time:.2f}s-{end_time:.2f}s".encode('ascii') + b'\x00'
+            labels += struct.pack('<4sII', b'labl', 4 + len(text), index) + text + (b'\x00' if len(text) % 2 else b'')
+        self.write_chunk(b'LIST', b'adtl' + labels)
+
+        index = INDEX_HEADER.pack(INDEX_VERSION, len(self.entries)) + b''.join(
+            INDEX_ENTRY.pack(*entry) for entry in self.entries)
+        self.write_chunk(INDEX_CHUNK_ID, index)
+
+        file_size = self.f.tell()
+        self.f.seek(4)
+        self.f.write(struct.pack('<I', file_size - 8))
+        self.f.seek(self.data_offset - 4)
+        self.f.write(struct.pack('<I', data_size))
+        self.f.close()
+        return file_size
+
+    def write_chunk(self, chunk_id, body):
+        self.f.write(struct.pack('<4sI', chunk_id, len(body)) + body + (b'\x00' if len(body) % 2 else b''))
+
+    def abort(self):
+        """Close the file without finishing it, the caller removes it"""
+        self.f.close()
+
+
+class SnippetArchive:
+    """Read single snippets from an archive written by SnippetArchiveWriter without unpacking it.
+
+    with SnippetArchive(path) as archive:
+        for segment_id in archive.segment_ids():
+            archive.export(segment_id, f"snippet_{segment_id}.wav")
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.info = read_wav_header(path)
+        self.entries = {}
+        self.f = open(path, 'rb')
+        try:
+            self.read_index()
+        except Exception:
+            self.f.close()
+            raise
+
+    def read_index(self):
+        """Find the index chunk after the sample data"""
+        file_size = os.path.getsize(self.path)
+        position = self.info.data_offset + self.info.data_size + (self.info.data_size % 2)
+        while position + 8 <= file_size:
+            self.f.seek(position)
+            chunk_id, chunk_size = struct.unpack('<4sI', self.f.read(8))
+            if chunk_id == INDEX_CHUNK_ID:
+                body = self.f.read(chunk_size)
+                version, count = INDEX_HEADER.unpack_from(body)
+                if version != INDEX_VERSION:
+                    raise WavFormatError(f"Unsupported snippet index version {version} in {os.path.basename(self.path)}")
+                for entry_index in range(count):
+                    segment_id, first_frame, num_frames, begin_time, end_time = INDEX_ENTRY.unpack_from(
+                        body, INDEX_HEADER.size + entry_index * INDEX_ENTRY.size)
+                    self.entries[segment_id] = {'first_frame': first_frame, 'frames': num_frames,
+                                                'begin_time': begin_time, 'end_time': end_time}
+                return
+            position += 8 + chunk_size + (chunk_size % 2)
+        raise WavFormatError(f"No snippet index found in {os.path.basename(self.path)}")
+
+    def segment_ids(self):
+        """Segment ids in the order of the reel"""
+        return sorted(self.entries, key=lambda segment_id: self.entries[segment_id]['first_frame'])
+
+    def read(self, segment_id):
+        """Raw sample data of one snippet"""
+        entry = self.entries[segment_id]
+        self.f.seek(self.info.data_offset + entry['first_frame'] * self.info.block_align)
+        return self.f.read(entry['frames'] * self.info.block_align)
+
+    def export(self, segment_id, output_path):
+        """Write one snippet as a standalone WAV file, returns the number of frames"""
+        data = self.read(segment_id)
+        with open(output_path, 'wb') as out:
+            out.write(wav_header_bytes(self.info, len(data)))
+            out.write(data)
+            if len(data) % 2:
+                out.write(b'\x00')
+        return len(data) // self.info.block_align
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,193 @@
+import os
+import time
+import struct
+import subprocess
+
+from wav_segments import WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, WavFormatError, riff_header
+
+# Codecs of the exported snippets, Raven opens both
+SNIPPET_CODEC_WAV = "wav"
+SNIPPET_CODEC_FLAC = "flac"
+SNIPPET_CODECS = (SNIPPET_CODEC_WAV, SNIPPET_CODEC_FLAC)
+CODEC_EXTENSIONS = {SNIPPET_CODEC_WAV: ".wav", SNIPPET_CODEC_FLAC: ".flac"}
+
+# Decimation factors offered by the GUI and the command line, 4 turns a 16 kHz recording
+# into 4 kHz snippets that still hold everything below 1.8 kHz (elephant rumbles are below 500 Hz)
+DECIMATION_FACTORS = (1, 2, 4, 8)
+
+# Anti-alias filter of the decimation: taps per unit of the factor, and the passband edge
+# as a fraction of the new Nyquist frequency
+FILTER_TAPS_PER_FACTOR = 16
+FILTER_PASSBAND = 0.9
+
+# ffmpeg's default FLAC level, higher levels are much slower for a few percent
+FLAC_COMPRESSION_LEVEL = 5
+
+# FLAC holds integer samples of up to 24 bits, other formats are written as WAV
+FLAC_MAX_SAMPLE_WIDTH = 3
+
+# Smallest snippet holding any audio: a 44 byte WAV header, or the 42 byte header of a FLAC stream
+MIN_ENCODED_BYTES = 44
+
+
+def parse_fmt_chunk(fmt_chunk):
+    """(format tag, channels, sample rate, bytes per sample) of a fmt chunk body"""
+    format_tag, channels, sample_rate, _, block_align, _ = struct.unpack('<HHIIHH', fmt_chunk[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+        format_tag = struct.unpack('<H', fmt_chunk[24:26])[0]
+    return format_tag, channels, sample_rate, block_align // channels
+
+
+def make_fmt_chunk(format_tag, channels, sample_rate, sample_width):
+    """fmt chunk body of uncompressed PCM or float audio"""
+    block_align = channels * sample_width
+    return struct.pack('<HHIIHH', format_tag, channels, sample_rate, sample_rate * block_align, block_align,
+                       sample_width * 8)
+
+
+def decode_samples(data, format_tag, channels, sample_width):
+    """Sample data as a float64 array of shape (frames, channels) in the units of the format"""
+    import numpy as np
+
+    frames = len(data) // (channels * sample_width)
+    data = data[:frames * channels * sample_width]
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        samples = np.frombuffer(data, dtype='<f4' if sample_width == 4 else '<f8').astype(np.float64)
+    elif sample_width == 1:
+        samples = np.frombuffer(data, dtype=np.uint8).astype(np.float64) - 128
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        samples = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples).astype(np.float64)
+    else:
+        samples = np.frombuffer(data, dtype='<i2' if sample_width == 2 else '<i4').astype(np.float64)
+    return samples.reshape(frames, channels)
+
+
+def encode_samples(samples, format_tag, sample_width):
+    """Interleaved sample data of a (frames, channels) array, rounded and clipped for integer formats"""
+    import numpy as np
+
+    if format_tag == WAVE_FORMAT_IEEE_FLOAT:
+        return samples.astype('<f4' if sample_width == 4 else '<f8').tobytes()
+    limit = 1 << (8 * sample_width - 1)
+    values = np.clip(np.rint(samples), -limit, limit - 1)
+    if sample_width == 1:
+        return (values + 128).astype(np.uint8).tobytes()
+    if sample_width == 3:
+        return values.astype('<i4').view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    return values.astype('<i2' if sample_width == 2 else '<i4').tobytes()
+
+
+def anti_alias_filter(factor):
+    """Windowed-sinc low-pass filter for decimation by factor"""
+    import numpy as np
+
+    taps = FILTER_TAPS_PER_FACTOR * factor + 1
+    cutoff = FILTER_PASSBAND * 0.5 / factor  # In cycles per input sample
+    n = np.arange(taps) - (taps - 1) / 2.0
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def decimate(samples, factor):
+    """Low-pass filter and keep every factor-th frame, the first frame stays aligned with the snippet start"""
+    import numpy as np
+
+    kernel = anti_alias_filter(factor)
+    return np.column_stack([np.convolve(samples[:, channel], kernel, mode='same')[::factor]
+                            for channel in range(samples.shape[1])])
+
+
+def encode_flac(ffmpeg_path, wav_data, output_path):
+    """Encode an in-memory WAV file to FLAC with one ffmpeg process"""
+    command = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-f', 'wav', '-i', 'pipe:0',
+               '-c:a', 'flac', '-compression_level', str(FLAC_COMPRESSION_LEVEL), '-f', 'flac', '-y', output_path]
+    # No console window pops up for every snippet when run from the GUI on Windows
+    result = subprocess.run(command, input=wav_data, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(f"FLAC encoding failed: {message[-1] if message else result.returncode}")
+
+
+class SnippetEncoder:
+    """Convert and encode the snippets of one recording.
+
+    Snippets can be downmixed to mono and decimated by an integer factor, then written
+    as WAV or as lossless FLAC (through ffmpeg). The source format is given as its fmt
+    chunk body. When FLAC is not possible (no ffmpeg, float or 32 bit samples) the
+    snippets are written as WAV and notice says why. write() is safe to call from
+    several threads, the ffmpeg processes and the numpy filters run in parallel.
+    """
+
+    def __init__(self, fmt_chunk, codec=SNIPPET_CODEC_WAV, downmix=False, decimation=1, ffmpeg_path=None):
+        self.format_tag, self.channels, self.sample_rate, self.sample_width = parse_fmt_chunk(fmt_chunk)
+        self.downmix = downmix and self.channels > 1
+        self.decimation = max(1, int(decimation))
+        self.notice = None
+
+        if self.converts:
+            supported = (self.format_tag == WAVE_FORMAT_PCM and self.sample_width in (1, 2, 3, 4)
+                         or self.format_tag == WAVE_FORMAT_IEEE_FLOAT and self.sample_width in (4, 8))
+            if not supported:
+                raise WavFormatError(f"Cannot convert {self.sample_width * 8} bit samples of format tag "
+                                     f"0x{self.format_tag:04X}")
+            channels = 1 if self.downmix else self.channels
+            sample_rate = max(1, int(round(self.sample_rate / float(self.decimation))))
+            self.fmt_chunk = make_fmt_chunk(self.format_tag, channels, sample_rate, self.sample_width)
+        else:
+            self.fmt_chunk = fmt_chunk
+
+        self.codec = codec
+        self.ffmpeg_path = ffmpeg_path
+        if codec == SNIPPET_CODEC_FLAC:
+            if self.format_tag != WAVE_FORMAT_PCM or self.sample_width > FLAC_MAX_SAMPLE_WIDTH:
+                kind = 'float' if self.format_tag == WAVE_FORMAT_IEEE_FLOAT else 'integer'
+                self.codec = SNIPPET_CODEC_WAV
+                self.notice = f"FLAC cannot hold {self.sample_width * 8} bit {kind} samples"
+            elif ffmpeg_path is None:
+                self.codec = SNIPPET_CODEC_WAV
+                self.notice = "FFmpeg was not found (see setup_ffmpeg.py)"
+
+    @property
+    def converts(self):
+        """Whether the sample data is changed, rather than only packed into another container"""
+        return self.downmix or self.decimation > 1
+
+    @property
+    def extension(self):
+        return CODEC_EXTENSIONS[self.codec]
+
+    def convert(self, data):
+        """Downmix and decimate the raw sample data of a snippet, returns data in the format of fmt_chunk"""
+        if not self.converts:
+            return data
+        samples = decode_samples(data, self.format_tag, self.channels, self.sample_width)
+        if self.downmix:
+            samples = samples.mean(axis=1, keepdims=True)
+        if self.decimation > 1 and len(samples):
+            samples = decimate(samples, self.decimation)
+        return encode_samples(samples, self.format_tag, self.sample_width)
+
+    def write(self, data, output_path):
+        """Convert and encode one snippet into output_path.
+
+        Written under a temporary name like single WAV snippets. Returns (bytes written,
+        seconds spent converting and encoding).
+        """
+        start_time = time.perf_counter()
+        data = self.convert(data)
+        wav_data = riff_header(self.fmt_chunk, len(data)) + data + (b'\x00' if len(data) % 2 else b'')
+        partial_path = output_path + ".part"
+        try:
+            if self.codec == SNIPPET_CODEC_FLAC:
+                encode_flac(self.ffmpeg_path, wav_data, partial_path)
+            else:
+                with open(partial_path, 'wb') as out:
+                    out.write(wav_data)
+            os.replace(partial_path, output_path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return os.path.getsize(output_path), time.perf_counter() - start_time
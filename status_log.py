@@ -0,0 +1,94 @@
+import queue
+import threading
+from datetime import datetime
+
+
+class StatusLog:
+    """Append status messages to a log file from a background thread.
+
+    write() only puts the message on a queue, so worker threads never wait for the
+    disk. The writer thread keeps the file open and writes whatever has queued up in
+    one batch, flushing at most every flush_interval seconds or when flush() is called.
+    """
+
+    def __init__(self, log_file_path, flush_interval=0.5, batch_size=1000):
+        self.log_file_path = log_file_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="StatusLogWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        """Queue a message, timestamped now"""
+        if self._closed:
+            return
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self._queue.put(f"[{timestamp}] {message}\n")
+
+    def flush(self, timeout=5.0):
+        """Wait until every message queued so far is written to disk"""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Flush all queued messages and stop the writer thread"""
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            log_file = open(self.log_file_path, 'a')
+        except OSError as e:
+            print(f"Error opening log file: {str(e)}")
+            log_file = None
+
+        last_flush = datetime.now()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = False  # Nothing new, but make sure pending lines reach the disk
+
+            # Collect everything that is already queued into one batch
+            lines = []
+            flush_events = []
+            while True:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    flush_events.append(item)
+                elif item:
+                    lines.append(item)
+                if not running or len(lines) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if log_file is not None:
+                try:
+                    if lines:
+                        log_file.write("".join(lines))
+                    now = datetime.now()
+                    if flush_events or not running or (now - last_flush).total_seconds() >= self.flush_interval:
+                        log_file.flush()
+                        last_flush = now
+                except OSError as e:
+                    print(f"Error writing to log file: {str(e)}")
+
+            for event in flush_events:
+                event.set()
+
+        if log_file is not None:
+            log_file.close()
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from eloc_engine import ElocEngine, create_output_dirs, make_folder_job
+from recordings import SESSION_EPOCH_MS, write_recording, write_results
+
+
+@pytest.fixture
+def deployment(tmp_path):
+    """Deployment folder with two 2 minute recordings and detections in both"""
+    folder = tmp_path / f"test2_{SESSION_EPOCH_MS}"
+    folder.mkdir()
+    for start in ("00-00-00", "00-02-00"):
+        write_recording(str(folder / f"test2_{SESSION_EPOCH_MS}_2025-03-10_{start}.wav"))
+    write_results(str(folder / "EI-results-ID-000000-DEPLOY-VER-1.csv"),
+                  ["00:00:10", "00:00:40", "00:01:30", "00:02:20", "00:03:00"])
+    return str(folder)
+
+
+def process_folder(folder_path, staging=None, keep_staging=True, **settings):
+    """Process one folder like the CLI does, returns (pipeline, status messages)"""
+    messages = []
+    engine = ElocEngine(status_callback=messages.append, **settings)
+    selection_tables_dir, audio_segments_dir = create_output_dirs(folder_path, staging)
+    mirror_to = os.path.join(folder_path, "output") if staging else None
+    job = make_folder_job(folder_path, selection_tables_dir, audio_segments_dir, -2, 5,
+                          engine.create_tables, engine.extract_audio, engine.table_layout, engine.snippet_format,
+                          mirror_to, keep_staging)
+    pipelines = engine.run_folder_jobs([job], 1)
+    return pipelines[0], messages
+
+
+@pytest.fixture
+def run_folder():
+    return process_folder
@@ -0,0 +1,23 @@
+import struct
+
+# Recordings written by the tests: 16 bit mono at a low sample rate keeps the files small
+SAMPLE_RATE = 1000
+RECORDING_SECONDS = 120
+SESSION_EPOCH_MS = 1741564800000
+
+
+def write_recording(path, seconds=RECORDING_SECONDS, sample_rate=SAMPLE_RATE):
+    """Silent 16 bit mono WAV file"""
+    data_size = seconds * sample_rate * 2
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sI4s4sIHHIIHH4sI', b'RIFF', 36 + data_size, b'WAVE', b'fmt ', 16, 1, 1,
+                            sample_rate, sample_rate * 2, 2, 16, b'data', data_size))
+        f.write(b'\x00' * data_size)
+
+
+def write_results(path, times, sound_type="trumpet"):
+    """EI-results CSV file in the layout of the ELOC firmware, times are 'HH:MM:SS' on 10 March 2025"""
+    with open(path, 'w', newline='') as f:
+        f.write("\n\nHour:Min:Sec Day, Month Date Year ,background ,%s\n" % sound_type)
+        for detection_time in times:
+            f.write(f"{detection_time} Mon, Mar 10 2025 ,0.10,0.90\n")
@@ -0,0 +1,82 @@
+import os
+import calendar
+from datetime import datetime
+
+import pandas as pd
+
+from eloc_engine import ElocEngine
+
+FILENAMES = [
+    "A_1753309302985_2025-07-26_12-18-15.wav",
+    "A_1753309302985_2025-07-26_13-18-15.wav",
+]
+
+
+def make_folder(engine, tmp_path, csv_files):
+    wav_files = []
+    for name in FILENAMES:
+        path = tmp_path / name
+        path.write_bytes(b'')
+        wav_files.append(str(path))
+    wav_paths, wav_starts, wav_ends = engine.build_wav_index(wav_files)
+    return {'wav_paths': wav_paths, 'wav_starts': wav_starts, 'wav_ends': wav_ends, 'csv_files': csv_files}
+
+
+def detection_table(sound_column, offsets, score):
+    start = calendar.timegm(datetime(2025, 7, 26, 12, 18, 15).timetuple())
+    return pd.DataFrame({'Detection_Seconds': [float(start + offset) for offset in offsets],
+                         'background': [0.1] * len(offsets),
+                         sound_column: [score] * len(offsets)})
+
+
+def test_wav_key_of_uppercase_extension(tmp_path):
+    engine = ElocEngine(status_callback=lambda message: None)
+    path = tmp_path / FILENAMES[0].replace('.wav', '.WAV')
+    path.write_bytes(b'')
+    wav_paths, wav_starts, wav_ends = engine.build_wav_index([str(path)])
+    folder = {'wav_paths': wav_paths, 'wav_starts': wav_starts, 'wav_ends': wav_ends, 'csv_files': ['first.csv']}
+    detections_by_wav, _ = engine.assign_folder_detections(
+        folder, [('first.csv', detection_table('elephant', [100], 0.9), 'elephant')])
+    assert list(detections_by_wav) == [os.path.splitext(FILENAMES[0])[0]]
+
+
+def test_sound_types_of_one_recording_keep_their_own_scores(tmp_path):
+    engine = ElocEngine(status_callback=lambda message: None)
+    folder = make_folder(engine, tmp_path, ['first.csv', 'second.csv'])
+    tables = [
+        ('first.csv', detection_table('elephant', [100, 300], 0.9), 'elephant'),
+        ('second.csv', detection_table('gunshot', [200, 3700], 0.5), 'gunshot'),
+    ]
+    detections_by_wav, csv_errors = engine.assign_folder_detections(folder, tables)
+
+    assert not csv_errors
+    first = detections_by_wav[os.path.splitext(FILENAMES[0])[0]]
+    assert first['sound_columns'] == ['elephant', 'gunshot']
+    assert list(first['detections']['Detection_Seconds'] - first['wav_start_seconds']) == [100, 200, 300]
+    assert first['detections']['elephant'].isna().tolist() == [False, True, False]
+    assert first['detections']['gunshot'].isna().tolist() == [True, False, True]
+    scores, sound_types = engine.detection_scores(first)
+    assert list(scores) == [0.9, 0.5, 0.9]
+    assert list(sound_types) == ['elephant', 'gunshot', 'elephant']
+
+    second = detections_by_wav[os.path.splitext(FILENAMES[1])[0]]
+    assert second['sound_columns'] == ['gunshot']
+    assert len(second['detections']) == 1
+
+
+def test_later_csv_file_of_the_same_sound_type_replaces_the_earlier_one(tmp_path):
+    engine = ElocEngine(status_callback=lambda message: None)
+    folder = make_folder(engine, tmp_path, ['VER-1.csv', 'VER-2.csv'])
+    tables = [
+        ('VER-1.csv', detection_table('elephant', [100, 300, 3700], 0.9), 'elephant'),
+        ('VER-2.csv', detection_table('elephant', [110, 310], 0.7), 'elephant'),
+    ]
+    detections_by_wav, _ = engine.assign_folder_detections(folder, tables)
+
+    first = detections_by_wav[os.path.splitext(FILENAMES[0])[0]]
+    assert first['sound_columns'] == ['elephant']
+    assert list(first['detections']['Detection_Seconds'] - first['wav_start_seconds']) == [110, 310]
+    assert list(engine.detection_scores(first)[0]) == [0.7, 0.7]
+    # Recordings the later file does not cover keep the detections of the earlier one
+    second = detections_by_wav[os.path.splitext(FILENAMES[1])[0]]
+    assert list(second['detections']['elephant']) == [0.9]
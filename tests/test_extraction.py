@@ -0,0 +1,75 @@
+import os
+
+import eloc_engine
+from eloc_engine import BACKEND_DIRECT, ElocEngine
+from eloc_scheduler import STAGE_ENCODE, STAGE_EXTRACT
+from recordings import RECORDING_SECONDS, SAMPLE_RATE, write_recording
+
+BYTES_PER_SECOND = SAMPLE_RATE * 2
+
+
+def segments_at(*begin_times, length=5):
+    return [{'segment_id': index, 'begin_time': float(begin_time), 'end_time': float(begin_time + length),
+             'selection_table': None} for index, begin_time in enumerate(begin_times, 1)]
+
+
+def extract(wav_path, segments, output_dir):
+    engine = ElocEngine(status_callback=lambda message: None, extraction_backend=BACKEND_DIRECT)
+    return engine.run_timed('process_wav_file', (wav_path, segments, output_dir, 1, 1))
+
+
+def test_overlapping_segments_are_read_once(tmp_path):
+    wav_path = str(tmp_path / "recording.wav")
+    write_recording(wav_path)
+    (_, written, segment_files), stats = extract(wav_path, segments_at(10, 12, 14, 60), str(tmp_path))
+    assert written == 4 and len(segment_files) == 4
+    assert stats['bytes_read'] == (9 + 5) * BYTES_PER_SECOND
+    assert stats['bytes_read_saved'] == (4 * 5 - 14) * BYTES_PER_SECOND
+
+
+def test_existing_snippets_are_not_read_again(tmp_path):
+    wav_path = str(tmp_path / "recording.wav")
+    write_recording(wav_path)
+    segments = segments_at(10, 12, 14, 60)
+    (_, _, segment_files), _ = extract(wav_path, segments, str(tmp_path))
+
+    # Only the first snippet is missing, the reader must not span the two existing ones that overlap it
+    os.remove(str(tmp_path / segment_files[0]))
+    (_, written, rerun_files), stats = extract(wav_path, segments, str(tmp_path))
+    assert written == 1
+    assert sorted(rerun_files) == sorted(segment_files)
+    assert stats['bytes_read'] == 5 * BYTES_PER_SECOND
+    assert stats.get('bytes_read_saved', 0) == 0
+
+
+def test_segments_outside_the_recording_are_skipped(tmp_path):
+    wav_path = str(tmp_path / "recording.wav")
+    write_recording(wav_path)
+    (_, written, segment_files), stats = extract(wav_path, segments_at(-3, RECORDING_SECONDS + 1, RECORDING_SECONDS - 2),
+                                                 str(tmp_path))
+    assert written == 1
+    assert segment_files[0].endswith(f"_{RECORDING_SECONDS - 2:.2f}s-{RECORDING_SECONDS:.2f}s.wav")
+    assert stats['bytes_read'] == 2 * BYTES_PER_SECOND
+
+
+def test_snippets_are_encoded_without_holding_the_drive(deployment, run_folder, monkeypatch):
+    monkeypatch.setattr(eloc_engine, 'ENCODE_BATCH_BYTES', 1)  # Every snippet is a batch of its own
+    tasks = []
+    scheduler_class = eloc_engine.WorkScheduler
+
+    def recording_scheduler(submit, *args, **kwargs):
+        def submit_task(task):
+            tasks.append(task)
+            return submit(task)
+        return scheduler_class(submit_task, *args, **kwargs)
+
+    monkeypatch.setattr(eloc_engine, 'WorkScheduler', recording_scheduler)
+    pipeline, _ = run_folder(deployment, decimation=2)
+    assert pipeline.error is None and not pipeline.failed_wavs
+
+    reads = [task for task in tasks if task.stage == STAGE_EXTRACT]
+    encodes = [task for task in tasks if task.stage == STAGE_ENCODE]
+    assert len(reads) == 5 and all(task.resource == pipeline.device for task in reads)
+    assert len(encodes) == 5 and all(task.resource is None for task in encodes)
+    assert sorted(len(segment_files) for segment_files in pipeline.extracted.values()) == [2, 3]
+    assert len(os.listdir(os.path.join(deployment, "output", "Audio_Segments"))) == 5
@@ -0,0 +1,54 @@
+import os
+
+import eloc_engine
+
+
+def skipped(messages):
+    return any(message.startswith("No new or changed recordings") for message in messages)
+
+
+def outputs(folder_path):
+    return sorted(os.listdir(os.path.join(folder_path, "output", "Raven_Selection_Tables"))), \
+        sorted(os.listdir(os.path.join(folder_path, "output", "Audio_Segments")))
+
+
+def test_unchanged_folder_is_skipped(deployment, run_folder):
+    pipeline, messages = run_folder(deployment)
+    assert pipeline.error is None and not skipped(messages)
+    tables, segments = outputs(deployment)
+    assert len(tables) == 2 and len(segments) == 5
+
+    _, messages = run_folder(deployment)
+    assert skipped(messages)
+    assert outputs(deployment) == (tables, segments)
+
+
+def test_deleted_snippet_is_extracted_again(deployment, run_folder):
+    run_folder(deployment)
+    tables, segments = outputs(deployment)
+    os.remove(os.path.join(deployment, "output", "Audio_Segments", segments[0]))
+
+    _, messages = run_folder(deployment)
+    assert not skipped(messages)
+    assert outputs(deployment) == (tables, segments)
+
+
+def test_recording_whose_table_failed_is_retried(deployment, run_folder, monkeypatch):
+    write_selection_table = eloc_engine.write_selection_table
+
+    def fail_second_recording(path, columns):
+        if "00-02-00" in os.path.basename(path):
+            raise OSError("disk full")
+        return write_selection_table(path, columns)
+
+    monkeypatch.setattr(eloc_engine, "write_selection_table", fail_second_recording)
+    run_folder(deployment)
+    tables, _ = outputs(deployment)
+    assert len(tables) == 1
+
+    monkeypatch.setattr(eloc_engine, "write_selection_table", write_selection_table)
+    _, messages = run_folder(deployment)
+    assert not skipped(messages)
+    assert any(message.startswith("Skipped 1 unchanged recordings") for message in messages)
+    tables, segments = outputs(deployment)
+    assert len(tables) == 2 and len(segments) == 5
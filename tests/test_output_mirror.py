@@ -0,0 +1,65 @@
+import os
+
+from recordings import SESSION_EPOCH_MS, write_recording, write_results
+
+CSV_NAME = "EI-results-ID-000000-DEPLOY-VER-1.csv"
+
+
+def card_files(folder_path, subdir):
+    return sorted(os.listdir(os.path.join(folder_path, "output", subdir)))
+
+
+def staged_run(run_folder, folder_path, tmp_path, keep_staging):
+    return run_folder(folder_path, staging=str(tmp_path / "staging"), keep_staging=keep_staging)
+
+
+def test_files_not_written_by_the_tool_are_kept(deployment, run_folder, tmp_path):
+    notes_path = os.path.join(deployment, "output", "Audio_Segments", "field_notes.txt")
+    os.makedirs(os.path.dirname(notes_path))
+    with open(notes_path, 'w') as f:
+        f.write("battery swapped")
+
+    pipeline, _ = staged_run(run_folder, deployment, tmp_path, keep_staging=True)
+    assert pipeline.error is None
+    assert os.path.exists(notes_path)
+    assert len(card_files(deployment, "Audio_Segments")) == 6
+
+
+def test_snippets_of_changed_detections_are_removed(deployment, run_folder, tmp_path):
+    staged_run(run_folder, deployment, tmp_path, keep_staging=True)
+    old_snippets = card_files(deployment, "Audio_Segments")
+
+    # The first detection moves, its old snippet is no longer listed in the manifest
+    write_results(os.path.join(deployment, CSV_NAME), ["00:00:20", "00:00:40", "00:01:30", "00:02:20", "00:03:00"])
+    staged_run(run_folder, deployment, tmp_path, keep_staging=True)
+    new_snippets = card_files(deployment, "Audio_Segments")
+    assert len(new_snippets) == 5
+    assert [name for name in old_snippets if name not in new_snippets] == [
+        name for name in old_snippets if "_8.00s-" in name]
+
+
+def test_unchanged_folder_is_skipped_without_kept_staging(deployment, run_folder, tmp_path):
+    staged_run(run_folder, deployment, tmp_path, keep_staging=False)
+    tables, snippets = card_files(deployment, "Raven_Selection_Tables"), card_files(deployment, "Audio_Segments")
+    assert len(tables) == 2 and len(snippets) == 5
+    assert not os.listdir(str(tmp_path / "staging"))
+
+    _, messages = staged_run(run_folder, deployment, tmp_path, keep_staging=False)
+    assert any(message.startswith("No new or changed recordings") for message in messages)
+    assert card_files(deployment, "Raven_Selection_Tables") == tables
+    assert card_files(deployment, "Audio_Segments") == snippets
+
+
+def test_new_recording_without_kept_staging_keeps_earlier_outputs(deployment, run_folder, tmp_path):
+    staged_run(run_folder, deployment, tmp_path, keep_staging=False)
+    snippets = card_files(deployment, "Audio_Segments")
+
+    # The card comes back with one more recording and its detection
+    write_recording(os.path.join(deployment, f"test2_{SESSION_EPOCH_MS}_2025-03-10_00-04-00.wav"))
+    write_results(os.path.join(deployment, CSV_NAME),
+                  ["00:00:10", "00:00:40", "00:01:30", "00:02:20", "00:03:00", "00:04:30"])
+    _, messages = staged_run(run_folder, deployment, tmp_path, keep_staging=False)
+    assert any(message.startswith("Skipped 2 unchanged recordings") for message in messages)
+    assert len(card_files(deployment, "Raven_Selection_Tables")) == 3
+    new_snippets = card_files(deployment, "Audio_Segments")
+    assert len(new_snippets) == 6 and set(snippets) < set(new_snippets)
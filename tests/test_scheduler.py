@@ -0,0 +1,90 @@
+import time
+import threading
+import concurrent.futures
+
+from eloc_scheduler import STAGE_EXTRACT, STAGE_SCAN, Task, WorkScheduler
+
+
+class FakePipeline:
+    """Pipeline whose tasks are given up front, every task records when it ran"""
+
+    def __init__(self, tasks):
+        self.tasks = [Task(self, stage, 'sleep', (seconds,), sequence=sequence, resource=resource)
+                      for stage, seconds, sequence, resource in tasks]
+        self.done = not self.tasks
+        self.finished = 0
+        self.failed = []
+
+    def start(self):
+        return self.tasks
+
+    def task_done(self, task, result):
+        self.finished += 1
+        self.done = self.finished + len(self.failed) == len(self.tasks)
+        return []
+
+    def task_failed(self, task, error):
+        self.failed.append(error)
+        self.done = self.finished + len(self.failed) == len(self.tasks)
+        return []
+
+
+class Recorder:
+    """Runs the tasks on a thread pool and tracks the tasks in flight per resource"""
+
+    def __init__(self, max_workers):
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+        self.order = []
+
+    def submit(self, task):
+        return self.pool.submit(self.run, task)
+
+    def run(self, task):
+        with self.lock:
+            self.order.append(task)
+            self.running[task.resource] = self.running.get(task.resource, 0) + 1
+            self.peak[task.resource] = max(self.peak.get(task.resource, 0), self.running[task.resource])
+        time.sleep(task.args[0])
+        with self.lock:
+            self.running[task.resource] -= 1
+
+
+def test_tasks_of_a_limited_resource_run_one_at_a_time():
+    pipeline = FakePipeline([(STAGE_EXTRACT, 0.02, index, 'card') for index in range(6)]
+                            + [(STAGE_EXTRACT, 0.02, index, None) for index in range(6)]
+                            + [(STAGE_EXTRACT, 0.02, index, 'ssd') for index in range(6)])
+    recorder = Recorder(max_workers=6)
+    WorkScheduler(recorder.submit, 6, resource_limits={'card': 1}).run([pipeline])
+
+    assert pipeline.done and pipeline.finished == 18
+    assert recorder.peak['card'] == 1
+    # Tasks without a resource, or with one that has no limit, use every worker
+    assert recorder.peak[None] > 1
+    assert recorder.peak['ssd'] > 1
+
+
+def test_limit_of_two_readers():
+    pipeline = FakePipeline([(STAGE_EXTRACT, 0.02, index, 'card') for index in range(8)])
+    recorder = Recorder(max_workers=4)
+    WorkScheduler(recorder.submit, 4, resource_limits={'card': 2}).run([pipeline])
+    assert recorder.peak['card'] == 2
+
+
+def test_earlier_stages_and_sequences_run_first():
+    pipeline = FakePipeline([(STAGE_EXTRACT, 0, 2, 'card'), (STAGE_EXTRACT, 0, 1, 'card'), (STAGE_SCAN, 0, 5, 'card')])
+    recorder = Recorder(max_workers=1)
+    WorkScheduler(recorder.submit, 1, resource_limits={'card': 1}).run([pipeline])
+    assert [(task.stage, task.sequence) for task in recorder.order] == [(STAGE_SCAN, 5), (STAGE_EXTRACT, 1),
+                                                                        (STAGE_EXTRACT, 2)]
+
+
+def test_stop_drops_queued_tasks():
+    pipeline = FakePipeline([(STAGE_EXTRACT, 0.05, index, 'card') for index in range(5)])
+    recorder = Recorder(max_workers=2)
+    started = time.perf_counter()
+    WorkScheduler(recorder.submit, 2, should_stop=lambda: time.perf_counter() - started > 0.01,
+                  resource_limits={'card': 1}).run([pipeline])
+    assert 1 <= len(recorder.order) < 5
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+from ffmpeg_segments import extract_segments, segment_output_options
+from setup_ffmpeg import find_ffmpeg
+from snippet_codec import SNIPPET_CODEC_FLAC, SnippetEncoder, encode_flac, encode_samples, make_fmt_chunk
+from wav_segments import WAVE_FORMAT_PCM, read_wav_header, riff_header
+
+FFMPEG_PATH = find_ffmpeg()
+needs_ffmpeg = pytest.mark.skipif(FFMPEG_PATH is None, reason="ffmpeg is not installed")
+
+SAMPLE_RATE = 8000
+
+
+def make_recording(seconds=2.0, channels=2):
+    """fmt chunk and sample data of a tone, one channel per octave"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / float(SAMPLE_RATE)
+    samples = np.column_stack([8000 * np.sin(2 * np.pi * 220 * (channel + 1) * t) for channel in range(channels)])
+    return make_fmt_chunk(WAVE_FORMAT_PCM, channels, SAMPLE_RATE, 2), encode_samples(samples, WAVE_FORMAT_PCM, 2)
+
+
+def write_recording(path, seconds=2.0, channels=2):
+    fmt_chunk, data = make_recording(seconds, channels)
+    with open(path, 'wb') as out:
+        out.write(riff_header(fmt_chunk, len(data)) + data)
+    return read_wav_header(str(path))
+
+
+@needs_ffmpeg
+def test_encode_flac(tmp_path):
+    fmt_chunk, data = make_recording()
+    output_path = str(tmp_path / "snippet.flac")
+    encode_flac(FFMPEG_PATH, riff_header(fmt_chunk, len(data)) + data, output_path)
+    with open(output_path, 'rb') as f:
+        assert f.read(4) == b'fLaC'
+    assert os.path.getsize(output_path) < len(data)
+
+
+@needs_ffmpeg
+def test_flac_encoder_downmixes(tmp_path):
+    fmt_chunk, data = make_recording()
+    encoder = SnippetEncoder(fmt_chunk, SNIPPET_CODEC_FLAC, downmix=True, ffmpeg_path=FFMPEG_PATH)
+    assert encoder.codec == SNIPPET_CODEC_FLAC
+    written, _ = encoder.write(data, str(tmp_path / "snippet.flac"))
+    assert written == os.path.getsize(str(tmp_path / "snippet.flac"))
+    assert not os.path.exists(str(tmp_path / "snippet.flac.part"))
+
+
+def test_flac_output_options():
+    options = segment_output_options(SNIPPET_CODEC_FLAC, sample_rate=SAMPLE_RATE, downmix=True, decimation=4)
+    assert options[options.index('-c:a') + 1] == 'flac'
+    assert options[options.index('-f') + 1] == 'flac'
+    assert options[options.index('-ac') + 1] == '1'
+    assert options[options.index('-ar') + 1] == str(SAMPLE_RATE // 4)
+
+
+@needs_ffmpeg
+def test_extract_flac_segments(tmp_path):
+    info = write_recording(tmp_path / "recording.wav")
+    options = segment_output_options(SNIPPET_CODEC_FLAC, info, info.sample_rate)
+    segments = [(0.5, 1.0, str(tmp_path / "first.flac")), (1.2, 1.8, str(tmp_path / "second.flac"))]
+    sizes = extract_segments(FFMPEG_PATH, str(tmp_path / "recording.wav"), segments, options)
+    assert len(sizes) == 2
+    for _, _, output_path in segments:
+        with open(output_path, 'rb') as f:
+            assert f.read(4) == b'fLaC'
+        assert not os.path.exists(output_path + ".part")
@@ -0,0 +1,100 @@
+import struct
+
+import pytest
+
+from wav_segments import (WAVE_FORMAT_EXTENSIBLE, WAVE_FORMAT_IEEE_FLOAT, WAVE_FORMAT_PCM, CoalescedReader,
+                          WavFormatError, read_frames, read_wav_header, riff_header, segment_frame_range)
+
+
+def fmt_chunk(format_tag=WAVE_FORMAT_PCM, channels=2, sample_rate=8000, sample_width=2):
+    block_align = channels * sample_width
+    return struct.pack('<HHIIHH', format_tag, channels, sample_rate, sample_rate * block_align, block_align,
+                       sample_width * 8)
+
+
+def frames(count, block_align=4):
+    """Sample data whose every frame holds its own index, so ranges can be checked by value"""
+    return b''.join(struct.pack('<I', index)[:block_align].ljust(block_align, b'\x00') for index in range(count))
+
+
+def write_file(path, content):
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_header_of_pcm_file(tmp_path):
+    data = frames(8000)
+    path = write_file(tmp_path / "a.wav", riff_header(fmt_chunk(), len(data)) + data)
+    info = read_wav_header(path)
+    assert (info.format_tag, info.channels, info.sample_rate, info.bits_per_sample) == (WAVE_FORMAT_PCM, 2, 8000, 16)
+    assert info.data_offset == 44
+    assert info.num_frames == 8000
+    assert info.duration == 1.0
+
+
+def test_unknown_and_odd_sized_chunks_are_skipped(tmp_path):
+    data = frames(100)
+    header = riff_header(fmt_chunk(), len(data))
+    # A LIST chunk of odd size (with its pad byte) between fmt and data
+    list_chunk = struct.pack('<4sI', b'LIST', 5) + b'INFOx' + b'\x00'
+    content = header[:36] + list_chunk + header[36:] + data
+    info = read_wav_header(write_file(tmp_path / "a.wav", content))
+    assert info.data_offset == 44 + len(list_chunk)
+    assert info.num_frames == 100
+
+
+def test_extensible_format_uses_the_sub_format(tmp_path):
+    body = fmt_chunk(WAVE_FORMAT_EXTENSIBLE, sample_width=4) + struct.pack('<HHI', 22, 32, 3)
+    body += struct.pack('<H', WAVE_FORMAT_IEEE_FLOAT) + b'\x00' * 14
+    data = frames(10, 8)
+    info = read_wav_header(write_file(tmp_path / "a.wav", riff_header(body, len(data)) + data))
+    assert info.format_tag == WAVE_FORMAT_IEEE_FLOAT
+    assert info.fmt_chunk == body
+
+
+def test_data_size_of_unclosed_recording_comes_from_file_size(tmp_path):
+    data = frames(50) + b'\x01'  # Trailing partial frame
+    path = write_file(tmp_path / "a.wav", riff_header(fmt_chunk(), 0) + data)
+    assert read_wav_header(path).num_frames == 50
+
+    path = write_file(tmp_path / "b.wav", riff_header(fmt_chunk(), 10 ** 6) + data)
+    assert read_wav_header(path).num_frames == 50
+
+
+@pytest.mark.parametrize("content", [
+    b'',
+    b'RIFF\x00\x00\x00\x00AVI ',
+    riff_header(fmt_chunk(), 0)[:36],  # No data chunk
+    riff_header(fmt_chunk(format_tag=0x0055), 4) + b'\x00' * 4,  # MP3
+    riff_header(fmt_chunk(channels=0), 4) + b'\x00' * 4,
+])
+def test_files_that_cannot_be_seeked_into_are_rejected(tmp_path, content):
+    with pytest.raises(WavFormatError):
+        read_wav_header(write_file(tmp_path / "a.wav", content))
+
+
+def test_segment_frame_range_is_clamped_to_the_recording(tmp_path):
+    data = frames(8000)
+    info = read_wav_header(write_file(tmp_path / "a.wav", riff_header(fmt_chunk(), len(data)) + data))
+    assert segment_frame_range(info, 0.25, 0.5) == (2000, 4000)
+    assert segment_frame_range(info, -0.5, 0.1) == (0, 800)
+    assert segment_frame_range(info, 0.9, 2.0) == (7200, 8000)
+    assert segment_frame_range(info, 1.5, 2.0) == (12000, 12000)
+
+
+def test_read_frames_and_coalesced_reads_return_the_same_data(tmp_path):
+    data = frames(8000)
+    path = write_file(tmp_path / "a.wav", riff_header(fmt_chunk(), len(data)) + data)
+    info = read_wav_header(path)
+    ranges = [(100, 500), (300, 700), (650, 900), (5000, 5100)]
+    with open(path, 'rb') as src:
+        assert read_frames(src, info, 100, 102) == data[400:408]
+        with pytest.raises(WavFormatError):
+            read_frames(src, info, 7990, 8010)
+
+        reader = CoalescedReader(src, info, ranges)
+        for start, end in ranges:
+            assert reader.read(start, end) == data[start * 4:end * 4]
+    # The three overlapping ranges are read as one span
+    assert reader.bytes_read == (900 - 100 + 100) * 4
+    assert reader.bytes_saved == (400 + 400 + 250 + 100) * 4 - reader.bytes_read
@@ -0,0 +1,56 @@
+import os
+import calendar
+from datetime import datetime
+
+from eloc_engine import ElocEngine
+
+# Real ELOC names: every file of a recording session carries the session's epoch in milliseconds
+SESSION_EPOCH_MS = "1753309302985"
+FILENAMES = [
+    f"A_{SESSION_EPOCH_MS}_2025-07-24_03-21-48.wav",
+    f"A_{SESSION_EPOCH_MS}_2025-07-26_12-18-15.wav",
+    f"A_{SESSION_EPOCH_MS}_2025-07-26_13-18-15.wav",
+]
+
+
+def wall_seconds(text):
+    return calendar.timegm(datetime.strptime(text, '%Y-%m-%d %H:%M:%S').timetuple())
+
+
+def make_engine():
+    return ElocEngine(status_callback=lambda message: None)
+
+
+def test_start_time_comes_from_date_and_time_not_session_epoch():
+    engine = make_engine()
+    assert engine.wav_start_time(FILENAMES[0]) == wall_seconds('2025-07-24 03:21:48')
+    assert engine.wav_start_time(FILENAMES[1]) == wall_seconds('2025-07-26 12:18:15')
+    assert engine.wav_start_time(FILENAMES[2]) == wall_seconds('2025-07-26 13:18:15')
+
+
+def test_uppercase_extension():
+    engine = make_engine()
+    assert engine.wav_start_time(FILENAMES[1].replace('.wav', '.WAV')) == wall_seconds('2025-07-26 12:18:15')
+
+
+def test_epoch_is_the_fallback_without_date_and_time():
+    engine = make_engine()
+    assert engine.wav_start_time(f"A_{SESSION_EPOCH_MS}_garbled_name.wav") == int(SESSION_EPOCH_MS) / 1000.0
+    assert engine.wav_start_time("no_start_time.wav") is None
+
+
+def test_detections_near_file_edges_go_to_the_right_file(tmp_path):
+    engine = make_engine()
+    # Files that cannot be read get a 1-hour duration
+    wav_files = []
+    for name in FILENAMES:
+        path = tmp_path / name
+        path.write_bytes(b'')
+        wav_files.append(str(path))
+    wav_paths, wav_starts, wav_ends = engine.build_wav_index(wav_files)
+    assert [os.path.basename(path) for path in wav_paths] == FILENAMES
+
+    second_start = wall_seconds('2025-07-26 12:18:15')
+    detections = [second_start - 1, second_start + 1, second_start + 3599, second_start + 3601]
+    indices = engine.assign_detections_to_wavs(detections, wav_starts, wav_ends)
+    assert list(indices) == [-1, 1, 1, 2]
@@ -0,0 +1,191 @@
+import os
+import struct
+import bisect
+
+# WAVE format tags we can copy sample-for-sample without decoding
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+SUPPORTED_FORMAT_TAGS = (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT)
+
+# Largest span read at once for overlapping segments, bounds the memory used by long
+# chains of detections a few seconds apart
+COALESCE_MAX_SPAN_BYTES = 16 * 1024 * 1024
+
+
+class WavFormatError(Exception):
+    """Raised when a file is not a WAV file we can seek into directly"""
+
+
+class WavInfo:
+    """Header information of a WAV file and the location of its sample data"""
+
+    def __init__(self, path, format_tag, channels, sample_rate, bits_per_sample,
+                 block_align, fmt_chunk, data_offset, data_size):
+        self.path = path
+        self.format_tag = format_tag
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.bits_per_sample = bits_per_sample
+        self.block_align = block_align
+        self.fmt_chunk = fmt_chunk  # Raw 'fmt ' chunk body, copied into every snippet
+        self.data_offset = data_offset
+        self.data_size = data_size
+
+    @property
+    def num_frames(self):
+        return self.data_size // self.block_align
+
+    @property
+    def duration(self):
+        """Duration of the recording in seconds"""
+        return self.num_frames / float(self.sample_rate)
+
+    def __repr__(self):
+        return (f"WavInfo({os.path.basename(self.path)!r}, {self.channels}ch, {self.sample_rate}Hz, "
+                f"{self.bits_per_sample}bit, {self.duration:.2f}s)")
+
+
+def read_wav_header(path):
+    """Parse the RIFF header of a WAV file without reading its sample data"""
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        riff = f.read(12)
+        if len(riff) < 12 or riff[0:4] != b'RIFF' or riff[8:12] != b'WAVE':
+            raise WavFormatError(f"{os.path.basename(path)} is not a RIFF/WAVE file")
+
+        fmt_chunk = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise WavFormatError(f"No data chunk found in {os.path.basename(path)}")
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+
+            if chunk_id == b'fmt ':
+                fmt_chunk = f.read(chunk_size)
+                if chunk_size % 2:
+                    f.seek(1, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                data_offset = f.tell()
+                data_size = chunk_size
+                break
+            else:
+                # Skip unknown chunks (LIST, fact, ...), chunks are padded to an even size
+                f.seek(chunk_size + (chunk_size % 2), os.SEEK_CUR)
+
+    if fmt_chunk is None or len(fmt_chunk) < 16:
+        raise WavFormatError(f"Missing or truncated fmt chunk in {os.path.basename(path)}")
+
+    format_tag, channels, sample_rate, _, block_align, bits_per_sample = struct.unpack('<HHIIHH', fmt_chunk[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt_chunk) >= 26:
+        # The real format is stored in the first two bytes of the sub-format GUID
+        format_tag = struct.unpack('<H', fmt_chunk[24:26])[0]
+
+    if format_tag not in SUPPORTED_FORMAT_TAGS:
+        raise WavFormatError(f"Unsupported WAV format tag 0x{format_tag:04X} in {os.path.basename(path)}")
+    if channels == 0 or sample_rate == 0 or block_align == 0:
+        raise WavFormatError(f"Invalid fmt chunk in {os.path.basename(path)}")
+
+    # Recordings that were not closed cleanly have a zero or oversized data length
+    available = file_size - data_offset
+    if data_size == 0 or data_size > available:
+        data_size = available
+    data_size -= data_size % block_align
+
+    return WavInfo(path, format_tag, channels, sample_rate, bits_per_sample,
+                   block_align, fmt_chunk, data_offset, data_size)
+
+
+def segment_frame_range(info, begin_time, end_time):
+    """Convert a time range in seconds to a frame range clamped to the recording"""
+    start_frame = max(0, int(round(begin_time * info.sample_rate)))
+    end_frame = min(info.num_frames, int(round(end_time * info.sample_rate)))
+    return start_frame, max(start_frame, end_frame)
+
+
+def riff_header(fmt_chunk, data_size):
+    """Build the RIFF header of a WAV file with the given fmt chunk body and data size"""
+    fmt_size = len(fmt_chunk)
+    fmt_padding = b'\x00' if fmt_size % 2 else b''
+    riff_size = 4 + (8 + fmt_size + len(fmt_padding)) + (8 + data_size + (data_size % 2))
+    return (struct.pack('<4sI4s', b'RIFF', riff_size, b'WAVE')
+            + struct.pack('<4sI', b'fmt ', fmt_size) + fmt_chunk + fmt_padding
+            + struct.pack('<4sI', b'data', data_size))
+
+
+def wav_header_bytes(info, data_size):
+    """Build a RIFF header for a snippet that shares the format of the source recording"""
+    return riff_header(info.fmt_chunk, data_size)
+
+
+def read_frames(src, info, start_frame, end_frame):
+    """Read a frame range of an open source WAV file into memory, for snippets that are converted"""
+    size = max(0, end_frame - start_frame) * info.block_align
+    src.seek(info.data_offset + start_frame * info.block_align)
+    data = src.read(size)
+    if len(data) < size:
+        raise WavFormatError(f"Unexpected end of data in {os.path.basename(info.path)}")
+    return data
+
+
+def write_wav_data(info, data, output_path):
+    """Write sample data held in memory as a WAV file in the format of the source recording"""
+    with open(output_path, 'wb') as out:
+        out.write(wav_header_bytes(info, len(data)))
+        out.write(data)
+        if len(data) % 2:
+            out.write(b'\x00')
+
+
+class CoalescedReader:
+    """Read the frame ranges of overlapping segments from an open WAV file once.
+
+    ranges are the (start_frame, end_frame) of every segment that may be requested.
+    When a request is not inside the span held in memory, a new span is read that
+    starts at the request and extends over all ranges overlapping or adjoining it (up
+    to max_span_bytes). Later requests inside the span are sliced from memory, so a
+    detection every few seconds with 5 second snippets reads each region only once.
+    bytes_saved is what separate reads of every request would have read on top.
+    """
+
+    def __init__(self, src, info, ranges, max_span_bytes=COALESCE_MAX_SPAN_BYTES):
+        self.src = src
+        self.info = info
+        self.ranges = sorted((start, end) for start, end in ranges if end > start)
+        self.range_starts = [start for start, _ in self.ranges]
+        self.max_span_frames = max(1, max_span_bytes // info.block_align)
+        self.span_start = 0
+        self.span_end = 0
+        self.span_data = b''
+        self.bytes_read = 0
+        self.bytes_requested = 0
+
+    @property
+    def bytes_saved(self):
+        return max(0, self.bytes_requested - self.bytes_read)
+
+    def read(self, start_frame, end_frame):
+        """Raw sample data of a frame range"""
+        block_align = self.info.block_align
+        self.bytes_requested += (end_frame - start_frame) * block_align
+        if start_frame < self.span_start or end_frame > self.span_end:
+            self.read_span(start_frame, end_frame)
+        offset = (start_frame - self.span_start) * block_align
+        size = (end_frame - start_frame) * block_align
+        if offset == 0 and size == len(self.span_data):
+            return self.span_data  # A segment that overlaps no other one, no copy needed
+        return self.span_data[offset:offset + size]
+
+    def read_span(self, start_frame, end_frame):
+        span_end = end_frame
+        index = bisect.bisect_left(self.range_starts, start_frame)
+        while index < len(self.ranges):
+            range_start, range_end = self.ranges[index]
+            if range_start > span_end or range_end - start_frame > self.max_span_frames:
+                break
+            span_end = max(span_end, range_end)
+            index += 1
+        self.span_data = read_frames(self.src, self.info, start_frame, span_end)
+        self.span_start = start_frame
+        self.span_end = span_end
+        self.bytes_read += len(self.span_data)